@@ -1,10 +1,58 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 
-from .models import (Club, Event, EventParticipation, FinanceRecord,
+from .cards import refresh_club_cards
+from .models import (Club, Event, EventParticipation, FinanceRecord, Job,
                      Membership, User)
 
 
+def estimate_row_count(model):
+    """
+    Return the planner's row estimate for `model`'s table, or None if the
+    database doesn't keep one.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        elif connection.vendor == "sqlite":
+            # sqlite_stat1 只有在執行過 ANALYZE 後才存在
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+# Paginator for large tables: unfiltered changelists use the row estimate
+# instead of an exact COUNT(*)
+class EstimatedCountPaginator(Paginator):
+    exact_count_below = 10000
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimate_row_count(self.object_list.model)
+            if estimate is not None and estimate >= self.exact_count_below:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 # Custom admin class for User model
 class UserAdmin(admin.ModelAdmin):
     list_display = ("username", "email", "is_admin", "name", "contact")
@@ -16,31 +64,39 @@ class UserAdmin(admin.ModelAdmin):
 class MembershipInline(admin.TabularInline):
     model = Membership
     extra = 1
+    autocomplete_fields = ("user",)
+
+
+def set_club_status(queryset, status):
+    # queryset.update() 不會觸發 signal，要自己更新社團卡片
+    ids = list(queryset.values_list("pk", flat=True))
+    Club.objects.filter(pk__in=ids).update(status=status, updated_at=timezone.now())
+    refresh_club_cards(ids)
 
 
 @admin.action(description="設為已成立")
 def make_active(modeladmin, request, queryset):
-    queryset.update(status="active")
+    set_club_status(queryset, "active")
 
 
 @admin.action(description="設為待審核")
 def make_pending(modeladmin, request, queryset):
-    queryset.update(status="pending")
+    set_club_status(queryset, "pending")
 
 
 @admin.action(description="設為已拒絕")
 def make_rejected(modeladmin, request, queryset):
-    queryset.update(status="rejected")
+    set_club_status(queryset, "rejected")
 
 
 @admin.action(description="設為暫停營運")
 def make_suspended(modeladmin, request, queryset):
-    queryset.update(status="suspended")
+    set_club_status(queryset, "suspended")
 
 
 @admin.action(description="設為已解散")
 def make_disbanded(modeladmin, request, queryset):
-    queryset.update(status="disbanded")
+    set_club_status(queryset, "disbanded")
 
 
 class ClubAdmin(admin.ModelAdmin):
@@ -79,14 +135,16 @@ class ClubAdmin(admin.ModelAdmin):
 
 
 # Custom admin class for Membership model
-class MembershipAdmin(admin.ModelAdmin):
+class MembershipAdmin(LargeTableAdmin):
     list_display = ("user", "club", "is_manager")
     list_filter = ("is_manager",)
     search_fields = ("user__username", "club__name")
+    list_select_related = ("user", "club")
+    autocomplete_fields = ("user", "club")
 
 
 # Custom admin class for Event model
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(LargeTableAdmin):
     list_display = (
         "name",
         "club",
@@ -100,6 +158,8 @@ class EventAdmin(admin.ModelAdmin):
     )
     list_filter = ("status", "club", "start_date", "end_date", "is_public")
     search_fields = ("name", "club__name", "description")
+    list_select_related = ("club",)
+    autocomplete_fields = ("club",)
     fields = (
         "name",
         "club",
@@ -121,16 +181,28 @@ class EventAdmin(admin.ModelAdmin):
 
 
 # Custom admin class for EventParticipation model
-class EventParticipationAdmin(admin.ModelAdmin):
+class EventParticipationAdmin(LargeTableAdmin):
     list_display = ("user", "event")
     search_fields = ("user__username", "event__name")
+    list_select_related = ("user", "event")
+    autocomplete_fields = ("user", "event")
 
 
 # Custom admin class for FinanceRecord model
-class FinanceRecordAdmin(admin.ModelAdmin):
+class FinanceRecordAdmin(LargeTableAdmin):
     list_display = ("club", "amount", "date", "description")
     list_filter = ("club", "date")
     search_fields = ("description",)
+    list_select_related = ("club",)
+    autocomplete_fields = ("club",)
+    date_hierarchy = "date"
+
+
+# Custom admin class for background Job model
+class JobAdmin(LargeTableAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_at", "created_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("created_at", "locked_at", "locked_by", "last_error")
 
 
 # Register models with their custom admin classes
@@ -140,3 +212,4 @@ admin.site.register(Membership, MembershipAdmin)
 admin.site.register(Event, EventAdmin)
 admin.site.register(EventParticipation, EventParticipationAdmin)
 admin.site.register(FinanceRecord, FinanceRecordAdmin)
+admin.site.register(Job, JobAdmin)
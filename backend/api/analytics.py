@@ -0,0 +1,159 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import (Count, DateField, DecimalField, F, Func,
+                              IntegerField, OuterRef, Subquery)
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .metrics import count_cache
+from .models import (ArchivedMembership, Club, Event, EventParticipation,
+                     FinanceRecord, Membership)
+
+# 曾經加入過的狀態；待審核與被拒絕的申請不算加入
+JOINED_STATUSES = ("accepted", "left")
+
+
+def get_cache():
+    return caches[getattr(settings, "ANALYTICS_CACHE", "default")]
+
+
+def cache_key(club_id):
+    return f"club_analytics:{club_id}"
+
+
+def fill_rate(participants, quota):
+    return round(participants / quota, 4) if quota else None
+
+
+def compute_club_analytics(club_id):
+    events = (
+        Event.objects.filter(club_id=club_id)
+        .annotate(participants=Count("eventparticipation"))
+        .values("id", "name", "status", "start_date", "quota", "participants")
+        .order_by("start_date", "id")
+    )
+    by_month = (
+        EventParticipation.objects.filter(event__club_id=club_id)
+        .annotate(month=TruncMonth("event__start_date"))
+        .values("month")
+        .annotate(events=Count("event", distinct=True), participants=Count("id"))
+        .order_by("month")
+    )
+    # 依加入月份計算，之後退出（包括已封存）的社員仍算在當月；沒有加入時間的舊資料略過
+    joined = Counter()
+    for model in (Membership, ArchivedMembership):
+        rows = (
+            model.objects.filter(club_id=club_id, status__in=JOINED_STATUSES, created_at__isnull=False)
+            .annotate(month=TruncMonth("created_at", output_field=DateField()))
+            .values("month")
+            .annotate(joined=Count("id"))
+            .values_list("month", "joined")
+        )
+        joined.update(dict(rows))
+
+    growth = []
+    total = 0
+    for month in sorted(joined):
+        total += joined[month]
+        growth.append({"month": month, "joined": joined[month], "total": total})
+
+    return {
+        "events": [
+            {**event, "fill_rate": fill_rate(event["participants"], event["quota"])}
+            for event in events
+        ],
+        "participation_by_month": list(by_month),
+        "membership_growth": growth,
+        "generated_at": timezone.now(),
+    }
+
+
+def get_club_analytics(club_id):
+    cache = get_cache()
+    data = cache.get(cache_key(club_id))
+    count_cache(getattr(settings, "ANALYTICS_CACHE", "default"), data is not None)
+    if data is None:
+        data = compute_club_analytics(club_id)
+        cache.set(cache_key(club_id), data, getattr(settings, "ANALYTICS_CACHE_TIMEOUT", 3600))
+    return data
+
+
+def invalidate_club_analytics(club_id):
+    get_cache().delete(cache_key(club_id))
+
+
+def subquery_aggregate(queryset, function, field, output_field):
+    # 相關子查詢 SELECT COUNT/SUM(field)，不需要 GROUP BY
+    aggregate = Func(F(field), function=function, output_field=output_field)
+    return Coalesce(
+        Subquery(queryset.order_by().annotate(total=aggregate).values("total")[:1]),
+        0,
+        output_field=output_field,
+    )
+
+
+def subquery_count(queryset):
+    return subquery_aggregate(queryset, "COUNT", "pk", IntegerField())
+
+
+def club_dashboard(club_id, upcoming=5):
+    """
+    Summary for a club's management page in two queries.
+    """
+    members = Membership.objects.filter(club=OuterRef("pk"))
+    unconfirmed = EventParticipation.objects.filter(
+        event__club=OuterRef("pk"), event__fee__gt=0, payment_status="pending"
+    )
+    club = (
+        Club.objects.filter(id=club_id)
+        .annotate(
+            pending_members=subquery_count(members.filter(status="pending")),
+            accepted_members=subquery_count(members.filter(status="accepted")),
+            unconfirmed_payments=subquery_count(unconfirmed),
+            unconfirmed_amount=subquery_aggregate(unconfirmed, "SUM", "event__fee", IntegerField()),
+            balance=subquery_aggregate(
+                FinanceRecord.objects.filter(club=OuterRef("pk")),
+                "SUM",
+                "amount",
+                DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        .values(
+            "id", "name", "max_member", "pending_members", "accepted_members",
+            "unconfirmed_payments", "unconfirmed_amount", "balance",
+        )
+        .first()
+    )
+    if club is None:
+        return None
+
+    events = (
+        Event.objects.filter(
+            club_id=club_id,
+            end_date__gte=timezone.localdate(),
+            status__in=["planning", "open", "closed"],
+        )
+        .annotate(participants=Count("eventparticipation"))
+        .values("id", "name", "status", "start_date", "end_date", "quota", "participants")
+        .order_by("start_date", "id")[:upcoming]
+    )
+    return {
+        "club": club["id"],
+        "name": club["name"],
+        "members": {
+            "pending": club["pending_members"],
+            "accepted": club["accepted_members"],
+            "max": club["max_member"],
+        },
+        "upcoming_events": [
+            {**event, "fill_rate": fill_rate(event["participants"], event["quota"])}
+            for event in events
+        ],
+        "unconfirmed_payments": {
+            "count": club["unconfirmed_payments"],
+            "amount": club["unconfirmed_amount"],
+        },
+        "balance": club["balance"],
+    }
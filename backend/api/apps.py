@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # 註冊背景工作與 signal
+        from . import instrumentation, metrics, signals, slowlog, tasks  # noqa: F401
+        instrumentation.install()
+        metrics.install()
+        slowlog.install()
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .analytics import invalidate_club_analytics
+from .cards import refresh_club_cards
+from .models import (ArchivedEvent, ArchivedEventParticipation,
+                     ArchivedMembership, Event, EventParticipation,
+                     Membership, Notification, Tombstone)
+
+ARCHIVE_EVENT_STATUSES = ("completed", "cancelled")
+ARCHIVE_MEMBERSHIP_STATUSES = ("left", "rejected")
+
+
+def copy_rows(queryset, target):
+    """
+    Bulk insert the rows of `queryset` into `target`, copying every field
+    the two models share (ids included).
+    """
+    fields = [
+        field.attname for field in target._meta.concrete_fields
+        if field.attname not in ("archived_at",)
+    ]
+    rows = [target(**row) for row in queryset.values(*fields)]
+    target.objects.bulk_create(rows)
+    return rows
+
+
+def archivable_events(now=None):
+    now = now or timezone.now()
+    before = now.date() - timedelta(days=getattr(settings, "ARCHIVE_EVENT_DAYS", 365))
+    return Event.objects.filter(status__in=ARCHIVE_EVENT_STATUSES, end_date__lt=before)
+
+
+def archivable_memberships(now=None):
+    now = now or timezone.now()
+    before = now - timedelta(days=getattr(settings, "ARCHIVE_MEMBERSHIP_DAYS", 180))
+    # 社幹即使已退出也保留，避免影響權限判斷
+    return Membership.objects.filter(
+        status__in=ARCHIVE_MEMBERSHIP_STATUSES, is_manager=False, updated_at__lt=before
+    )
+
+
+def archive_events(batch_size=500, now=None):
+    """
+    Move old completed/cancelled events and their participations into the
+    archive tables, one transaction per batch. Their notifications stay in
+    the inbox, pointed at the archived event. Yields each batch's size.
+    """
+    queryset = archivable_events(now)
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return
+            copy_rows(Event.objects.filter(id__in=ids), ArchivedEvent)
+            copy_rows(EventParticipation.objects.filter(event_id__in=ids), ArchivedEventParticipation)
+            # 先解開 event，否則刪除活動時會一併刪掉通知
+            Notification.objects.filter(event_id__in=ids).update(archived_event_id=F("event_id"), event=None)
+            Event.objects.filter(id__in=ids).delete()
+        yield len(ids)
+
+
+def archive_memberships(batch_size=500, now=None):
+    """
+    Move old left/rejected memberships into the archive table, one
+    transaction per batch. Yields each batch's size.
+    """
+    queryset = archivable_memberships(now)
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return
+            copy_rows(Membership.objects.filter(id__in=ids), ArchivedMembership)
+            Membership.objects.filter(id__in=ids).delete()
+        yield len(ids)
+
+
+def prune_tombstones(now=None):
+    now = now or timezone.now()
+    before = now - timedelta(days=getattr(settings, "SYNC_TOMBSTONE_DAYS", 30))
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=before).delete()
+    return deleted
+
+
+@transaction.atomic
+def restore_event(archived):
+    copy_rows(ArchivedEvent.objects.filter(id=archived.id), Event)
+    participations = copy_rows(archived.participations.all(), EventParticipation)
+    archived.notifications.update(event_id=archived.id, archived_event=None)
+    Tombstone.objects.filter(model="event", object_id=archived.id).delete()
+    Tombstone.objects.filter(
+        model="eventparticipation", object_id__in=[row.id for row in participations]
+    ).delete()
+    archived.delete()
+    refresh_club_cards([archived.club_id])
+    transaction.on_commit(lambda: invalidate_club_analytics(archived.club_id))
+
+
+@transaction.atomic
+def restore_membership(archived):
+    copy_rows(ArchivedMembership.objects.filter(id=archived.id), Membership)
+    Tombstone.objects.filter(model="membership", object_id=archived.id).delete()
+    archived.delete()
+    refresh_club_cards([archived.club_id])
+    transaction.on_commit(lambda: invalidate_club_analytics(archived.club_id))
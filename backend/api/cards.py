@@ -0,0 +1,61 @@
+import datetime
+
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Now, NullIf
+from django.utils import timezone
+
+from .analytics import subquery_count
+from .models import Club, ClubCard, Event, Membership
+
+
+def card_values(today=None):
+    """
+    Column expressions recomputing a ClubCard from its club_id, so a
+    refresh is a single `UPDATE ... SET col = (subquery)`.
+    """
+    today = today or timezone.localdate()
+    club = Club.objects.filter(pk=OuterRef("club_id"))
+    accepted = Membership.objects.filter(club_id=OuterRef("club_id"), status="accepted")
+    president = (
+        accepted.filter(is_manager=True)
+        .annotate(display_name=Coalesce(NullIf("user__name", Value("")), "user__username"))
+        .order_by("id")
+    )
+    upcoming = (
+        Event.objects.filter(club_id=OuterRef("club_id"), start_date__gte=today)
+        .exclude(status="cancelled")
+        .order_by("start_date", "id")
+    )
+    return {
+        "name": Subquery(club.values("name")[:1]),
+        "description": Subquery(club.values("description")[:1]),
+        "status": Subquery(club.values("status")[:1]),
+        "image": Subquery(club.values("image")[:1]),
+        "max_member": Subquery(club.values("max_member")[:1]),
+        "member_count": subquery_count(accepted),
+        "president_name": Subquery(president.values("display_name")[:1]),
+        "next_event_id": Subquery(upcoming.values("id")[:1]),
+        "next_event_name": Subquery(upcoming.values("name")[:1]),
+        "next_event_start": Subquery(upcoming.values("start_date")[:1]),
+        "refreshed_at": Now(),
+    }
+
+
+def refresh_club_cards(club_ids):
+    """
+    Recompute the cards of `club_ids` (a list or a values() queryset).
+    Cards that don't exist are not created, so this is safe to call while
+    a club is being deleted.
+    """
+    return ClubCard.objects.filter(club_id__in=club_ids).update(**card_values())
+
+
+def ensure_club_card(club_id):
+    ClubCard.objects.get_or_create(club_id=club_id)
+    refresh_club_cards([club_id])
+
+
+def next_refresh_time(event):
+    # 活動開始日過後，卡片上的「下一個活動」要換成下一場
+    day_after = event.start_date + datetime.timedelta(days=1)
+    return timezone.make_aware(datetime.datetime.combine(day_after, datetime.time.min))
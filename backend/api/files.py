@@ -0,0 +1,205 @@
+"""
+Serving files from disk without DEBUG: collected static files, the built
+frontend (its index.html is the fallback for client-side routes) and
+uploaded media. Content-addressed blobs (see api/uploads.py) are sent as
+immutable.
+
+Media can be handed off to the front proxy with MEDIA_ACCEL:
+'x-accel-redirect' (nginx, with an internal location at
+MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' (Apache,
+lighttpd). Python then only checks the path and sets headers.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotAllowed, StreamingHttpResponse)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .middleware import parse_accept_encoding
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+BLOB_PREFIX = 'blobs/'
+REVALIDATE = 'no-cache'
+
+# .br 優先於 .gz
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def find_variant(request, path):
+    """
+    Return (encoding, path) of the best pre-compressed sibling of `path`
+    the client accepts, or (None, path).
+    """
+    codings = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    wildcard = codings.get('*', 0.0)
+    for encoding, suffix in PRECOMPRESSED:
+        if codings.get(encoding, wildcard) > 0 and os.path.isfile(path + suffix):
+            return encoding, path + suffix
+    return None, path
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) (inclusive) for a single-range `Range` header, None
+    when the header should be ignored, or False when it can't be satisfied.
+    Multiple ranges are ignored and the whole file is sent.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        # bytes=5-3 語法上就不成立，忽略 Range（RFC 9110 14.1.1），不是 416
+        return None
+    if size == 0:
+        # 空檔案沒有任何 byte 可以回傳
+        return False
+    if first == '':
+        # bytes=-500：最後 500 bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+def range_applies(request, etag, mtime):
+    # If-Range 與目前版本不符時要送整個檔案；weak ETag 一律視為不符（RFC 9110 13.1.5）
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('W/'):
+        return False
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def serve_file(request, path, cache_control, precompressed=False, ranges=False):
+    """
+    Send the file at `path` with ETag/Last-Modified validators and
+    `cache_control`. With `precompressed`, a `.br`/`.gz` sibling is sent
+    instead when the client accepts it; with `ranges`, single byte-range
+    requests are answered with 206.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if not os.path.isfile(path):
+        raise Http404
+
+    encoding, variant = find_variant(request, path) if precompressed else (None, path)
+    stat = os.stat(variant)
+    etag = file_etag(stat)
+    vary = precompressed and any(os.path.isfile(path + suffix) for _, suffix in PRECOMPRESSED)
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    byte_range = None
+    if response is None and ranges and encoding is None and request.META.get('HTTP_RANGE'):
+        if range_applies(request, etag, stat.st_mtime):
+            byte_range = parse_range(request.META['HTTP_RANGE'], stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(variant, start, end - start + 1), status=206, content_type=content_type
+        )
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response.headers['Content-Length'] = str(end - start + 1)
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    elif response is None:
+        response = FileResponse(
+            open(variant, 'rb'),
+            content_type=content_type,
+            filename=os.path.basename(path),
+        )
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control
+    if ranges:
+        response.headers['Accept-Ranges'] = 'bytes'
+    if vary:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def is_immutable(name):
+    # Vite 輸出的 assets/ 檔名本身已含 hash
+    if name.startswith(settings.FRONTEND_ASSETS_PREFIX):
+        return True
+    return name in getattr(staticfiles_storage, 'immutable_names', ())
+
+
+def serve_static(request, path):
+    return serve_file(
+        request,
+        staticfiles_storage.path(path),
+        IMMUTABLE if is_immutable(path) else REVALIDATE,
+        precompressed=True,
+    )
+
+
+def spa_index(request):
+    # 前端路由（/clubs/3 等）都回傳 index.html，由 React Router 處理
+    return serve_file(request, staticfiles_storage.path('index.html'), REVALIDATE, precompressed=True)
+
+
+def offload(path, name, cache_control):
+    """
+    Empty response telling the front proxy to send the file itself.
+    """
+    content_type, _ = mimetypes.guess_type(path)
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    else:
+        response.headers['X-Sendfile'] = path
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def serve_media(request, path):
+    full_path = default_storage.path(path)
+    # blobs/ 以內容雜湊命名，內容不會改變
+    cache_control = IMMUTABLE if path.startswith(BLOB_PREFIX) else settings.MEDIA_CACHE_CONTROL
+    if settings.MEDIA_ACCEL:
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        if not os.path.isfile(full_path):
+            raise Http404
+        return offload(full_path, path, cache_control)
+    return serve_file(request, full_path, cache_control, ranges=True)
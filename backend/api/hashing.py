@@ -0,0 +1,83 @@
+"""
+Password hashing in a process pool. Kept free of model imports: spawned
+workers unpickle these functions by importing this module before (and
+without) setting up Django's app registry.
+
+The pool is started on first use and kept for the life of the process,
+so a job worker handling several imports spawns its hashing processes
+once instead of on every job. Web requests only hash small imports, in
+process.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+def init_worker(settings_module):
+    # make_password 只需要 settings，不必 django.setup()
+    if settings_module:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """
+    The shared pool, restarted only when a different size is asked for.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # 用 spawn 而非 fork，避免在多執行緒的 web server 裡 fork
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE"),),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+@atexit.register
+def shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    make_password() for each password, spread over `workers` processes
+    (USER_IMPORT_WORKERS, or every core by default).
+    """
+    workers = workers or getattr(settings, "USER_IMPORT_WORKERS", None) or os.cpu_count() or 1
+    if min(workers, len(passwords)) <= 1:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    pool = get_pool(workers)
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # 某個 worker 行程被終止（例如 OOM），換一個新的 pool 重試一次
+        discard_pool(pool)
+        return list(get_pool(workers).map(make_password, passwords, chunksize=chunksize))
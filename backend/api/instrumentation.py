@@ -0,0 +1,73 @@
+"""
+One execute wrapper on every database connection, shared by the metrics
+(api/metrics.py) and the slow-query log (api/slowlog.py).
+
+Observers registered with `observe()` are called after each statement
+with (connection, sql, params, many, elapsed_seconds, failed).
+`current_request` holds the request being handled, set by
+CurrentRequestMiddleware, so observers can attribute queries to a view.
+"""
+import contextvars
+import logging
+import time
+
+from django.db.backends.signals import connection_created
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+# 目前處理中的 request（sync 與 async view 都適用）
+current_request = contextvars.ContextVar("current_request", default=None)
+
+_observers = []
+
+
+def observe(func):
+    """
+    Register `func` to be called after every SQL statement.
+    """
+    if func not in _observers:
+        _observers.append(func)
+    return func
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    failed = True
+    try:
+        result = execute(sql, params, many, context)
+        failed = False
+        return result
+    finally:
+        elapsed = time.perf_counter() - start
+        for func in _observers:
+            try:
+                func(context["connection"], sql, params, many, elapsed, failed)
+            except Exception:
+                # 統計出錯不能讓查詢本身失敗
+                logger.exception("Query observer %r failed", func)
+
+
+def track_connection(sender, connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def install():
+    """
+    Wrap every new database connection; called from AppConfig.ready().
+    """
+    connection_created.connect(track_connection)
+
+
+class CurrentRequestMiddleware(MiddlewareMixin):
+    """
+    Remember the current request so observers can name its view.
+    """
+
+    def process_request(self, request):
+        current_request.set(request)
+
+    def process_response(self, request, response):
+        current_request.set(None)
+        return response
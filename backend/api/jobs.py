@@ -0,0 +1,132 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def job(name):
+    """
+    Register a function as the handler for jobs called `name`.
+    """
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, run_at=None, **payload):
+    """
+    Insert a job row. Call it inside the same transaction as the change that
+    triggers it so the job exists only if that change is committed.
+    """
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+    )
+
+
+def enqueue_once(name, run_at=None, **payload):
+    """
+    Like enqueue(), but do nothing when a pending job with the same name,
+    run_at and payload already exists. For jobs that are requested again
+    and again for the same moment (e.g. a refresh after every save).
+    """
+    run_at = run_at or timezone.now()
+    pending = Job.objects.filter(
+        name=name, status='pending', run_at=run_at,
+        **{f'payload__{key}': value for key, value in payload.items()},
+    )
+    if pending.exists():
+        return None
+    return enqueue(name, run_at=run_at, **payload)
+
+
+def backoff(attempts):
+    base = getattr(settings, 'JOB_BACKOFF_BASE', 10)
+    cap = getattr(settings, 'JOB_BACKOFF_MAX', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim_jobs(worker_id, limit):
+    """
+    Mark up to `limit` due jobs as running for `worker_id` and return them.
+    Jobs left running longer than JOB_LOCK_TIMEOUT (crashed worker) are
+    claimed again. Claiming counts as an attempt, so a job that keeps
+    killing its worker fails after max_attempts instead of looping forever.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', 600))
+    abandoned = Q(status='running', locked_at__lt=stale)
+    Job.objects.filter(abandoned, attempts__gte=F('max_attempts')).update(
+        status='failed', locked_at=None, locked_by='',
+        last_error='Worker stopped while running the job',
+    )
+    due = Q(status='pending', run_at__lte=now) | (abandoned & Q(attempts__lt=F('max_attempts')))
+    with transaction.atomic():
+        candidates = Job.objects.filter(due).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:limit])
+        # 條件式 update，避免兩個 worker 拿到同一筆
+        Job.objects.filter(due, id__in=ids).update(
+            status='running', locked_at=now, locked_by=worker_id, attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(id__in=ids, status='running', locked_by=worker_id, locked_at=now))
+
+
+def run_job(job):
+    handler = HANDLERS.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job {job.name!r}')
+        handler(**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.id, job.name)
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.run_at = timezone.now() + backoff(job.attempts)
+    else:
+        job.status = 'done'
+        job.last_error = ''
+    job.locked_at = None
+    job.locked_by = ''
+    job.save(update_fields=['status', 'run_at', 'locked_at', 'locked_by', 'last_error'])
+    return job.status == 'done'
+
+
+def prune_jobs(now=None):
+    """
+    Delete done jobs due more than JOB_RETENTION_DAYS ago. Failed jobs are
+    kept for inspection.
+    """
+    now = now or timezone.now()
+    before = now - timedelta(days=getattr(settings, 'JOB_RETENTION_DAYS', 7))
+    deleted, _ = Job.objects.filter(status='done', run_at__lt=before).delete()
+    return deleted
+
+
+def work(worker_id, batch_size=10):
+    """
+    Claim and run one batch. Returns the number of jobs claimed.
+    """
+    jobs = claim_jobs(worker_id, batch_size)
+    for claimed in jobs:
+        run_job(claimed)
+    return len(jobs)
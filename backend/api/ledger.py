@@ -0,0 +1,57 @@
+"""
+Per-month checkpoints for the club ledger.
+
+FinanceMonth holds each club's net amount per calendar month and is
+refreshed whenever a record is saved or deleted. A record's balance is
+the sum of the months before it plus the records earlier in its own
+month, so the ledger never sums a club's whole history. Code that
+writes records with `update()` or `bulk_create()` (no signals) must call
+refresh_finance_months() itself.
+"""
+import datetime
+
+from django.db.models import DecimalField, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .analytics import subquery_aggregate
+from .models import FinanceMonth, FinanceRecord
+
+BALANCE_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (month_start(day) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def refresh_finance_months(club_id, months):
+    """
+    Recompute the checkpoints of `months` (any day within each month).
+    """
+    for month in {month_start(day) for day in months}:
+        net = FinanceRecord.objects.filter(
+            club_id=club_id, date__gte=month, date__lt=next_month(month)
+        ).aggregate(net=Sum("amount"))["net"]
+        if net is None:
+            FinanceMonth.objects.filter(club_id=club_id, month=month).delete()
+        else:
+            FinanceMonth.objects.update_or_create(club_id=club_id, month=month, defaults={"net": net})
+
+
+def with_balances(queryset):
+    """
+    Annotate FinanceRecord rows with `balance`, the club's balance after
+    the row in (date, id) order: earlier months from the checkpoints plus
+    the records up to and including the row within its month.
+    """
+    months = FinanceMonth.objects.filter(club_id=OuterRef("club_id"), month__lt=OuterRef("ledger_month"))
+    earlier = FinanceRecord.objects.filter(club_id=OuterRef("club_id"), date__gte=OuterRef("ledger_month")).filter(
+        Q(date__lt=OuterRef("date")) | Q(date=OuterRef("date"), id__lte=OuterRef("id"))
+    )
+    return queryset.alias(ledger_month=TruncMonth("date")).annotate(
+        balance=subquery_aggregate(months, "SUM", "net", BALANCE_FIELD)
+        + subquery_aggregate(earlier, "SUM", "amount", BALANCE_FIELD)
+    )
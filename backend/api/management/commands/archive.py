@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.archive import (archivable_events, archivable_memberships,
+                         archive_events, archive_memberships,
+                         prune_tombstones)
+
+
+class Command(BaseCommand):
+    help = "Move old events and inactive memberships into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows moved per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be moved.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            self.stdout.write(f"events: {archivable_events().count()}")
+            self.stdout.write(f"memberships: {archivable_memberships().count()}")
+            return
+
+        batch_size = options["batch_size"]
+        events = sum(archive_events(batch_size))
+        self.stdout.write(f"Archived {events} events")
+        memberships = sum(archive_memberships(batch_size))
+        self.stdout.write(f"Archived {memberships} memberships")
+        self.stdout.write(f"Pruned {prune_tombstones()} tombstones")
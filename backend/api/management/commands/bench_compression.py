@@ -0,0 +1,53 @@
+import gzip
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from api.middleware import brotli
+from api.models import Club
+
+
+class Command(BaseCommand):
+    help = "Measure compression CPU cost vs bytes saved for API endpoints on the current database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", action="append", dest="paths", help="Endpoint to measure (repeatable).")
+        parser.add_argument("--clubs", type=int, default=3, help="Number of clubs to sample for detail endpoints.")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def get_paths(self, options):
+        if options["paths"]:
+            return options["paths"]
+        paths = ["/api/clubs/"]
+        for club_id in Club.objects.values_list("id", flat=True)[: options["clubs"]]:
+            paths += [f"/api/clubs/{club_id}/", f"/api/clubs/{club_id}/events/"]
+        return paths
+
+    def handle(self, *args, **options):
+        codecs = [
+            ("gzip-6", lambda b: gzip.compress(b, compresslevel=6, mtime=0)),
+            ("gzip-9", lambda b: gzip.compress(b, compresslevel=9, mtime=0)),
+        ]
+        if brotli is not None:
+            codecs += [
+                ("br-4", lambda b: brotli.compress(b, quality=4)),
+                ("br-11", lambda b: brotli.compress(b, quality=11)),
+            ]
+        else:
+            self.stderr.write("brotli is not installed; only gzip is measured.")
+
+        client = Client(SERVER_NAME="localhost")
+        self.stdout.write(f"{'endpoint':<32}{'codec':<8}{'raw':>10}{'compressed':>12}{'saved':>8}{'ms':>9}")
+        for path in self.get_paths(options):
+            response = client.get(path)
+            if response.status_code != 200:
+                self.stderr.write(f"{path}: HTTP {response.status_code}, skipped")
+                continue
+            body = response.content
+            for name, compress in codecs:
+                size = len(compress(body))
+                cost = min(timeit.repeat(lambda: compress(body), number=1, repeat=options["repeat"]))
+                self.stdout.write(
+                    f"{path:<32}{name:<8}{len(body):>10}{size:>12}{1 - size / len(body):>8.1%}{cost * 1000:>9.2f}"
+                )
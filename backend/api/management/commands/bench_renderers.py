@@ -0,0 +1,114 @@
+import datetime
+import decimal
+import io
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser, MessagePackParser
+from api.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+
+
+def build_club_payload(clubs, members, events, participants):
+    """
+    Build data shaped like `ClubSerializer(many=True).data`.
+    """
+    payload = []
+    for c in range(clubs):
+        payload.append({
+            "id": c,
+            "name": f"社團 {c}",
+            "description": "這是一段社團介紹。" * 10,
+            "status": "active",
+            "foundation_date": datetime.date(2020, 1, 1) + datetime.timedelta(days=c),
+            "memberCount": {"current": members, "max": members * 2},
+            "members": [
+                {
+                    "id": c * members + m,
+                    "user": m,
+                    "username": f"user{m}",
+                    "name": f"學生 {m}",
+                    "email": f"user{m}@ntu.edu.tw",
+                    "contact": "0912-345-678",
+                    "club": c,
+                    "status": "accepted",
+                    "is_manager": m == 0,
+                    "position": "社長" if m == 0 else None,
+                }
+                for m in range(members)
+            ],
+            "activities": [
+                {
+                    "id": c * events + e,
+                    "name": f"活動 {e}",
+                    "description": "活動說明" * 20,
+                    "fee": 300,
+                    "quota": participants,
+                    "status": "open",
+                    "start_date": datetime.date(2025, 3, 1),
+                    "end_date": datetime.date(2025, 3, 2),
+                    "club": c,
+                    "payment_methods": {"cash": True, "transfer": {"bank": "700", "account": "0001234567"}},
+                    "participants": [
+                        {
+                            "id": p,
+                            "user": p,
+                            "username": f"user{p}",
+                            "name": f"學生 {p}",
+                            "email": f"user{p}@ntu.edu.tw",
+                            "contact": None,
+                            "payment_method": "cash",
+                            "payment_status": "pending",
+                            "is_manager": False,
+                        }
+                        for p in range(participants)
+                    ],
+                    "my_membership": None,
+                    "is_public": True,
+                }
+                for e in range(events)
+            ],
+            "presidentName": "學生 0",
+            "max_member": members * 2,
+            "image": f"/media/club_images/{c}.jpg",
+            "balance": decimal.Decimal("12345.67"),
+        })
+    return payload
+
+
+class Command(BaseCommand):
+    help = "Compare renderer/parser size and throughput (JSON, orjson, MessagePack) on large club payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clubs", type=int, default=50)
+        parser.add_argument("--members", type=int, default=100)
+        parser.add_argument("--events", type=int, default=10)
+        parser.add_argument("--participants", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        data = build_club_payload(
+            options["clubs"], options["members"], options["events"], options["participants"]
+        )
+        repeat = options["repeat"]
+        if orjson is None:
+            self.stderr.write("orjson is not installed; FastJSONRenderer uses the stdlib fallback.")
+        pairs = [
+            (JSONRenderer(), JSONParser()),
+            (FastJSONRenderer(), FastJSONParser()),
+        ]
+        if msgpack is not None:
+            pairs.append((MessagePackRenderer(), MessagePackParser()))
+        else:
+            self.stderr.write("msgpack is not installed; skipping MessagePackRenderer.")
+
+        self.stdout.write(f"{'renderer':<22}{'bytes':>12}{'render ms':>12}{'parse ms':>12}")
+        for renderer, parser in pairs:
+            body = renderer.render(data)
+            render = min(timeit.repeat(lambda: renderer.render(data), number=1, repeat=repeat))
+            parse = min(timeit.repeat(lambda: parser.parse(io.BytesIO(body)), number=1, repeat=repeat))
+            self.stdout.write(
+                f"{type(renderer).__name__:<22}{len(body):>12}{render * 1000:>12.2f}{parse * 1000:>12.2f}"
+            )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.uploads import delete_unreferenced_blobs, expire_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions older than UPLOAD_SESSION_TTL and blobs nothing refers to."
+
+    def handle(self, *args, **options):
+        sessions = expire_sessions()
+        blobs = delete_unreferenced_blobs()
+        self.stdout.write(f"Deleted {sessions} expired upload sessions and {blobs} unreferenced blobs.")
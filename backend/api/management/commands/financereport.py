@@ -0,0 +1,33 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.reports import openpyxl, report_rows, write_report
+
+
+class Command(BaseCommand):
+    help = "Write the cross-club monthly finance report (totals and closing balances) as CSV or XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat, help="Last day (YYYY-MM-DD).")
+        parser.add_argument("--club", type=int, action="append", help="Only this club; repeat for several.")
+        parser.add_argument("--format", choices=("csv", "xlsx"), help="Output format (default: from --output, else csv).")
+        parser.add_argument("--output", "-o", help="Output file (default: CSV to stdout).")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        format = options["format"] or ("xlsx" if output and output.endswith(".xlsx") else "csv")
+        if format == "xlsx" and not output:
+            raise CommandError("XLSX output needs --output.")
+        if format == "xlsx" and openpyxl is None:
+            raise CommandError("XLSX reports need openpyxl.")
+
+        rows = report_rows(options["date_from"], options["date_to"], options["club"])
+        if output:
+            with open(output, "wb") as f:
+                write_report(rows, format, f)
+            self.stderr.write(f"Wrote {output}")
+        else:
+            write_report(rows, format, sys.stdout.buffer)
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.provisioning import import_users, parse_rows
+
+
+class Command(BaseCommand):
+    help = "Create users in bulk from a CSV (with a header line) or JSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON file with username, email, password, name and contact.")
+        parser.add_argument("--format", choices=("csv", "json"), help="File format (default: from the extension).")
+        parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: all cores).")
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows per INSERT.")
+        parser.add_argument("--dry-run", action="store_true", help="Only validate the file.")
+        parser.add_argument("--json", action="store_true", help="Print the full report as JSON.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or ("json" if path.lower().endswith(".json") else "csv")
+        try:
+            with open(path, "rb") as f:
+                rows = parse_rows(f.read(), format)
+            report = import_users(
+                rows, dry_run=options["dry_run"], workers=options["workers"], batch_size=options["batch_size"],
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        for error in report["errors"]:
+            messages = "; ".join(f"{field}: {' '.join(msgs)}" for field, msgs in error["errors"].items())
+            self.stderr.write(f"row {error['row']} ({error['username'] or '-'}): {messages}")
+        verb = "Would create" if options["dry_run"] else "Created"
+        self.stdout.write(f"{verb} {report['created']} users, {len(report['errors'])} rows skipped")
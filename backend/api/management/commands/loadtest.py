@@ -0,0 +1,333 @@
+import datetime
+import gzip
+import http.client
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Club, Event, Membership, User
+
+PREFIX = "loadtest"
+PASSWORD = "loadtest-password"
+
+# 每個情境中各動作的權重
+SCENARIOS = {
+    # 社團博覽會：大量瀏覽與申請加入，幹部同時在審核
+    "recruitment": {"login": 2, "browse": 45, "club_detail": 15, "club_join": 30, "approve": 8},
+    # 熱門活動開放報名的瞬間
+    "event-opening": {"login": 2, "browse": 10, "event_list": 28, "event_join": 60},
+    "mixed": {"login": 3, "browse": 35, "club_detail": 12, "club_join": 15, "event_list": 10,
+              "event_join": 20, "approve": 5},
+}
+
+
+def percentile(sorted_values, p):
+    # nearest-rank
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status == "error" or int(status) >= 400)
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_ms": latencies[-1] if latencies else None,
+        "status": dict(sorted(statuses.items())),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, route, status, latency_ms):
+        with self.lock:
+            self.latencies[route].append(round(latency_ms, 2))
+            self.statuses[route][str(status)] += 1
+
+
+class VirtualUser:
+    """
+    One simulated client with its own keep-alive connection and JWT.
+    """
+
+    token_lifetime = 240  # 秒，比預設的 access token 效期短
+
+    def __init__(self, base_url, user, fixture, recorder, rng, timeout):
+        url = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.connect = lambda: connection_class(url.hostname, url.port, timeout=timeout)
+        self.connection = self.connect()
+        self.user = user
+        self.username = user.username
+        self.fixture = fixture
+        self.recorder = recorder
+        self.rng = rng
+        self.token = None
+        self.token_time = 0
+
+    def ensure_token(self):
+        # token 直接在本機簽發，避免開場的大量登入被 login 節流擋下；
+        # 登入路徑仍由情境中的 login 動作測量
+        if time.monotonic() - self.token_time > self.token_lifetime:
+            self.token = str(AccessToken.for_user(self.user))
+            self.token_time = time.monotonic()
+
+    def request(self, route, method, path, body=None):
+        self.ensure_token()
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # 連線被關閉或逾時：重新連線，這次記為 error
+            self.connection.close()
+            self.connection = self.connect()
+            data, status = b"", "error"
+        self.recorder.add(route, status, (time.perf_counter() - start) * 1000)
+        if status == "error" or status >= 400 or not data:
+            return status, None
+        if response.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        try:
+            return status, json.loads(data)
+        except ValueError:
+            return status, None
+
+    def login(self):
+        status, data = self.request(
+            "login", "POST", "/api/login/", {"username": self.username, "password": PASSWORD}
+        )
+        if data:
+            self.token = data["access"]
+            self.token_time = time.monotonic()
+
+    def browse(self):
+        self.request("browse", "GET", "/api/clubs/")
+
+    def club_detail(self):
+        self.request("club_detail", "GET", f"/api/clubs/{self.rng.choice(self.fixture['clubs'])}/")
+
+    def club_join(self):
+        self.request("club_join", "POST", f"/api/clubs/{self.rng.choice(self.fixture['clubs'])}/join/")
+
+    def event_list(self):
+        club_id = self.fixture["home_club"][self.username]
+        self.request("event_list", "GET", f"/api/clubs/{club_id}/events/")
+
+    def event_join(self):
+        event_id = self.fixture["events"][self.fixture["home_club"][self.username]]
+        self.request("event_join", "POST", f"/api/events/{event_id}/join/", {"payment_method": "cash"})
+
+    def approve(self):
+        # 幹部打開社團頁面，核准一位待審核的申請者
+        club_id = self.fixture["managed_club"].get(self.username)
+        if club_id is None:
+            return self.club_detail()
+        status, club = self.request("club_detail", "GET", f"/api/clubs/{club_id}/")
+        pending = [m for m in (club or {}).get("members", []) if m["status"] == "pending"]
+        if pending:
+            membership = self.rng.choice(pending)
+            self.request("approve", "PATCH", f"/api/memberships/{membership['id']}/", {"status": "accepted"})
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a recruitment-day / event-opening traffic mix against a running server "
+        "and report throughput and latency percentiles per route. Login and join views are "
+        "throttled per user and IP, so expect 429s unless the server's throttle rates are raised."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+        parser.add_argument("--users", type=int, default=50, help="Concurrent virtual users.")
+        parser.add_argument("--managers", type=int, default=5, help="Virtual users acting as club officers.")
+        parser.add_argument("--clubs", type=int, default=20, help="Clubs created by --setup.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run.")
+        parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between requests.")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--setup", action="store_true", help="Create the load-test users, clubs and events first.")
+        parser.add_argument("--teardown", action="store_true", help="Delete the load-test data and exit.")
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        if options["teardown"]:
+            Club.objects.filter(name__startswith=f"{PREFIX} ").delete()
+            User.objects.filter(username__startswith=PREFIX).delete()
+            self.stdout.write("Load-test data deleted")
+            return
+        if options["setup"]:
+            self.setup(options)
+        fixture = self.load_fixture(options)
+
+        recorder = Recorder()
+        weights = SCENARIOS[options["scenario"]]
+        deadline = time.monotonic() + options["duration"]
+        users = fixture["users"][: options["users"]]
+        threads = [
+            threading.Thread(
+                target=self.run_user,
+                args=(options, user, fixture, recorder, weights, deadline, options["seed"] + i),
+            )
+            for i, user in enumerate(users)
+        ]
+        started_at = timezone.now()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        report = self.build_report(options, recorder, elapsed, started_at, len(users))
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+                f.write("\n")
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def run_user(self, options, user, fixture, recorder, weights, deadline, seed):
+        rng = random.Random(seed)
+        client = VirtualUser(options["base_url"], user, fixture, recorder, rng, options["timeout"])
+        actions = list(weights)
+        while time.monotonic() < deadline:
+            action = rng.choices(actions, weights=list(weights.values()))[0]
+            getattr(client, action)()
+            if options["think_time"]:
+                time.sleep(rng.uniform(0, options["think_time"]))
+        client.connection.close()
+
+    @transaction.atomic
+    def setup(self, options):
+        today = datetime.date.today()
+        password = make_password(PASSWORD)
+        existing = set(User.objects.filter(username__startswith=PREFIX).values_list("username", flat=True))
+        User.objects.bulk_create([
+            User(username=f"{PREFIX}{i}", password=password)
+            for i in range(options["users"])
+            if f"{PREFIX}{i}" not in existing
+        ])
+        for c in range(options["clubs"]):
+            club, created = Club.objects.get_or_create(
+                name=f"{PREFIX} {c}", defaults={"description": "load test", "status": "active", "max_member": 10000}
+            )
+            if created:
+                Event.objects.create(
+                    club=club, name=f"{PREFIX} event {c}", description="load test", status="open",
+                    quota=10000, start_date=today, end_date=today + datetime.timedelta(days=1),
+                    payment_methods={"cash": True},
+                )
+        clubs = list(Club.objects.filter(name__startswith=f"{PREFIX} ").order_by("id").values_list("id", flat=True))
+        users = User.objects.filter(username__startswith=PREFIX).values_list("id", "username")
+        # 每個人都是某一個社團的正式成員（才能報名活動），前幾位是幹部
+        memberships = []
+        for user_id, username in users:
+            i = int(username[len(PREFIX):])
+            memberships.append(Membership(
+                user_id=user_id, club_id=clubs[i % len(clubs)], status="accepted",
+                is_manager=i < options["managers"],
+            ))
+        Membership.objects.bulk_create(memberships, ignore_conflicts=True)
+        self.stdout.write(f"Set up {len(users)} users and {len(clubs)} clubs")
+
+    def load_fixture(self, options):
+        memberships = Membership.objects.filter(
+            user__username__startswith=PREFIX, club__name__startswith=f"{PREFIX} ", status="accepted"
+        ).values_list("user__username", "club_id", "is_manager")
+        home_club, managed_club = {}, {}
+        for username, club_id, is_manager in memberships:
+            home_club.setdefault(username, club_id)
+            if is_manager:
+                managed_club[username] = club_id
+        events = dict(
+            Event.objects.filter(club__name__startswith=f"{PREFIX} ", status="open").values_list("club_id", "id")
+        )
+        usernames = [u for u in home_club if home_club[u] in events]
+        users = sorted(
+            User.objects.filter(username__in=usernames).only("id", "username"),
+            key=lambda u: int(u.username[len(PREFIX):]),
+        )
+        if not users:
+            raise CommandError("No load-test data found; run with --setup first.")
+        if len(users) < options["users"]:
+            self.stderr.write(f"Only {len(users)} load-test users exist; run --setup with --users to add more.")
+        return {
+            "users": users,
+            "clubs": sorted(set(home_club.values())),
+            "events": events,
+            "home_club": home_club,
+            "managed_club": managed_club,
+        }
+
+    def build_report(self, options, recorder, elapsed, started_at, users):
+        all_latencies, all_statuses = [], defaultdict(int)
+        routes = {}
+        for route in sorted(recorder.latencies):
+            routes[route] = summarize(recorder.latencies[route], recorder.statuses[route], elapsed)
+            all_latencies += recorder.latencies[route]
+            for status, count in recorder.statuses[route].items():
+                all_statuses[status] += count
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "base_url": options["base_url"],
+            "scenario": options["scenario"],
+            "users": users,
+            "duration_s": round(elapsed, 2),
+            "started_at": started_at.isoformat(),
+            "commit": commit,
+            "total": summarize(all_latencies, all_statuses, elapsed),
+            "routes": routes,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'route':<14}{'count':>8}{'errors':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  status"
+        )
+        rows = list(report["routes"].items()) + [("total", report["total"])]
+        for route, row in rows:
+            numbers = "".join(
+                f"{row[key]:>9.1f}" if row[key] is not None else f"{'-':>9}"
+                for key in ("rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+            )
+            self.stdout.write(
+                f"{route:<14}{row['count']:>8}{row['errors']:>8}{numbers}  "
+                + " ".join(f"{status}:{count}" for status, count in row["status"].items())
+            )
@@ -0,0 +1,60 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.jobs import prune_jobs, work
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the outbox table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--batch-size", type=int, default=10, help="Jobs claimed per round trip.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--once", action="store_true", help="Exit once no jobs are due.")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] > 1:
+            return self.spawn(options)
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        pruned_at = None
+        try:
+            while True:
+                claimed = work(worker_id, options["batch_size"])
+                if not claimed:
+                    # 閒置時順便清掉已完成的舊 job
+                    if pruned_at is None or time.monotonic() - pruned_at >= getattr(settings, "JOB_PRUNE_INTERVAL", 3600):
+                        prune_jobs()
+                        pruned_at = time.monotonic()
+                    if options["once"]:
+                        return
+                    time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+
+    def spawn(self, options):
+        # 每個 worker 是獨立的 manage.py 行程，各自持有 DB 連線
+        command = [
+            sys.executable, sys.argv[0], "runworker",
+            "--batch-size", str(options["batch_size"]),
+            "--poll-interval", str(options["poll_interval"]),
+        ]
+        if options["once"]:
+            command.append("--once")
+        processes = [subprocess.Popen(command) for _ in range(options["concurrency"])]
+        self.stdout.write(f"Started {len(processes)} workers")
+        try:
+            for process in processes:
+                process.wait()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
@@ -0,0 +1,62 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.slowlog import normalize, read_entries
+
+SORT_KEYS = {
+    "total": lambda group: group["total"],
+    "count": lambda group: group["count"],
+    "max": lambda group: group["max"],
+    "mean": lambda group: group["total"] / group["count"],
+}
+
+
+class Command(BaseCommand):
+    help = "Summarize the slow-query log by query fingerprint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=None, help="Log file (default: SLOW_QUERY_LOG and its rotated backups).")
+        parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="total", help="Order of the groups.")
+        parser.add_argument("--limit", type=int, default=20, help="Number of groups to show.")
+        parser.add_argument("--view", default=None, help="Only queries issued by this view.")
+        parser.add_argument("--plans", action="store_true", help="Also print the EXPLAIN output of the slowest sample.")
+
+    def handle(self, *args, **options):
+        groups = {}
+        for entry in read_entries(options["file"] or settings.SLOW_QUERY_LOG):
+            if options["view"] and entry.get("view") != options["view"]:
+                continue
+            duration = entry["duration_ms"]
+            group = groups.setdefault(entry["fingerprint"], {
+                "count": 0, "total": 0.0, "max": 0.0, "durations": [], "views": Counter(), "slowest": entry,
+            })
+            group["count"] += 1
+            group["total"] += duration
+            group["durations"].append(duration)
+            group["views"][entry.get("view") or "-"] += 1
+            if duration >= group["max"]:
+                group["max"] = duration
+                group["slowest"] = entry
+
+        if not groups:
+            self.stdout.write("No slow queries logged.")
+            return
+
+        ordered = sorted(groups.items(), key=lambda item: SORT_KEYS[options["sort"]](item[1]), reverse=True)
+        for fingerprint, group in ordered[:options["limit"]]:
+            durations = sorted(group["durations"])
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+            views = ", ".join(f"{view} ({n})" for view, n in group["views"].most_common(3))
+            self.stdout.write(self.style.MIGRATE_HEADING(fingerprint))
+            self.stdout.write(
+                f"  count={group['count']} total={group['total']:.1f}ms mean={group['total'] / group['count']:.1f}ms "
+                f"p95={p95:.1f}ms max={group['max']:.1f}ms"
+            )
+            self.stdout.write(f"  views: {views}")
+            self.stdout.write(f"  {normalize(group['slowest']['sql'])}")
+            if options["plans"] and group["slowest"].get("plan"):
+                for line in group["slowest"]["plan"]:
+                    self.stdout.write(f"    {line}")
+        self.stdout.write(f"{len(groups)} fingerprints, {sum(g['count'] for g in groups.values())} queries")
@@ -0,0 +1,134 @@
+"""
+Prometheus metrics for the Django process, served at /metrics.
+
+The endpoint answers only requests carrying `Authorization: Bearer
+<METRICS_TOKEN>` (set `bearer_token` in the Prometheus scrape config); a
+client address check would be useless behind a reverse proxy, where every
+request comes from 127.0.0.1. Without METRICS_TOKEN it returns 404.
+
+With several worker processes, point the PROMETHEUS_MULTIPROC_DIR
+environment variable at a directory shared by all of them (and empty it
+before the server starts); /metrics then reports the sum over every
+process.
+"""
+import hmac
+import os
+import threading
+import time
+import weakref
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram, multiprocess
+except ImportError:  # 未安裝時不收集 metrics
+    prometheus_client = None
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .instrumentation import current_request, observe
+
+_connections = weakref.WeakSet()
+_connections_lock = threading.Lock()
+
+if prometheus_client is not None:
+    REQUESTS = Counter(
+        "django_http_requests_total", "HTTP requests by view, method and status.",
+        ["view", "method", "status"],
+    )
+    LATENCY = Histogram(
+        "django_http_request_duration_seconds", "Request latency by view.", ["view"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    DB_QUERIES = Counter("django_db_queries_total", "SQL queries by view.", ["view"])
+    DB_TIME = Counter("django_db_query_duration_seconds_total", "Time spent in SQL by view.", ["view"])
+    CACHE = Counter("django_cache_requests_total", "Cache lookups by cache alias and result.", ["cache", "result"])
+    DB_CONNECTIONS = Gauge(
+        "django_db_connections", "Open database connections.", multiprocess_mode="livesum",
+    )
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match._func_path
+
+
+def record_query(connection, sql, params, many, elapsed, failed):
+    request = current_request.get()
+    stats = getattr(request, "_metrics_stats", None)
+    if stats is not None:
+        stats["queries"] += 1
+        stats["time"] += elapsed
+
+
+def track_connection(sender, connection, **kwargs):
+    with _connections_lock:
+        _connections.add(connection)
+
+
+def open_connections():
+    with _connections_lock:
+        wrappers = list(_connections)
+    return sum(1 for wrapper in wrappers if wrapper.connection is not None)
+
+
+def count_cache(alias, hit):
+    """
+    Count one cache lookup; called where the app reads its caches.
+    """
+    if prometheus_client is not None:
+        CACHE.labels(alias, "hit" if hit else "miss").inc()
+
+
+def install():
+    """
+    Register the SQL observer; called from AppConfig.ready().
+    """
+    if prometheus_client is None:
+        return
+    observe(record_query)
+    connection_created.connect(track_connection)
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Record count, latency, status and SQL usage of every request, labelled
+    by the resolved view.
+    """
+
+    def process_request(self, request):
+        request._metrics_start = time.perf_counter()
+        request._metrics_stats = {"queries": 0, "time": 0.0}
+
+    def process_response(self, request, response):
+        start = getattr(request, "_metrics_start", None)
+        if prometheus_client is None or start is None:
+            return response
+        view = view_label(request)
+        stats = request._metrics_stats
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        LATENCY.labels(view).observe(time.perf_counter() - start)
+        DB_QUERIES.labels(view).inc(stats["queries"])
+        DB_TIME.labels(view).inc(stats["time"])
+        DB_CONNECTIONS.set(open_connections())
+        return response
+
+
+def metrics_view(request):
+    if prometheus_client is None:
+        return HttpResponse("prometheus_client is not installed\n", status=501, content_type="text/plain")
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not token:
+        raise Http404
+    if not hmac.compare_digest(request.META.get("HTTP_AUTHORIZATION", "").encode(), f"Bearer {token}".encode()):
+        return HttpResponse("Unauthorized\n", status=401, content_type="text/plain", headers={"WWW-Authenticate": "Bearer"})
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return HttpResponse(prometheus_client.generate_latest(registry), content_type=prometheus_client.CONTENT_TYPE_LATEST)
@@ -0,0 +1,148 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:  # 未安裝 brotli 時只提供 gzip
+    brotli = None
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+# 已經壓縮過的格式再壓一次只會浪費 CPU
+INCOMPRESSIBLE_TYPES = (
+    'image/',
+    'video/',
+    'audio/',
+    'font/woff',
+    'application/zip',
+    'application/gzip',
+    'application/pdf',
+    'application/vnd.openxmlformats',
+    'text/event-stream',
+)
+
+
+def parse_accept_encoding(header):
+    """
+    Return {coding: qvalue} for an Accept-Encoding header.
+    """
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(header):
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0.0)
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best = max(available, key=lambda c: codings.get(c, wildcard))
+    return best if codings.get(best, wildcard) > 0 else None
+
+
+def brotli_compress_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def abrotli_compress_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def agzip_compress_sequence(sequence):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for item in sequence:
+        data = compressor.compress(item) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with Brotli or gzip, negotiated from Accept-Encoding.
+
+    Responses smaller than COMPRESSION_MIN_SIZE, already-compressed media
+    types and paths under COMPRESSION_EXCLUDE_PATHS (MEDIA_URL by default)
+    are passed through untouched.
+    """
+
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 500)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+        self.exclude_paths = tuple(getattr(settings, 'COMPRESSION_EXCLUDE_PATHS', (settings.MEDIA_URL,)))
+
+    def should_compress(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        # 部分內容的 byte offset 是針對原始檔案，不能再壓縮
+        if response.status_code == 206:
+            return False
+        if request.path.startswith(self.exclude_paths):
+            return False
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith(INCOMPRESSIBLE_TYPES):
+            return False
+        return response.streaming or len(response.content) >= self.min_size
+
+    def process_response(self, request, response):
+        if not self.should_compress(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            content = response.streaming_content
+            if encoding == 'br':
+                if response.is_async:
+                    response.streaming_content = abrotli_compress_sequence(content, self.brotli_quality)
+                else:
+                    response.streaming_content = brotli_compress_sequence(content, self.brotli_quality)
+            elif response.is_async:
+                response.streaming_content = agzip_compress_sequence(content)
+            else:
+                response.streaming_content = compress_sequence(content, max_random_bytes=self.max_random_bytes)
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            # 壓縮後沒有變小就維持原樣
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
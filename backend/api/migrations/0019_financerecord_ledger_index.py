@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_alter_event_is_public'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financerecord',
+            index=models.Index(fields=['club', 'date', 'id'], name='api_finance_club_id_83ad29_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_notification'),
+    ]
+
+    operations = [
+        # 既有資料不知道何時加入，留 NULL（分析時略過），之後建立的才有時間
+        migrations.AddField(
+            model_name='membership',
+            name='created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='membership',
+            name='created_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_sync_updated_at_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('quota', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('planning', '尚未接受報名'), ('open', '接受報名中'), ('closed', '已截止報名'), ('completed', '已結束'), ('cancelled', '已取消')], max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('fee', models.PositiveIntegerField(default=0)),
+                ('payment_methods', models.JSONField(default=dict)),
+                ('is_public', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.club')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedEventParticipation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('payment_method', models.CharField(blank=True, max_length=20, null=True)),
+                ('payment_status', models.CharField(choices=[('pending', '待確認'), ('confirmed', '已確認')], max_length=20)),
+                ('updated_at', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='api.archivedevent')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedMembership',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', '待審核'), ('accepted', '已加入'), ('rejected', '已拒絕'), ('left', '已退出')], max_length=10)),
+                ('is_manager', models.BooleanField(default=False)),
+                ('position', models.CharField(blank=True, max_length=20, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.club')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
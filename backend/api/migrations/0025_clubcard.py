@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Now, NullIf
+
+
+def build_club_cards(apps, schema_editor):
+    # 與 api.cards.card_values 相同的計算，但只用這個版本的模型，
+    # 之後修改 cards.py 不會影響這個 migration
+    Club = apps.get_model("api", "Club")
+    ClubCard = apps.get_model("api", "ClubCard")
+    Membership = apps.get_model("api", "Membership")
+    Event = apps.get_model("api", "Event")
+    ClubCard.objects.bulk_create(
+        [ClubCard(club_id=pk) for pk in Club.objects.values_list("pk", flat=True)],
+        batch_size=1000,
+    )
+    today = django.utils.timezone.localdate()
+    club = Club.objects.filter(pk=OuterRef("club_id"))
+    accepted = Membership.objects.filter(club_id=OuterRef("club_id"), status="accepted")
+    member_count = accepted.order_by().values("club_id").annotate(count=Count("pk")).values("count")
+    president = (
+        accepted.filter(is_manager=True)
+        .annotate(display_name=Coalesce(NullIf("user__name", Value("")), "user__username"))
+        .order_by("id")
+    )
+    upcoming = (
+        Event.objects.filter(club_id=OuterRef("club_id"), start_date__gte=today)
+        .exclude(status="cancelled")
+        .order_by("start_date", "id")
+    )
+    ClubCard.objects.update(
+        name=Subquery(club.values("name")[:1]),
+        description=Subquery(club.values("description")[:1]),
+        status=Subquery(club.values("status")[:1]),
+        image=Subquery(club.values("image")[:1]),
+        max_member=Subquery(club.values("max_member")[:1]),
+        member_count=Coalesce(Subquery(member_count[:1]), 0),
+        president_name=Subquery(president.values("display_name")[:1]),
+        next_event_id=Subquery(upcoming.values("id")[:1]),
+        next_event_name=Subquery(upcoming.values("name")[:1]),
+        next_event_start=Subquery(upcoming.values("start_date")[:1]),
+        refreshed_at=Now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClubCard',
+            fields=[
+                ('club', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='api.club')),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('image', models.CharField(blank=True, max_length=100, null=True)),
+                ('max_member', models.PositiveIntegerField(default=0)),
+                ('member_count', models.PositiveIntegerField(default=0)),
+                ('president_name', models.CharField(blank=True, max_length=150, null=True)),
+                ('next_event_id', models.BigIntegerField(blank=True, null=True)),
+                ('next_event_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('next_event_start', models.DateField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'club'], name='api_clubcar_status_d2addf_idx')],
+            },
+        ),
+        migrations.RunPython(build_club_cards, migrations.RunPython.noop),
+    ]
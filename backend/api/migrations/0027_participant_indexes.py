@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_user_email_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventparticipation',
+            index=models.Index(fields=['event', 'id'], name='api_eventpa_event_i_e58f82_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventparticipation',
+            index=models.Index(fields=['event', 'payment_status', 'id'], name='api_eventpa_event_i_8f49b9_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_throttlebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='is_public',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_finance_months(apps, schema_editor):
+    FinanceRecord = apps.get_model("api", "FinanceRecord")
+    FinanceMonth = apps.get_model("api", "FinanceMonth")
+    months = (
+        FinanceRecord.objects.annotate(month=TruncMonth("date"))
+        .values("club_id", "month")
+        .annotate(net=Sum("amount"))
+        .order_by()
+    )
+    FinanceMonth.objects.bulk_create(
+        (FinanceMonth(club_id=row["club_id"], month=row["month"], net=row["net"]) for row in months.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_tombstone_is_public'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('net', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.club')),
+            ],
+            options={
+                'unique_together': {('club', 'month')},
+            },
+        ),
+        migrations.RunPython(build_finance_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_notification_archived_event'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedmembership',
+            name='created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
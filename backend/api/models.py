@@ -1,5 +1,9 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -7,6 +11,10 @@ class User(AbstractUser):
     name = models.CharField(max_length=100, blank=True, null=True)
     contact = models.CharField(max_length=100, blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        # 批次匯入時以 email 查重（不分大小寫）
+        indexes = [models.Index(Lower("email"), name="api_user_email_lower_idx")]
+
 
 class Club(models.Model):
     name = models.CharField(max_length=255)
@@ -25,6 +33,7 @@ class Club(models.Model):
     max_member = models.PositiveIntegerField()
     foundation_date = models.DateField(auto_now_add=True)
     image = models.ImageField(upload_to="club_images/", blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     @property
     def member_count(self):
@@ -46,6 +55,9 @@ class Membership(models.Model):
     )
     is_manager = models.BooleanField(default=False)
     position = models.CharField(max_length=20, blank=True, null=True)
+    # 申請加入的時間；0022 之前建立的資料沒有紀錄，為 NULL
+    created_at = models.DateTimeField(default=timezone.now, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ("user", "club")
@@ -72,6 +84,7 @@ class Event(models.Model):
     fee = models.PositiveIntegerField(default=0)
     payment_methods = models.JSONField(default=dict)
     is_public = models.BooleanField(default=False, verbose_name="公開活動")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     @property
     def participant_count(self):
@@ -87,9 +100,15 @@ class EventParticipation(models.Model):
         choices=[("pending", "待確認"), ("confirmed", "已確認")],
         default="pending",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ("user", "event")
+        # 參加者列表：WHERE event = ? [AND payment_status = ?] ORDER BY id
+        indexes = [
+            models.Index(fields=["event", "id"]),
+            models.Index(fields=["event", "payment_status", "id"]),
+        ]
 
 
 class FinanceRecord(models.Model):
@@ -97,3 +116,181 @@ class FinanceRecord(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
     date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # 帳目依 (date, id) 排序與分頁
+        indexes = [models.Index(fields=["club", "date", "id"])]
+
+
+class FinanceMonth(models.Model):
+    """
+    社團每月收支合計（帳目餘額的 checkpoint），由 api/ledger.py 維護。
+    """
+    club = models.ForeignKey(Club, on_delete=models.CASCADE)
+    month = models.DateField()  # 當月第一天
+    net = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        unique_together = ("club", "month")
+
+
+class Job(models.Model):
+    """
+    背景工作（transactional outbox），由 `manage.py runworker` 執行。
+    """
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            ("pending", "等待中"),
+            ("running", "執行中"),
+            ("done", "已完成"),
+            ("failed", "失敗"),
+        ],
+        default="pending",
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+
+class ThrottleBucket(models.Model):
+    """
+    限流用的 token bucket（見 api/throttling.py），`tat` 是 bucket 再度全滿的時間（epoch 秒）。
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    tat = models.FloatField(db_index=True)
+
+
+class Notification(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, blank=True, null=True)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, blank=True, null=True)
+    # 活動封存期間改指向封存表，還原時再接回 event
+    archived_event = models.ForeignKey(
+        "ArchivedEvent", on_delete=models.SET_NULL, blank=True, null=True, related_name="notifications"
+    )
+    kind = models.CharField(max_length=50)
+    message = models.CharField(max_length=255)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # 收件匣：WHERE user = ? AND is_read = false ORDER BY id DESC
+        indexes = [models.Index(fields=["user", "is_read", "id"])]
+
+
+class Tombstone(models.Model):
+    """
+    刪除紀錄，讓 sync/ 可以告訴客戶端哪些資料已被刪除。
+    """
+    model = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    club_id = models.BigIntegerField(blank=True, null=True)
+    user_id = models.BigIntegerField(blank=True, null=True)
+    # 被刪除的活動是否公開（非社員也看得到），決定誰會收到這筆刪除
+    is_public = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+# 封存資料表：保留原本的 id，還原時沿用
+
+class ArchivedEvent(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    club = models.ForeignKey(Club, on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    description = models.TextField()
+    quota = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Event._meta.get_field("status").choices)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    fee = models.PositiveIntegerField(default=0)
+    payment_methods = models.JSONField(default=dict)
+    is_public = models.BooleanField(default=False)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+
+class ArchivedEventParticipation(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name="participations")
+    payment_method = models.CharField(max_length=20, blank=True, null=True)
+    payment_status = models.CharField(
+        max_length=20, choices=EventParticipation._meta.get_field("payment_status").choices
+    )
+    updated_at = models.DateTimeField()
+
+
+class ArchivedMembership(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    club = models.ForeignKey(Club, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=Membership._meta.get_field("status").choices)
+    is_manager = models.BooleanField(default=False)
+    position = models.CharField(max_length=20, blank=True, null=True)
+    created_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+
+class ClubCard(models.Model):
+    """
+    社團列表用的預先計算資料（read model），由 api/cards.py 在同一個
+    transaction 中更新。
+    """
+    club = models.OneToOneField(Club, on_delete=models.CASCADE, primary_key=True, related_name="card")
+    name = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, blank=True)
+    image = models.CharField(max_length=100, blank=True, null=True)
+    max_member = models.PositiveIntegerField(default=0)
+    member_count = models.PositiveIntegerField(default=0)
+    president_name = models.CharField(max_length=150, blank=True, null=True)
+    next_event_id = models.BigIntegerField(blank=True, null=True)
+    next_event_name = models.CharField(max_length=255, blank=True, null=True)
+    next_event_start = models.DateField(blank=True, null=True)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # 列表：WHERE status = ? ORDER BY club_id
+        indexes = [models.Index(fields=["status", "club"])]
+
+
+class Blob(models.Model):
+    """
+    以內容 SHA-256 定址的檔案，內容相同的上傳只存一份（見 api/uploads.py）。
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class UploadSession(models.Model):
+    """
+    可續傳的分段上傳；`received` 是已寫入暫存檔的位元組數。
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    blob = models.ForeignKey(Blob, on_delete=models.SET_NULL, blank=True, null=True)
+    # 正在寫入某一段時的租約，同一時間只有一個 request 能寫暫存檔
+    locked_until = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,146 @@
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over `ordering` (prefix a field with
+    '-' for descending order).
+
+    The cursor is a signed token holding the position of the last row of
+    the previous page, so each page is an index range scan instead of an
+    OFFSET over everything before it. Each subclass signs with its own
+    salt, so a cursor from one list can't be replayed on another.
+    """
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    @property
+    def cursor_salt(self):
+        return f'api.pagination.{type(self).__name__}'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = signing.loads(encoded, salt=self.cursor_salt)
+        except signing.BadSignature:
+            raise NotFound('Invalid cursor.')
+        if not isinstance(cursor, dict) or not isinstance(cursor.get('position'), list):
+            raise NotFound('Invalid cursor.')
+        return cursor
+
+    def clean_position(self, position, model):
+        """
+        Check a decoded position against `ordering` and convert each value
+        with its model field, raising NotFound for anything that doesn't fit.
+        """
+        if len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor.')
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            if not isinstance(value, (int, str)) or isinstance(value, bool):
+                raise NotFound('Invalid cursor.')
+            try:
+                cleaned.append(model._meta.get_field(field.lstrip('-')).to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound('Invalid cursor.')
+        return cleaned
+
+    def encode_cursor(self, obj):
+        return signing.dumps(self.get_cursor_data(obj), salt=self.cursor_salt, compress=True)
+
+    def get_cursor_data(self, obj):
+        position = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            position.append(value if isinstance(value, int) else str(value))
+        return {'position': position}
+
+    def filter_after(self, position):
+        # (a, b) > (x, y)  =>  a > x OR (a = x AND b > y)；'-field' 則用 <
+        fields = [field.lstrip('-') for field in self.ordering]
+        condition = Q()
+        for i in reversed(range(len(fields))):
+            lookup = 'lt' if self.ordering[i].startswith('-') else 'gt'
+            prefix = {field: position[j] for j, field in enumerate(fields[:i])}
+            step = Q(**prefix, **{f'{fields[i]}__{lookup}': position[i]})
+            condition = step if not condition else step | condition
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor = self.decode_cursor(request)
+        size = self.get_page_size(request)
+        if self.cursor is not None:
+            position = self.clean_position(self.cursor['position'], queryset.model)
+            queryset = queryset.filter(self.filter_after(position))
+        rows = list(queryset.order_by(*self.ordering)[:size + 1])
+        self.has_next = len(rows) > size
+        self.page = rows[:size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class LedgerPagination(KeysetPagination):
+    """
+    Keyset pagination for a club's ledger in (date, id) order.
+    """
+    ordering = ('date', 'id')
+    page_size = 100
+
+
+class InboxPagination(KeysetPagination):
+    """
+    Newest-first pagination for a user's notifications.
+    """
+    ordering = ('-id',)
+    page_size = 20
+
+
+class ArchivePagination(KeysetPagination):
+    """
+    Most recently created first, for the read-only archive lists.
+    """
+    ordering = ('-id',)
+
+
+class ParticipantPagination(KeysetPagination):
+    """
+    Sign-up order for an event's participant list.
+    """
+    ordering = ('id',)
@@ -1,6 +1,7 @@
 from rest_framework import permissions
 
 from .models import Membership
+from .roles import get_roles
 
 
 class IsAdmin(permissions.BasePermission):
@@ -12,8 +13,16 @@ class IsClubManager(permissions.BasePermission):
     club_id = view.kwargs.get('club_id') or (request.data.get('club') if request.method in ['POST', 'PUT'] else None)
     if not club_id:
       return False
+    try:
+      return request.user.is_authenticated and get_roles(request).is_manager(club_id)
+    except (TypeError, ValueError):
+      return False
+
+class IsEventClubManager(permissions.BasePermission):
+  def has_permission(self, request, view):
+    event_id = view.kwargs.get('event_id')
     return request.user.is_authenticated and Membership.objects.filter(
-      user=request.user, club_id=club_id, is_manager=True
+      user=request.user, club__event__id=event_id, is_manager=True
     ).exists()
 
 class CanViewEvent(permissions.BasePermission):
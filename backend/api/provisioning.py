@@ -0,0 +1,260 @@
+"""
+Bulk user import.
+
+Rows are validated in memory, checked for duplicate usernames/emails with
+a few `IN` lookups (emails compared case-insensitively), their passwords
+hashed in a process pool (PBKDF2 is CPU-bound, so threads wouldn't help)
+and the users inserted with bulk_create. A batch that hits a unique
+constraint anyway (a concurrent signup) is retried row by row, so only
+the conflicting rows are reported.
+
+Imports posted to the API above a few rows are saved under
+USER_IMPORT_ROOT and run by the job worker, so the hashing pool never
+starts inside a web process.
+"""
+import csv
+import io
+import json
+import os
+import re
+import secrets
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .hashing import hash_passwords
+from .models import User
+
+IMPORT_FIELDS = ("username", "email", "password", "name", "contact")
+LOOKUP_BATCH = 500
+IMPORT_NAME_RE = re.compile(r"^import-[0-9a-f]+\.json$")
+
+
+def parse_rows(content, format):
+    """
+    Rows of a CSV (with a header line) or JSON (a list of objects) import
+    file as dicts.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    if format == "json":
+        rows = json.loads(content)
+        if isinstance(rows, dict):
+            rows = rows.get("users")
+        if not isinstance(rows, list):
+            raise ValueError("Expected a list of users.")
+        return rows
+    if format == "csv":
+        return list(csv.DictReader(io.StringIO(content)))
+    raise ValueError(f"Unknown format: {format}")
+
+
+def clean_row(row):
+    """
+    Return (values, errors) for one import row, using the User model fields'
+    own validators. Uniqueness is checked separately for the whole file.
+    """
+    if not isinstance(row, dict):
+        return None, {"non_field_errors": ["Expected an object."]}
+    values, errors = {}, {}
+    for name in IMPORT_FIELDS:
+        value = row.get(name)
+        value = "" if value is None else str(value).strip()
+        if name == "password":
+            if not value:
+                errors[name] = ["This field is required."]
+            values[name] = value
+            continue
+        field = User._meta.get_field(name)
+        if not value and field.null:
+            values[name] = None
+            continue
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as exc:
+            errors[name] = list(exc.messages)
+    if values.get("email"):
+        values["email"] = User.objects.normalize_email(values["email"])
+    return values, errors
+
+
+def existing_values(field, values):
+    """
+    The subset of `values` already used by some user in `field`. Email
+    `values` are expected in lower case and matched case-insensitively.
+    """
+    values = list(values)
+    users = User.objects.all()
+    if field == "email":
+        users = users.annotate(email_lower=Lower("email"))
+        field = "email_lower"
+    found = set()
+    for start in range(0, len(values), LOOKUP_BATCH):
+        batch = values[start:start + LOOKUP_BATCH]
+        found.update(users.filter(**{f"{field}__in": batch}).values_list(field, flat=True))
+    return found
+
+
+def unique_key(field, value):
+    # 同一信箱只差大小寫也視為重複
+    return value.lower() if field == "email" else value
+
+
+def find_duplicates(candidates):
+    """
+    Error dicts, keyed by row number, for rows whose username or email is
+    taken, either by an existing user or by an earlier row of the file.
+    """
+    errors = {}
+    taken = {
+        "username": existing_values("username", {v["username"] for _, v in candidates}),
+        "email": existing_values("email", {v["email"].lower() for _, v in candidates if v["email"]}),
+    }
+    for number, values in candidates:
+        for field in ("username", "email"):
+            value = values[field]
+            if not value:
+                continue
+            key = unique_key(field, value)
+            if key in taken[field]:
+                errors.setdefault(number, {})[field] = [f"A user with that {field} already exists."]
+            taken[field].add(key)
+    return errors
+
+
+def insert_users(numbered_users, batch_size, errors):
+    """
+    bulk_create `numbered_users` ((row number, User) pairs) batch by batch.
+    A batch that violates a unique constraint is inserted again one row
+    at a time and the failing rows are added to `errors`. Returns the
+    number of users created.
+    """
+    created = 0
+    for start in range(0, len(numbered_users), batch_size):
+        batch = numbered_users[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in batch])
+            created += len(batch)
+            continue
+        except IntegrityError:
+            pass
+        # 檢查後到寫入前有其他請求建立了同名帳號，逐列寫入找出衝突的列
+        for number, user in batch:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([user])
+                created += 1
+            except IntegrityError:
+                errors.setdefault(number, {})["non_field_errors"] = [
+                    "Another user with the same username or email was created concurrently."
+                ]
+    return created
+
+
+def import_users(rows, dry_run=False, workers=None, batch_size=500):
+    """
+    Create users from `rows` (dicts with IMPORT_FIELDS). Invalid or
+    duplicate rows are skipped and reported; the rest are created.
+
+    Returns {"created": n, "errors": [{"row": n, "username": ..., "errors": {...}}]}
+    with 1-based row numbers.
+    """
+    max_rows = getattr(settings, "USER_IMPORT_MAX_ROWS", None)
+    if max_rows is not None and len(rows) > max_rows:
+        raise ValueError(f"At most {max_rows} rows can be imported at once.")
+
+    errors, candidates = {}, []
+    for number, row in enumerate(rows, start=1):
+        values, row_errors = clean_row(row)
+        if row_errors:
+            errors[number] = row_errors
+        else:
+            candidates.append((number, values))
+    errors.update(find_duplicates(candidates))
+    candidates = [(number, values) for number, values in candidates if number not in errors]
+
+    created = 0
+    if candidates and not dry_run:
+        hashes = hash_passwords([values["password"] for _, values in candidates], workers)
+        users = [
+            (number, User(**{**values, "password": hashed}))
+            for (number, values), hashed in zip(candidates, hashes)
+        ]
+        created = insert_users(users, batch_size, errors)
+    elif dry_run:
+        created = len(candidates)
+
+    return {
+        "created": created,
+        "dry_run": dry_run,
+        "errors": [
+            {"row": number, "username": row_username(rows[number - 1]), "errors": errors[number]}
+            for number in sorted(errors)
+        ],
+    }
+
+
+def row_username(row):
+    return row.get("username") if isinstance(row, dict) else None
+
+
+def new_import_name():
+    return f"import-{secrets.token_hex(8)}.json"
+
+
+def import_path(name):
+    """
+    Path of a queued import, or None for names that aren't ours.
+    """
+    if not IMPORT_NAME_RE.match(name):
+        return None
+    return os.path.join(settings.USER_IMPORT_ROOT, name)
+
+
+def write_import(name, data):
+    # 檔案含密碼：只給擁有者讀寫，先寫暫存檔再改名
+    path = import_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".part"
+    fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(partial, path)
+
+
+def read_import(name):
+    with open(import_path(name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_import(name, rows):
+    """
+    Store `rows` for run_import() in the job worker.
+    """
+    write_import(name, {"rows": rows})
+
+
+def run_import(name, workers=None):
+    """
+    Import the rows saved under `name` and replace them with the report,
+    so the passwords don't stay on disk. A retried job that already
+    finished returns the stored report instead of importing again.
+    """
+    data = read_import(name)
+    if "report" not in data:
+        data = {"report": import_users(data["rows"], workers=workers)}
+        write_import(name, data)
+    return data["report"]
+
+
+def load_report(name):
+    """
+    The report of a finished import, or None.
+    """
+    path = import_path(name)
+    if path is None or not os.path.exists(path):
+        return None
+    return read_import(name).get("report")
@@ -0,0 +1,235 @@
+"""
+Live push of membership and participation changes over Server-Sent Events.
+
+Serve the project through ASGI (e.g. `uvicorn backend.asgi:application`)
+so each open stream is a coroutine rather than a worker thread. The
+default broker only reaches subscribers in the same process; set
+PUSH_BROKER to another implementation of `subscribe`/`unsubscribe`/
+`publish`/`has_subscribers` for multi-process deployments.
+
+EventSource can't send an Authorization header, so browsers first POST to
+clubs/<id>/stream/ticket/ for a short-lived ticket valid only for that
+club's stream, and open `stream/?ticket=...`. A JWT never appears in a URL
+(and so never in an access log).
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .models import EventParticipation, Membership, User
+
+TICKET_SALT = "api.push.stream"
+
+
+class Subscription:
+    def __init__(self, club_id, user, full_access):
+        self.club_id = club_id
+        self.user = user
+        self.user_id = user.pk
+        self.full_access = full_access
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=getattr(settings, "PUSH_QUEUE_SIZE", 100))
+        self.overflowed = False
+
+    def deliver(self, message):
+        # 在 subscriber 的 event loop 中執行
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def accepts(self, message):
+        # 尚未加入的申請者只收得到自己的社員狀態變更
+        return self.full_access or (message["type"] == "membership" and message["user"] == self.user_id)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.club_id].add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.club_id].discard(subscription)
+            if not self._subscribers[subscription.club_id]:
+                del self._subscribers[subscription.club_id]
+
+    def has_subscribers(self, club_id):
+        return bool(self._subscribers.get(club_id))
+
+    def publish(self, club_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(club_id, ()))
+        for subscription in subscribers:
+            if subscription.accepts(message):
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, "PUSH_BROKER", "api.push.InProcessBroker"))()
+
+
+def publish_membership(membership, object_id, deleted=False):
+    # object_id 要在刪除前取得：delete() 之後 Django 會把 pk 設成 None
+    broker = get_broker()
+    if not broker.has_subscribers(membership.club_id):
+        return
+    broker.publish(membership.club_id, {
+        "type": "membership",
+        "op": "delete" if deleted else "save",
+        "id": object_id,
+        "user": membership.user_id,
+        "status": membership.status,
+        "is_manager": membership.is_manager,
+        "accepted": Membership.objects.filter(club_id=membership.club_id, status="accepted").count(),
+    })
+
+
+def participation_message(participation, object_id, participants, deleted=False):
+    return {
+        "type": "participation",
+        "op": "delete" if deleted else "save",
+        "id": object_id,
+        "event": participation.event_id,
+        "user": participation.user_id,
+        "payment_status": participation.payment_status,
+        "participants": participants,
+    }
+
+
+def publish_participation(participation, object_id, club_id, deleted=False):
+    broker = get_broker()
+    if not broker.has_subscribers(club_id):
+        return
+    participants = EventParticipation.objects.filter(event_id=participation.event_id).count()
+    broker.publish(club_id, participation_message(participation, object_id, participants, deleted))
+
+
+def publish_participations(participations, event_id, club_id):
+    """
+    Publish saves of several participations of one event, e.g. after a
+    bulk QuerySet.update(), which sends no post_save signals.
+    """
+    broker = get_broker()
+    if not broker.has_subscribers(club_id):
+        return
+    participants = EventParticipation.objects.filter(event_id=event_id).count()
+    for participation in participations:
+        broker.publish(club_id, participation_message(participation, participation.pk, participants))
+
+
+def issue_ticket(user, club_id):
+    """
+    A signed ticket letting `user` open the stream of `club_id` for the
+    next PUSH_TICKET_SECONDS.
+    """
+    return signing.dumps({"user": user.pk, "club": club_id}, salt=TICKET_SALT)
+
+
+def authenticate(request, club_id):
+    """
+    User from a JWT in the Authorization header (non-browser clients) or
+    from a stream ticket in `?ticket=`.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header:
+        raw_token = auth.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return auth.get_user(auth.get_validated_token(raw_token))
+    ticket = request.GET.get("ticket")
+    if not ticket:
+        return None
+    try:
+        data = signing.loads(ticket, salt=TICKET_SALT, max_age=getattr(settings, "PUSH_TICKET_SECONDS", 60))
+    except signing.BadSignature:
+        raise AuthenticationFailed("Invalid or expired stream ticket.")
+    if data.get("club") != club_id:
+        raise AuthenticationFailed("Invalid or expired stream ticket.")
+    user = User.objects.filter(pk=data.get("user"), is_active=True).first()
+    if user is None:
+        raise AuthenticationFailed("Invalid or expired stream ticket.")
+    return user
+
+
+def get_access(user, club_id):
+    """
+    (subscribed, full_access) for `user` on `club_id`.
+    """
+    if user.is_admin:
+        return True, True
+    membership = Membership.objects.filter(user=user, club_id=club_id).first()
+    if membership is None or membership.status in ("rejected", "left"):
+        return False, False
+    return True, membership.status == "accepted"
+
+
+def format_event(message):
+    return f"event: {message['type']}\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+
+async def stream(subscription):
+    broker = get_broker()
+    broker.subscribe(subscription)
+    keepalive = getattr(settings, "PUSH_KEEPALIVE_SECONDS", 15)
+    try:
+        yield "retry: 3000\n\n"
+        while not subscription.overflowed:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if message["type"] == "membership" and message["user"] == subscription.user_id:
+                # 自己的社員資格變了：重新判斷權限，被移除時結束串流
+                subscribed, subscription.full_access = await sync_to_async(get_access)(
+                    subscription.user, subscription.club_id
+                )
+                if not subscribed:
+                    yield format_event(message)
+                    yield "event: revoked\ndata: {}\n\n"
+                    return
+            # 權限在訊息排入佇列後可能已經改變，送出前再檢查一次
+            if subscription.accepts(message):
+                yield format_event(message)
+        # 客戶端太慢跟不上，要求重新連線並重新載入
+        yield "event: reset\ndata: {}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def club_stream(request, club_id):
+    try:
+        user = await sync_to_async(authenticate)(request, club_id)
+    except (AuthenticationFailed, InvalidToken) as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=401)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    subscribed, full_access = await sync_to_async(get_access)(user, club_id)
+    if not subscribed:
+        return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+
+    response = StreamingHttpResponse(
+        stream(Subscription(club_id, user, full_access)),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,51 @@
+try:
+    import orjson
+except ImportError:  # 未安裝 orjson 時退回標準 json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack 為選用功能
+    msgpack = None
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+# 日期與 Decimal 交給 DRF 的 encoder，輸出格式與原本的 JSONRenderer 一致
+_encoder = encoders.JSONEncoder()
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Falls back to the stock renderer for indented output (browsable API,
+    `; indent=4`) and when orjson is unavailable.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson 不會跳脫 \u2028/\u2029，與 JSONRenderer 同樣處理
+        ret = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders the response as MessagePack for `Accept: application/msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True, datetime=False)
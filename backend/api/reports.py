@@ -0,0 +1,203 @@
+"""
+Cross-club monthly finance report.
+
+One grouped query returns a row per (club, month) in range. Records
+dated before the range fold into a single opening group per club, so the
+closing balance of every month is a running sum over the ordered rows,
+computed while they stream out as CSV or XLSX. Months without records
+are filled in with zero totals while streaming.
+"""
+import csv
+import os
+import re
+import secrets
+import tempfile
+from decimal import Decimal
+
+try:
+    import openpyxl
+except ImportError:  # 未安裝時只能輸出 CSV
+    openpyxl = None
+
+from django.conf import settings
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .ledger import month_start, next_month
+from .models import FinanceRecord
+
+COLUMNS = ["club_id", "club", "month", "records", "income", "expense", "net", "opening_balance", "closing_balance"]
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+CENT = Decimal("0.01")
+REPORT_NAME_RE = re.compile(r"^finance-[\w-]+\.(csv|xlsx)$")
+# 開頭是這些字元的文字會被試算表當成公式執行
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def report_records(date_to=None, club_ids=None):
+    records = FinanceRecord.objects.all()
+    if date_to:
+        records = records.filter(date__lte=date_to)
+    if club_ids:
+        records = records.filter(club_id__in=club_ids)
+    return records
+
+
+def monthly_totals(date_from=None, date_to=None, club_ids=None):
+    """
+    Grouped (club, month) totals ordered by club and month. With
+    `date_from`, earlier records are grouped under month None, which sorts
+    first within each club.
+    """
+    month = TruncMonth("date")
+    if date_from:
+        month = Case(When(date__lt=date_from, then=Value(None)), default=month)
+    return (
+        report_records(date_to, club_ids).annotate(month=month)
+        .values("club_id", "club__name", "month")
+        .annotate(
+            records=Count("id"),
+            income=Sum("amount", filter=Q(amount__gt=0), default=Decimal(0)),
+            expense=Sum("amount", filter=Q(amount__lt=0), default=Decimal(0)),
+            net=Sum("amount"),
+        )
+        .order_by("club__name", "club_id", F("month").asc(nulls_first=True))
+    )
+
+
+def report_row(club, month, records, income, expense, opening, closing):
+    return [
+        *club, month.strftime("%Y-%m"), records,
+        *(value.quantize(CENT) for value in (income, expense, closing - opening, opening, closing)),
+    ]
+
+
+def empty_months(club, month, stop, balance):
+    # 沒有紀錄的月份也要列出，收支為 0、餘額沿用
+    while month < stop:
+        yield report_row(club, month, 0, Decimal(0), Decimal(0), balance, balance)
+        month = next_month(month)
+
+
+def report_rows(date_from=None, date_to=None, club_ids=None):
+    """
+    Report rows (lists in COLUMNS order) with opening and closing
+    balances carried per club, one for every month from `date_from` (or
+    the club's first record) to `date_to` (or the latest record).
+    """
+    if date_to:
+        last = month_start(date_to)
+    else:
+        latest = report_records(club_ids=club_ids).aggregate(latest=Max("date"))["latest"]
+        if latest is None:
+            return
+        last = month_start(latest)
+    stop = next_month(last)
+
+    club, month, balance = None, None, Decimal(0)
+    for row in monthly_totals(date_from, date_to, club_ids).iterator(chunk_size=2000):
+        if club is None or row["club_id"] != club[0]:
+            if club is not None:
+                yield from empty_months(club, month, stop, balance)
+            club, balance = (row["club_id"], row["club__name"]), Decimal(0)
+            month = month_start(date_from) if date_from else row["month"]
+        if row["month"] is None:
+            # 區間之前的紀錄只用來算期初餘額
+            balance = row["net"]
+            continue
+        yield from empty_months(club, month, row["month"], balance)
+        opening, balance = balance, balance + row["net"]
+        yield report_row(club, row["month"], row["records"], row["income"], row["expense"], opening, balance)
+        month = next_month(row["month"])
+    if club is not None:
+        yield from empty_months(club, month, stop, balance)
+
+
+def escape_cell(value):
+    """
+    Text cells (club names are user input) that a spreadsheet would read
+    as a formula are prefixed with an apostrophe. Numbers are left alone.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def escape_row(row):
+    return [escape_cell(value) for value in row]
+
+
+class Echo:
+    # csv.writer 寫入後直接把該行交給 StreamingHttpResponse
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield "\ufeff"  # 讓 Excel 以 UTF-8 開啟
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(escape_row(row))
+
+
+def write_report(rows, format, f):
+    """
+    Write `rows` to the binary file `f` as CSV or XLSX.
+    """
+    if format == "csv":
+        for line in csv_lines(rows):
+            f.write(line.encode("utf-8"))
+        return
+    if openpyxl is None:
+        raise ValueError("XLSX reports need openpyxl.")
+    # write-only workbook 不會把整張表留在記憶體
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Finance")
+    sheet.append(COLUMNS)
+    for row in rows:
+        sheet.append(escape_row(row))
+    workbook.save(f)
+
+
+def xlsx_file(rows):
+    """
+    A temporary file holding the XLSX report, positioned at the start.
+    The zip container can only be written whole, so it is spooled first.
+    """
+    f = tempfile.TemporaryFile()
+    write_report(rows, "xlsx", f)
+    f.seek(0)
+    return f
+
+
+def new_report_name(format):
+    # 檔名含隨機字串，不能被猜到
+    return f"finance-{timezone.now():%Y%m%d%H%M%S}-{secrets.token_hex(8)}.{format}"
+
+
+def report_path(name):
+    """
+    Path of a generated report, or None for names that aren't ours.
+    """
+    if not REPORT_NAME_RE.match(name):
+        return None
+    return os.path.join(settings.REPORT_ROOT, name)
+
+
+def save_report(name, rows):
+    """
+    Write a report into REPORT_ROOT atomically (to a temporary name, then
+    renamed), so a half-written file is never served.
+    """
+    path = report_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".part"
+    with open(partial, "wb") as f:
+        write_report(rows, name.rsplit(".", 1)[1], f)
+    os.replace(partial, path)
+    return path
@@ -0,0 +1,94 @@
+from .models import EventParticipation, Membership
+
+
+class RoleResolver:
+    """
+    Per-request cache of club roles.
+
+    The request user's memberships are loaded in one query the first time
+    any of them is needed; accepted managers of a club are loaded once per
+    club. Permissions and serializers then answer from memory.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._memberships = None
+        self._managers = {}
+        self._participations = None
+
+    def memberships(self):
+        """
+        {club_id: Membership} for the request user.
+        """
+        if self._memberships is None:
+            if self.user is None or not self.user.is_authenticated:
+                self._memberships = {}
+            else:
+                self._memberships = {m.club_id: m for m in Membership.objects.filter(user=self.user)}
+        return self._memberships
+
+    def membership(self, club_id):
+        return self.memberships().get(int(club_id))
+
+    def is_member(self, club_id):
+        return self.membership(club_id) is not None
+
+    def is_manager(self, club_id):
+        membership = self.membership(club_id)
+        return membership is not None and membership.is_manager
+
+    def participations(self):
+        """
+        {event_id: EventParticipation} for the request user.
+        """
+        if self._participations is None:
+            if self.user is None or not self.user.is_authenticated:
+                self._participations = {}
+            else:
+                self._participations = {
+                    p.event_id: p for p in EventParticipation.objects.filter(user=self.user).select_related("user")
+                }
+        return self._participations
+
+    def participation(self, event_id):
+        return self.participations().get(int(event_id))
+
+    def managers(self, club_id):
+        """
+        Ids of the accepted managers of `club_id`.
+        """
+        club_id = int(club_id)
+        if club_id not in self._managers:
+            self._managers[club_id] = set(
+                Membership.objects.filter(club_id=club_id, is_manager=True, status="accepted")
+                .values_list("user_id", flat=True)
+            )
+        return self._managers[club_id]
+
+
+def get_roles(request):
+    """
+    The RoleResolver of `request`, created on first use. It is stored on
+    the underlying HttpRequest so every DRF wrapper shares it.
+    """
+    user = request.user  # DRF 的 request.user 會先完成驗證
+    request = getattr(request, "_request", request)
+    roles = getattr(request, "roles", None)
+    if roles is None or roles.user is not user:
+        roles = RoleResolver(user)
+        request.roles = roles
+    return roles
+
+
+def context_roles(context):
+    """
+    The RoleResolver passed in a serializer context. Serializers used
+    without one get a resolver of their own (shared by nested serializers
+    through the same context).
+    """
+    roles = context.get("roles")
+    if roles is None:
+        request = context.get("request")
+        roles = get_roles(request) if request is not None else RoleResolver(None)
+        context["roles"] = roles
+    return roles
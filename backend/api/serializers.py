@@ -1,7 +1,14 @@
+from django.conf import settings
+from django.db.models import Count, Q
 from rest_framework import serializers
 
-from .models import (Club, Event, EventParticipation, FinanceRecord,
-                     Membership, User)
+from .models import (ArchivedEvent, ArchivedEventParticipation,
+                     ArchivedMembership, Club, ClubCard, Event,
+                     EventParticipation, FinanceRecord, Membership,
+                     Notification, UploadSession, User)
+from .reports import FORMATS as REPORT_FORMATS
+from .reports import openpyxl
+from .roles import context_roles
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -87,19 +94,67 @@ class MembershipSerializer(serializers.ModelSerializer):
         ]
 
 
+def with_participant_counts(queryset):
+    """
+    Annotate events with the counts EventSerializer reports, so a list
+    doesn't count per event.
+    """
+    return queryset.annotate(
+        participant_total=Count("eventparticipation"),
+        confirmed_total=Count("eventparticipation", filter=Q(eventparticipation__payment_status="confirmed")),
+    )
+
+
 class EventSerializer(serializers.ModelSerializer):
+    # 參加者名單改由 events/<id>/participants/ 分頁取得，這裡只回傳人數與自己的報名
     participants = serializers.SerializerMethodField()
+    participant_count = serializers.SerializerMethodField()
+    confirmed_count = serializers.SerializerMethodField()
+    my_participation = serializers.SerializerMethodField()
     my_membership = serializers.SerializerMethodField()
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not getattr(settings, "EVENT_EMBED_PARTICIPANTS", False):
+            fields.pop("participants")
+        return fields
+
     def get_participants(self, obj):
-        participations = obj.eventparticipation_set.all()
-        return EventParticipationSerializer(participations, many=True).data
+        # 已淘汰，只在 EVENT_EMBED_PARTICIPANTS 開啟時回傳，內容與淘汰前相同（完整名單）；
+        # 依身分限制的名單只在 events/<id>/participants/
+        loaded = self.context.setdefault("event_participants", {})
+        if obj.id not in loaded:
+            # 列表中的活動一次查完，不逐筆查詢
+            events = self.parent.instance if isinstance(self.parent, serializers.ListSerializer) else [obj]
+            ids = {event.id for event in events} | {obj.id}
+            loaded.update((event_id, []) for event_id in ids)
+            participations = EventParticipation.objects.filter(event_id__in=ids).select_related("user")
+            for participation in participations.order_by("id"):
+                loaded[participation.event_id].append(participation)
+        participations = loaded[obj.id]
+        for participation in participations:
+            participation.event = obj
+        return EventParticipationSerializer(participations, many=True, context=self.context).data
+
+    def get_participant_count(self, obj):
+        if hasattr(obj, "participant_total"):
+            return obj.participant_total
+        return obj.eventparticipation_set.count()
+
+    def get_confirmed_count(self, obj):
+        if hasattr(obj, "confirmed_total"):
+            return obj.confirmed_total
+        return obj.eventparticipation_set.filter(payment_status="confirmed").count()
+
+    def get_my_participation(self, obj):
+        participation = context_roles(self.context).participation(obj.id)
+        if participation is None:
+            return None
+        participation.event = obj
+        return EventParticipationSerializer(participation, context=self.context).data
 
     def get_my_membership(self, obj):
-        user = self.context.get("request").user
-        if not user or user.is_anonymous:
-            return None
-        membership = Membership.objects.filter(user=user, club=obj.club).first()
+        membership = context_roles(self.context).membership(obj.club_id)
         if not membership:
             return None
         return {
@@ -123,6 +178,9 @@ class EventSerializer(serializers.ModelSerializer):
             "club",
             "payment_methods",
             "participants",
+            "participant_count",
+            "confirmed_count",
+            "my_participation",
             "my_membership",
             "is_public",
         ]
@@ -143,7 +201,7 @@ class ClubSerializer(serializers.ModelSerializer):
     def get_activities(self, obj):
         # 傳遞 context，讓 EventSerializer 能取得 request
         return EventSerializer(
-            obj.event_set.all(), many=True, context=self.context
+            with_participant_counts(obj.event_set.all()), many=True, context=self.context
         ).data
 
     def get_memberCount(self, obj):
@@ -184,9 +242,7 @@ class EventParticipationSerializer(serializers.ModelSerializer):
 
     def get_is_manager(self, obj):
         # 判斷該 user 是否為該活動所屬社團的幹部
-        return Membership.objects.filter(
-            user=obj.user, club=obj.event.club, is_manager=True, status="accepted"
-        ).exists()
+        return obj.user_id in context_roles(self.context).managers(obj.event.club_id)
 
     class Meta:
         model = EventParticipation
@@ -209,6 +265,41 @@ class FinanceRecordSerializer(serializers.ModelSerializer):
         fields = ["id", "club", "amount", "description", "date"]
 
 
+class FinanceLedgerSerializer(FinanceRecordSerializer):
+    balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta(FinanceRecordSerializer.Meta):
+        fields = FinanceRecordSerializer.Meta.fields + ["balance"]
+
+
+class PaymentReconcileSerializer(serializers.Serializer):
+    payment_status = serializers.ChoiceField(choices=["pending", "confirmed"])
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    payment_method = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if "ids" not in attrs and "payment_method" not in attrs:
+            raise serializers.ValidationError("ids 或 payment_method 至少需要一個")
+        return attrs
+
+
+class FinanceReportSerializer(serializers.Serializer):
+    club = serializers.ListField(child=serializers.IntegerField(), required=False)
+    output = serializers.ChoiceField(choices=list(REPORT_FORMATS), default="csv")
+
+    def get_fields(self):
+        # 與帳目列表相同的 from / to 參數（Python 保留字，不能寫成類別屬性）
+        fields = super().get_fields()
+        fields["from"] = serializers.DateField(required=False, allow_null=True)
+        fields["to"] = serializers.DateField(required=False, allow_null=True)
+        return fields
+
+    def validate_output(self, value):
+        if value == "xlsx" and openpyxl is None:
+            raise serializers.ValidationError("XLSX 報表需要安裝 openpyxl")
+        return value
+
+
 class ParticipationSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source="user.username", read_only=True)
     name = serializers.CharField(source="user.name", read_only=True)
@@ -228,3 +319,116 @@ class ParticipationSerializer(serializers.ModelSerializer):
             "payment_status",
             "is_manager",
         ]
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ["id", "kind", "message", "club", "event", "is_read", "created_at"]
+        read_only_fields = fields
+
+
+class NotificationReadSerializer(serializers.Serializer):
+    # 未指定 ids 時全部標為已讀
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+
+
+class ArchivedEventSerializer(serializers.ModelSerializer):
+    participant_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ArchivedEvent
+        fields = [
+            "id", "club", "name", "description", "quota", "status", "start_date", "end_date",
+            "fee", "payment_methods", "is_public", "archived_at", "participant_count",
+        ]
+        read_only_fields = fields
+
+
+class ArchivedEventParticipationSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username", read_only=True)
+    name = serializers.CharField(source="user.name", read_only=True)
+
+    class Meta:
+        model = ArchivedEventParticipation
+        fields = ["id", "user", "username", "name", "payment_method", "payment_status"]
+        read_only_fields = fields
+
+
+class ArchivedEventDetailSerializer(ArchivedEventSerializer):
+    participations = ArchivedEventParticipationSerializer(many=True, read_only=True)
+
+    class Meta(ArchivedEventSerializer.Meta):
+        fields = ArchivedEventSerializer.Meta.fields + ["participations"]
+
+
+class ArchivedMembershipSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username", read_only=True)
+    name = serializers.CharField(source="user.name", read_only=True)
+
+    class Meta:
+        model = ArchivedMembership
+        fields = [
+            "id", "user", "username", "name", "club", "status", "is_manager", "position",
+            "created_at", "archived_at",
+        ]
+        read_only_fields = fields
+
+
+class ClubCardSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="club_id")
+    image = serializers.SerializerMethodField()
+    presidentName = serializers.CharField(source="president_name")
+    memberCount = serializers.SerializerMethodField()
+    nextEvent = serializers.SerializerMethodField()
+
+    def get_image(self, obj):
+        if not obj.image:
+            return None
+        url = settings.MEDIA_URL + obj.image
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+    def get_memberCount(self, obj):
+        return {"current": obj.member_count, "max": obj.max_member}
+
+    def get_nextEvent(self, obj):
+        if obj.next_event_id is None:
+            return None
+        return {"id": obj.next_event_id, "name": obj.next_event_name, "start_date": obj.next_event_start}
+
+    class Meta:
+        model = ClubCard
+        fields = ["id", "name", "description", "status", "image", "presidentName", "memberCount", "nextEvent"]
+        read_only_fields = fields
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$", required=False, allow_blank=True)
+    offset = serializers.IntegerField(source="received", read_only=True)
+    complete = serializers.SerializerMethodField()
+    blob = serializers.SerializerMethodField()
+
+    def get_complete(self, obj):
+        return obj.blob_id is not None
+
+    def get_blob(self, obj):
+        if obj.blob is None:
+            return None
+        request = self.context.get("request")
+        url = obj.blob.file.url
+        return {
+            "sha256": obj.blob.sha256,
+            "url": request.build_absolute_uri(url) if request else url,
+            "content_type": obj.blob.content_type,
+            "width": obj.blob.width,
+            "height": obj.blob.height,
+        }
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "filename", "size", "sha256", "offset", "complete", "blob"]
+
+
+class ClubImageSerializer(serializers.Serializer):
+    upload = serializers.UUIDField()
@@ -0,0 +1,191 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from django.utils import timezone
+
+from .analytics import invalidate_club_analytics
+from .cards import ensure_club_card, next_refresh_time, refresh_club_cards
+from .jobs import enqueue_once
+from .ledger import refresh_finance_months
+from .models import (Club, Event, EventParticipation, FinanceRecord,
+                     Membership, Tombstone, User)
+from .push import publish_membership, publish_participation
+from .sync import HIDDEN_EVENT
+
+
+def club_id_of(instance, event_clubs=None):
+    if isinstance(instance, EventParticipation):
+        # event_clubs：同一批刪除裡已查過的活動，不必每筆再查
+        if event_clubs is not None and instance.event_id in event_clubs:
+            return event_clubs[instance.event_id]
+        club_id = Event.objects.filter(id=instance.event_id).values_list("club_id", flat=True).first()
+        if event_clubs is not None:
+            event_clubs[instance.event_id] = club_id
+        return club_id
+    return instance.club_id
+
+
+_local = threading.local()
+
+
+class DeleteBatch:
+    """
+    Follow-up work for the rows deleted in one transaction. A cascade
+    sends post_delete once per row; the affected clubs are collected and
+    the tombstones bulk-inserted by a single on_commit callback.
+    """
+
+    def __init__(self):
+        self.card_club_ids = set()
+        self.club_ids = set()
+        self.tombstones = []
+        self.messages = []
+        self.event_clubs = {}
+
+    def flush(self):
+        if getattr(_local, "batch", None) is self:
+            _local.batch = None
+        with transaction.atomic():
+            Tombstone.objects.bulk_create(Tombstone(**values) for values in self.tombstones)
+            if self.card_club_ids:
+                refresh_club_cards(list(self.card_club_ids))
+        for club_id in self.club_ids:
+            invalidate_club_analytics(club_id)
+        for publish, args in self.messages:
+            publish(*args)
+
+
+def delete_batch():
+    """
+    The batch of the current transaction (savepoint), registering its
+    on_commit callback the first time.
+    """
+    connection = transaction.get_connection()
+    batch = getattr(_local, "batch", None)
+    # savepoint 被 rollback 時 Django 會丟掉其中的 callback，這時要換一批
+    savepoint_ids = set(connection.savepoint_ids)
+    if batch is None or not any(
+        func == batch.flush and sids == savepoint_ids for sids, func, _ in connection.run_on_commit
+    ):
+        batch = _local.batch = DeleteBatch()
+        if connection.in_atomic_block:
+            transaction.on_commit(batch.flush)
+    return batch
+
+
+def flush_outside_transaction(batch):
+    # 不在 transaction 裡（autocommit）沒有 commit 可等，直接處理
+    if not transaction.get_connection().in_atomic_block:
+        batch.flush()
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=EventParticipation)
+@receiver(post_save, sender=Membership)
+def club_data_changed(sender, instance, **kwargs):
+    club_id = club_id_of(instance)
+    if club_id is None:
+        return
+    if sender is not EventParticipation:
+        refresh_club_cards([club_id])
+
+    # commit 之後才清除快取與推播，避免其他 request 在 commit 前讀到舊資料
+    def after_commit():
+        invalidate_club_analytics(club_id)
+        if sender is Membership:
+            publish_membership(instance, instance.pk, False)
+        elif sender is EventParticipation:
+            publish_participation(instance, instance.pk, club_id, False)
+
+    transaction.on_commit(after_commit)
+
+
+@receiver(post_delete, sender=Club)
+@receiver(post_delete, sender=Membership)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=EventParticipation)
+@receiver(post_delete, sender=FinanceRecord)
+def club_data_deleted(sender, instance, **kwargs):
+    batch = delete_batch()
+    if isinstance(instance, Club):
+        club_id = instance.pk
+    else:
+        club_id = club_id_of(instance, batch.event_clubs)
+    # 給 sync/ 回報刪除；delete() 結束後 pk 會被設成 None，要先記下
+    object_id = instance.pk
+    batch.tombstones.append({
+        "model": sender._meta.model_name,
+        "object_id": object_id,
+        "club_id": club_id,
+        "user_id": getattr(instance, "user_id", None),
+        "is_public": getattr(instance, "is_public", False),
+    })
+    if club_id is not None and sender in (Membership, Event, EventParticipation):
+        batch.club_ids.add(club_id)
+        if sender is not EventParticipation:
+            batch.card_club_ids.add(club_id)
+        if sender is Membership:
+            batch.messages.append((publish_membership, (instance, object_id, True)))
+        elif sender is EventParticipation:
+            batch.messages.append((publish_participation, (instance, object_id, club_id, True)))
+    flush_outside_transaction(batch)
+
+
+@receiver(post_save, sender=Club)
+def club_saved(sender, instance, **kwargs):
+    ensure_club_card(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def schedule_card_refresh(sender, instance, **kwargs):
+    if instance.start_date >= timezone.localdate():
+        # 每次儲存活動都會走到這裡，同一時間點的刷新只排一次
+        enqueue_once("club.refresh_card", run_at=next_refresh_time(instance), club_id=instance.club_id)
+
+
+@receiver(pre_save, sender=Event)
+def event_saving(sender, instance, **kwargs):
+    # 記下修改前是否公開，改為不公開時非社員要從本機刪掉
+    instance._was_public = bool(instance.pk) and Event.objects.filter(pk=instance.pk, is_public=True).exists()
+
+
+@receiver(post_save, sender=Event)
+def event_visibility_changed(sender, instance, created, **kwargs):
+    was_public = getattr(instance, "_was_public", False)
+    if was_public and not instance.is_public:
+        Tombstone.objects.create(model=HIDDEN_EVENT, object_id=instance.pk, club_id=instance.club_id)
+    elif instance.is_public and not was_public and not created:
+        # 又改回公開：活動會以更新送出，不能再被之前的刪除蓋掉
+        Tombstone.objects.filter(model=HIDDEN_EVENT, object_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # 社長改名時更新卡片上的 presidentName（登入只更新 last_login，略過）
+    if created or (update_fields is not None and not {"name", "username"} & set(update_fields)):
+        return
+    refresh_club_cards(
+        Membership.objects.filter(user=instance, is_manager=True, status="accepted").values("club_id")
+    )
+
+
+@receiver(pre_save, sender=FinanceRecord)
+def finance_record_saving(sender, instance, **kwargs):
+    # 記下修改前的社團與日期，移到別的月份時兩個月都要重算
+    instance._ledger_before = (
+        FinanceRecord.objects.filter(pk=instance.pk).values_list("club_id", "date").first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=FinanceRecord)
+@receiver(post_delete, sender=FinanceRecord)
+def finance_record_changed(sender, instance, **kwargs):
+    before = getattr(instance, "_ledger_before", None)
+    if before is not None and before[0] != instance.club_id:
+        refresh_finance_months(before[0], [before[1]])
+        before = None
+    refresh_finance_months(instance.club_id, [instance.date] + ([before[1]] if before else []))
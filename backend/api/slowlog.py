@@ -0,0 +1,173 @@
+"""
+Slow-query log.
+
+Every SQL statement slower than SLOW_QUERY_MS is sampled (with probability
+SLOW_QUERY_SAMPLE_RATE) and written as one JSON line to SLOW_QUERY_LOG,
+with its parameters, duration, the view that ran it and the database's
+EXPLAIN output. `manage.py slowqueries` summarizes the log by fingerprint.
+
+The file is rotated by size; with several worker processes give each its
+own file (e.g. include the pid in SLOW_QUERY_LOG), since RotatingFileHandler
+doesn't coordinate rollover across processes.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import threading
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .instrumentation import current_request, observe
+from .metrics import view_label
+
+logger = logging.getLogger("api.slowlog")
+
+# EXPLAIN 本身也會經過 wrapper，避免遞迴
+_explaining = contextvars.ContextVar("slowlog_explaining", default=False)
+
+_handler_lock = threading.Lock()
+MAX_PARAM_LENGTH = 200
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?|'\?'|\d+)\s*,?)+\)", re.IGNORECASE)
+SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """
+    SQL with literals and placeholders replaced by `?` and IN lists
+    collapsed, so queries that differ only in their values compare equal.
+    """
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def get_logger():
+    # 第一次寫入時才建立檔案 handler
+    if not logger.handlers:
+        with _handler_lock:
+            if not logger.handlers:
+                path = str(settings.SLOW_QUERY_LOG)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    path,
+                    maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                    backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+                    encoding="utf-8",
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+    return logger
+
+
+def short_param(value):
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + "..."
+
+
+def explain(connection, sql, params):
+    """
+    The query plan of `sql` as a list of lines, or None when the backend
+    can't explain it. Only reads are explained, inside a savepoint so a
+    failure can't break the caller's transaction.
+    """
+    if not connection.features.supports_explaining_query_execution:
+        return None
+    if sql.lstrip()[:6].upper() not in ("SELECT", "WITH"):
+        return None
+    token = _explaining.set(True)
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        _explaining.reset(token)
+    return [" | ".join(str(column) for column in row) for row in rows]
+
+
+def log_slow_query(connection, sql, params, many, elapsed, failed):
+    """
+    Query observer: log the statement when it is slow.
+    """
+    elapsed *= 1000
+    threshold = settings.SLOW_QUERY_MS
+    if (
+        threshold is not None
+        and elapsed >= threshold
+        and not _explaining.get()
+        and random.random() < settings.SLOW_QUERY_SAMPLE_RATE
+    ):
+        write_entry(connection, sql, params, many, elapsed, failed)
+
+
+def write_entry(connection, sql, params, many, elapsed, failed=False):
+    request = current_request.get()
+    entry = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed, 3),
+        "database": connection.alias,
+        "view": view_label(request) if request is not None else None,
+        "path": request.path if request is not None else None,
+        "fingerprint": fingerprint(sql),
+        "sql": sql,
+        # executemany 的參數可能很多，只記錄筆數
+        "params": [short_param(p) for p in params] if params and not many else None,
+        "many": len(params) if many else None,
+        "failed": failed,
+        # 失敗的查詢不 EXPLAIN：連線可能正處於已中斷的 transaction
+        "plan": None if many or failed else explain(connection, sql, params),
+    }
+    try:
+        get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+    except OSError:
+        pass  # 寫不進 log 不影響查詢本身
+
+
+def install():
+    """
+    Register the query observer; called from AppConfig.ready(). The
+    threshold is read on each query, so SLOW_QUERY_MS = None turns the log
+    off without removing the observer.
+    """
+    observe(log_slow_query)
+
+
+def read_entries(path):
+    """
+    Entries of the log at `path` and its rotated backups, oldest first.
+    """
+    paths = [f"{path}.{n}" for n in range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)] + [str(path)]
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # rotate 時被截斷的行
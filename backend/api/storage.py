@@ -0,0 +1,54 @@
+import gzip
+from functools import cached_property
+
+try:
+    import brotli
+except ImportError:  # 未安裝 brotli 時只產生 .gz
+    brotli = None
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes `.gz` and `.br` siblings of text
+    assets during collectstatic, so they are compressed once at deploy time
+    instead of on every request.
+    """
+    compress_extensions = ('.css', '.js', '.mjs', '.html', '.svg', '.json', '.map', '.txt', '.xml', '.ico')
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            if name.endswith(self.compress_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            # 沒有明顯變小就不存，直接送原檔
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+    def stored_name(self, name):
+        # 還沒跑過 collectstatic（沒有 manifest）時用原本的檔名，admin 與
+        # browsable API 的頁面仍能顯示；DEBUG 時 Django 本來就不用 hash 檔名
+        if not self.hashed_files and not self.manifest_storage.exists(self.manifest_name):
+            return name
+        return super().stored_name(name)
+
+    @cached_property
+    def immutable_names(self):
+        """
+        Names whose content can never change: the hashed copies listed in
+        the manifest.
+        """
+        return frozenset(self.hashed_files.values())
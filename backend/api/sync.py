@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (Club, Event, EventParticipation, FinanceRecord,
+                     Membership, Tombstone)
+
+# 每個模型在 sync/ 回傳的欄位
+SYNC_FIELDS = {
+    "clubs": (Club, [
+        "id", "name", "description", "status", "foundation_date", "max_member", "image", "updated_at",
+    ]),
+    "memberships": (Membership, [
+        "id", "user", "club", "status", "is_manager", "position", "updated_at",
+    ]),
+    "events": (Event, [
+        "id", "club", "name", "description", "fee", "quota", "status",
+        "start_date", "end_date", "payment_methods", "is_public", "updated_at",
+    ]),
+    "participations": (EventParticipation, [
+        "id", "user", "event", "payment_method", "payment_status", "updated_at",
+    ]),
+    "finances": (FinanceRecord, [
+        "id", "club", "amount", "description", "date", "updated_at",
+    ]),
+}
+
+# 分頁的順序：先是各模型的資料，最後是刪除紀錄
+SECTIONS = [*SYNC_FIELDS, "deleted"]
+PAGE_SALT = "api.sync.page"
+
+# 公開活動改為不公開時記的刪除：只給看不到它的非社員
+HIDDEN_EVENT = "event.hidden"
+
+# 刪除事件的 model 名稱對應到 sync/ 的 key
+TOMBSTONE_MODELS = {
+    "club": "clubs",
+    "membership": "memberships",
+    "event": "events",
+    HIDDEN_EVENT: "events",
+    "eventparticipation": "participations",
+    "financerecord": "finances",
+}
+
+
+def visible_querysets(user):
+    """
+    Querysets of the rows `user` may see, keyed like SYNC_FIELDS.
+    """
+    querysets = {key: model.objects.all() for key, (model, _) in SYNC_FIELDS.items()}
+    if user.is_admin:
+        return querysets
+
+    member_of = Membership.objects.filter(user=user).values("club_id")
+    accepted_in = Membership.objects.filter(user=user, status="accepted").values("club_id")
+    manager_of = Membership.objects.filter(user=user, is_manager=True).values("club_id")
+    querysets["memberships"] = querysets["memberships"].filter(Q(club_id__in=accepted_in) | Q(user=user))
+    querysets["events"] = querysets["events"].filter(Q(is_public=True) | Q(club_id__in=member_of))
+    querysets["participations"] = querysets["participations"].filter(
+        Q(event__club_id__in=accepted_in) | Q(user=user)
+    )
+    querysets["finances"] = querysets["finances"].filter(club_id__in=manager_of)
+    return querysets
+
+
+def visible_tombstones(user):
+    """
+    Deletions `user` is told about: the same rules as visible_querysets().
+    An event made private is a deletion only for users outside its club.
+    """
+    tombstones = Tombstone.objects.all()
+    if user.is_admin:
+        return tombstones.exclude(model=HIDDEN_EVENT)
+    member_of = Membership.objects.filter(user=user).values("club_id")
+    accepted_in = Membership.objects.filter(user=user, status="accepted").values("club_id")
+    manager_of = Membership.objects.filter(user=user, is_manager=True).values("club_id")
+    return tombstones.filter(
+        Q(model="club")
+        | Q(model="event", is_public=True)
+        | Q(model="event", club_id__in=member_of)
+        | (Q(model=HIDDEN_EVENT) & ~Q(club_id__in=member_of))
+        | Q(model__in=["membership", "eventparticipation"], club_id__in=accepted_in)
+        | Q(model__in=["membership", "eventparticipation"], user_id=user.pk)
+        | Q(model="financerecord", club_id__in=manager_of)
+    )
+
+
+def start_sync(user, since=None):
+    """
+    State of the first page of a sync from `since` (None for a full
+    snapshot). A `since` older than the tombstone retention, or a change to
+    the user's own memberships (which changes what they may see), turns
+    the sync into a full snapshot with `reset` set.
+    """
+    now = timezone.now()
+    retention = timedelta(days=getattr(settings, "SYNC_TOMBSTONE_DAYS", 30))
+    reset = since is not None and (
+        since < now - retention
+        or Membership.objects.filter(user=user, updated_at__gt=since).exists()
+        or Tombstone.objects.filter(model="membership", user_id=user.pk, deleted_at__gt=since).exists()
+    )
+    if reset:
+        since = None
+    return {
+        "user": user.pk,
+        "since": since and since.isoformat(),
+        "until": now.isoformat(),
+        "reset": since is None,
+        "section": 0,
+        "after": None,
+    }
+
+
+def encode_page(state):
+    return signing.dumps(state, salt=PAGE_SALT, compress=True)
+
+
+def decode_page(token, user):
+    """
+    State from a `next` token; ValueError if it is invalid or belongs to
+    another user.
+    """
+    try:
+        state = signing.loads(token, salt=PAGE_SALT)
+    except signing.BadSignature:
+        raise ValueError("Invalid page token.")
+    if state.get("user") != user.pk:
+        raise ValueError("Invalid page token.")
+    return state
+
+
+def section_rows(user, key, since, until, after, limit):
+    """
+    Up to `limit` rows of one section changed in (since, until], in
+    (timestamp, id) order after the position `after`.
+    """
+    if key == "deleted":
+        if since is None:
+            return []
+        queryset, stamp, fields = visible_tombstones(user), "deleted_at", ["id", "model", "object_id", "deleted_at"]
+    else:
+        _, fields = SYNC_FIELDS[key]
+        queryset, stamp = visible_querysets(user)[key], "updated_at"
+    queryset = queryset.filter(**{f"{stamp}__lte": until})
+    if since is not None:
+        queryset = queryset.filter(**{f"{stamp}__gt": since})
+    if after is not None:
+        after_stamp, after_id = datetime.fromisoformat(after[0]), after[1]
+        queryset = queryset.filter(Q(**{f"{stamp}__gt": after_stamp}) | Q(**{stamp: after_stamp, "id__gt": after_id}))
+    return list(queryset.values(*fields).order_by(stamp, "id")[:limit])
+
+
+def changes_page(user, state, limit):
+    """
+    One page of at most `limit` rows: rows visible to `user` changed since
+    the sync's `since`, section by section, then the deletions.
+
+    Every page of a sync reads up to the same `until`, so rows changed
+    while the client is paging are left for its next sync. `next` is the
+    token of the following page; the last page carries `cursor` instead,
+    which trails `until` by SYNC_OVERLAP_SECONDS so rows committed by
+    slower concurrent transactions are picked up on the next poll (clients
+    apply rows as idempotent upserts).
+    """
+    since = state["since"] and datetime.fromisoformat(state["since"])
+    until = datetime.fromisoformat(state["until"])
+    data = {key: [] for key in SECTIONS}
+    section, after, remaining = state["section"], state["after"], limit
+    while section < len(SECTIONS) and remaining > 0:
+        key = SECTIONS[section]
+        rows = section_rows(user, key, since, until, after, remaining + 1)
+        if len(rows) > remaining:
+            rows = rows[:remaining]
+            last = rows[-1]
+            after = [last["deleted_at" if key == "deleted" else "updated_at"].isoformat(), last["id"]]
+        else:
+            section, after = section + 1, None
+        data[key] = rows
+        remaining -= len(rows)
+
+    for club in data["clubs"]:
+        club["image"] = settings.MEDIA_URL + club["image"] if club["image"] else None
+    data["deleted"] = [
+        {"type": TOMBSTONE_MODELS[row["model"]], "id": row["object_id"]} for row in data["deleted"]
+    ]
+    # 只有第一頁要求客戶端清掉本機資料
+    data["reset"] = state["reset"] and state["section"] == 0 and state["after"] is None
+    if section < len(SECTIONS):
+        data["next"] = encode_page({**state, "section": section, "after": after})
+        data["cursor"] = None
+    else:
+        data["next"] = None
+        data["cursor"] = until - timedelta(seconds=getattr(settings, "SYNC_OVERLAP_SECONDS", 5))
+    return data
+
+
+def changes_since(user, since=None, limit=None):
+    """
+    First page of the changes visible to `user` since `since`.
+    """
+    return changes_page(user, start_sync(user, since), limit or settings.SYNC_PAGE_SIZE)
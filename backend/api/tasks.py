@@ -0,0 +1,132 @@
+import datetime
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .cards import refresh_club_cards
+from .jobs import job
+from .models import Club, Event, Membership, Notification, User
+from .provisioning import run_import
+from .reports import report_rows, save_report
+from .uploads import is_blob, store_blob
+
+logger = logging.getLogger(__name__)
+
+
+@job("club.created")
+def club_created(club_id):
+    # 新社團待審核，通知所有管理員
+    club = Club.objects.filter(id=club_id, status="pending").first()
+    if club is None:
+        return
+    notified = Notification.objects.filter(club=club, kind="club.created").values("user_id")
+    admins = User.objects.filter(is_admin=True, is_active=True).exclude(id__in=notified)
+    message = f"新社團「{club.name}」等待審核"
+    Notification.objects.bulk_create(
+        Notification(user_id=user_id, club=club, kind="club.created", message=message)
+        for user_id in admins.values_list("id", flat=True)
+    )
+
+
+@job("club.status_changed")
+def club_status_changed(club_id, status):
+    # 通知幹部審核結果；狀態已再次變更時由較新的 job 負責
+    club = Club.objects.filter(id=club_id, status=status).first()
+    if club is None:
+        return
+    managers = Membership.objects.filter(club=club, status="accepted", is_manager=True)
+    message = f"社團「{club.name}」的狀態已變更為{club.get_status_display()}"
+    Notification.objects.bulk_create(
+        Notification(user_id=user_id, club=club, kind="club.status_changed", message=message)
+        for user_id in managers.values_list("user_id", flat=True)
+    )
+
+
+@job("club.refresh_card")
+def refresh_club_card(club_id):
+    refresh_club_cards([club_id])
+
+
+@job("club.process_image")
+def process_club_image(club_id):
+    # 過大的社團圖片縮到 CLUB_IMAGE_MAX_SIZE 以內
+    club = Club.objects.filter(id=club_id).first()
+    if club is None or not club.image:
+        return
+    max_size = getattr(settings, "CLUB_IMAGE_MAX_SIZE", 1600)
+    with Image.open(club.image.path) as image:
+        if max(image.size) <= max_size:
+            return
+        image.thumbnail((max_size, max_size))
+        if not is_blob(club.image.name):
+            image.save(club.image.path, format=image.format)
+            return
+        # blob 可能被其他社團共用，縮圖存成新的 blob，不覆寫原檔
+        os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=settings.UPLOAD_TEMP_DIR, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, format=image.format)
+    blob = store_blob(path)
+    Club.objects.filter(id=club_id, image=club.image.name).update(image=blob.file.name, updated_at=timezone.now())
+
+
+@job("event.opened")
+def event_opened(event_id):
+    # 分批通知社團所有已加入成員；重試時跳過已通知的人
+    event = Event.objects.select_related("club").filter(id=event_id).first()
+    if event is None or event.status != "open":
+        return
+    chunk_size = getattr(settings, "NOTIFICATION_CHUNK_SIZE", 1000)
+    message = f"{event.club.name} 的活動「{event.name}」開放報名了"
+    notified = Notification.objects.filter(event=event, kind="event.opened").values("user_id")
+    recipients = (
+        Membership.objects.filter(club_id=event.club_id, status="accepted")
+        .exclude(user_id__in=notified)
+        .order_by("user_id")
+        .values_list("user_id", "user__email")
+    )
+    last_user = 0
+    while True:
+        chunk = list(recipients.filter(user_id__gt=last_user)[:chunk_size])
+        if not chunk:
+            break
+        Notification.objects.bulk_create(
+            Notification(user_id=user_id, club_id=event.club_id, event=event, kind="event.opened", message=message)
+            for user_id, _ in chunk
+        )
+        if getattr(settings, "NOTIFY_BY_EMAIL", False):
+            send_mass_mail(
+                [(message, message, None, [email]) for _, email in chunk if email],
+                fail_silently=True,
+            )
+        last_user = chunk[-1][0]
+
+
+@job("finance.report")
+def finance_report(user_id, report, date_from=None, date_to=None, club_ids=None):
+    # 產生完成後通知要求報表的管理員下載
+    date_from = date_from and datetime.date.fromisoformat(date_from)
+    date_to = date_to and datetime.date.fromisoformat(date_to)
+    save_report(report, report_rows(date_from, date_to, club_ids))
+    Notification.objects.create(
+        user_id=user_id,
+        kind="finance.report",
+        message=f"財務報表已完成：{reverse('finance_report_download', args=[report])}",
+    )
+
+
+@job("users.import")
+def import_users_job(user_id, file):
+    # 大量帳號匯入在 worker 裡雜湊密碼；結果由 /users/import/<job>/ 查詢
+    report = run_import(file)
+    Notification.objects.create(
+        user_id=user_id,
+        kind="users.import",
+        message=f"帳號匯入完成：建立 {report['created']} 位，{len(report['errors'])} 列未匯入",
+    )
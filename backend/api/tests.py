@@ -1,3 +1,1349 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+import zlib
+from decimal import Decimal
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (LiveServerTestCase, RequestFactory, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import (analytics, files, hashing, jobs, middleware, parsers,
+               provisioning, push, renderers, reports, slowlog, uploads)
+from .management.commands import loadtest
+from .models import (Blob, Club, ClubCard, Event, EventParticipation,
+                     FinanceRecord, Job, Membership, Notification,
+                     ThrottleBucket, Tombstone, UploadSession, User)
+from .pagination import LedgerPagination
+from .roles import RoleResolver, context_roles, get_roles
+from .sync import SYNC_FIELDS
+from .throttling import TokenBucketThrottle
+
+
+class FastJSONTests(TestCase):
+    payload = {
+        "amount": Decimal("12.50"),
+        "date": datetime.date(2025, 1, 2),
+        "at": datetime.datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc),
+        "payment_methods": {"cash": {"label": "現金"}, "note": "a\u2028b"},
+        "keys": {1: "a"},
+        "none": None,
+    }
+
+    def test_renderer_matches_stock_json_renderer(self):
+        expected = JSONRenderer().render(self.payload)
+        self.assertEqual(renderers.FastJSONRenderer().render(self.payload), expected)
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.payload), expected)
+
+    def test_parser_reads_what_the_renderer_writes(self):
+        body = renderers.FastJSONRenderer().render(self.payload)
+        parsed = parsers.FastJSONParser().parse(io.BytesIO(body))
+        self.assertEqual(parsed, json.loads(body))
+        self.assertEqual(parsed["payment_methods"]["cash"]["label"], "現金")
+        with self.assertRaises(ParseError):
+            parsers.FastJSONParser().parse(io.BytesIO(b"{"))
+
+    def test_api_responses_keep_decimal_and_date_formats(self):
+        manager = User.objects.create_user("manager")
+        club = Club.objects.create(name="club", description="d", max_member=10)
+        Membership.objects.create(user=manager, club=club, status="accepted", is_manager=True)
+        client = APIClient()
+        client.force_authenticate(manager)
+        response = client.post(
+            f"/api/clubs/{club.id}/finances/",
+            {"club": club.id, "amount": "-12.50", "description": "d", "date": "2025-01-02"}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        response = client.get(f"/api/clubs/{club.id}/finances/")
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        row = json.loads(response.content)["results"][0]
+        self.assertEqual((row["amount"], row["balance"], row["date"]), ("-12.50", "-12.50", "2025-01-02"))
+
+
+@skipUnless(renderers.msgpack, "msgpack is not installed")
+class MessagePackTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.club = Club.objects.create(name="club", description="d", max_member=10)
+        Membership.objects.create(user=cls.manager, club=cls.club, status="accepted", is_manager=True)
+        day = datetime.date(2030, 1, 1)
+        Event.objects.create(
+            club=cls.club, name="e", description="d", start_date=day, end_date=day, fee=100,
+            payment_methods={"cash": {"label": "現金"}, "transfer": {"account": "123"}},
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def test_renderer_matches_json(self):
+        payload = {k: v for k, v in FastJSONTests.payload.items() if k != "keys"}
+        packed = renderers.MessagePackRenderer().render(payload)
+        self.assertEqual(renderers.msgpack.unpackb(packed), json.loads(JSONRenderer().render(payload)))
+
+    def test_responses_follow_the_accept_header(self):
+        url = f"/api/clubs/{self.club.id}/"
+        as_json = self.client.get(url)
+        as_msgpack = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(as_msgpack["Content-Type"], "application/msgpack")
+        self.assertEqual(renderers.msgpack.unpackb(as_msgpack.content), json.loads(as_json.content))
+        self.assertLess(len(as_msgpack.content), len(as_json.content))
+
+    def test_request_bodies(self):
+        url = f"/api/clubs/{self.club.id}/finances/"
+        body = renderers.msgpack.packb({"club": self.club.id, "amount": "7.25", "description": "d", "date": "2025-01-02"})
+        response = self.client.post(url, body, content_type="application/msgpack")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FinanceRecord.objects.get().amount, Decimal("7.25"))
+        response = self.client.post(url, b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
+        # key 是 array 的 map 無法轉成 dict
+        body = renderers.msgpack.packb({(1, 2): "x"})
+        with self.assertRaises(ParseError):
+            parsers.MessagePackParser().parse(io.BytesIO(body))
+        response = self.client.post(url, body, content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
+
+
+class CompressionTests(TestCase):
+    body = b"club " * 1000
+
+    def respond(self, response, path="/api/clubs/", accept="gzip, br"):
+        request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept)
+        return middleware.CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation(self):
+        best = "br" if middleware.brotli else "gzip"
+        for header, expected in [("gzip, br", best), ("*", best), ("br;q=0.5, gzip", "gzip"),
+                                 ("gzip;q=0, br;q=0", None), ("identity", None), ("", None)]:
+            self.assertEqual(middleware.choose_encoding(header), expected, header)
+
+    def test_gzip_response(self):
+        response = self.respond(HttpResponse(self.body, content_type="application/json"), accept="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(zlib.decompress(response.content, 16 + zlib.MAX_WBITS), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+    @skipUnless(middleware.brotli, "brotli is not installed")
+    def test_brotli_streaming_response(self):
+        response = self.respond(StreamingHttpResponse(iter([self.body, self.body]), content_type="text/csv"))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(middleware.brotli.decompress(b"".join(response.streaming_content)), self.body * 2)
+
+    def test_skipped_responses(self):
+        cases = [
+            (HttpResponse(b"small", content_type="application/json"), "/api/clubs/"),
+            (HttpResponse(self.body, content_type="image/png"), "/api/clubs/"),
+            (HttpResponse(self.body, content_type="application/octet-stream"), "/media/club_images/a.bin"),
+            (HttpResponse(self.body, status=206, content_type="text/plain"), "/api/clubs/"),
+        ]
+        for response, path in cases:
+            response = self.respond(response, path)
+            self.assertFalse(response.has_header("Content-Encoding"), (path, response["Content-Type"]))
+        response = self.respond(HttpResponse(self.body, content_type="application/json"), accept="identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_strong_etag_becomes_weak(self):
+        response = HttpResponse(self.body, content_type="application/json")
+        response["ETag"] = '"abc"'
+        self.assertEqual(self.respond(response, accept="gzip")["ETag"], 'W/"abc"')
+
+
+class AdminChangelistQueryCountTests(TestCase):
+    """
+    Changelist pages must run the same number of queries no matter how many
+    rows they show (no per-row user/club/event lookups).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.club = Club.objects.create(name="club", description="d", max_member=100)
+        cls.event = Event.objects.create(
+            club=cls.club,
+            name="event",
+            description="d",
+            start_date=datetime.date(2025, 1, 1),
+            end_date=datetime.date(2025, 1, 2),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, start, count):
+        for i in range(start, start + count):
+            user = User.objects.create_user(f"user{i}")
+            club = Club.objects.create(name=f"club{i}", description="d", max_member=10)
+            event = Event.objects.create(
+                club=club,
+                name=f"event{i}",
+                description="d",
+                start_date=datetime.date(2025, 1, 1),
+                end_date=datetime.date(2025, 1, 2),
+            )
+            Membership.objects.create(user=user, club=club)
+            EventParticipation.objects.create(user=user, event=event)
+            FinanceRecord.objects.create(club=club, amount=i, description="d", date=datetime.date(2025, 1, 1))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_counts_are_constant(self):
+        names = ["membership", "event", "eventparticipation", "financerecord"]
+        self.add_rows(0, 2)
+        few = {name: self.count_queries(reverse(f"admin:api_{name}_changelist")) for name in names}
+        self.add_rows(2, 20)
+        for name in names:
+            with self.subTest(model=name):
+                self.assertEqual(self.count_queries(reverse(f"admin:api_{name}_changelist")), few[name])
+
+    def test_club_change_page_uses_autocomplete_for_members(self):
+        self.add_rows(0, 5)
+        response = self.client.get(reverse("admin:api_club_change", args=[self.club.pk]))
+        self.assertContains(response, "admin-autocomplete")
+        self.assertNotContains(response, "user4</option>")
+
+
+class SpaRoutingTests(TestCase):
+    def test_admin_without_slash_is_redirected(self):
+        response = self.client.get("/admin")
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "/admin/")
+
+    def test_client_routes_go_to_the_spa(self):
+        for path in ("/", "/clubs/3", "/administrator", "/apis"):
+            with self.subTest(path=path):
+                self.assertIs(resolve(path).func, files.spa_index)
+        for path in ("/admin", "/api", "/static", "/media"):
+            with self.subTest(path=path):
+                with self.assertRaises(Resolver404):
+                    resolve(path)
+
+
+class TokenBucketThrottleTests(TestCase):
+    rates = {"login_user": "3/min", "login_ip": "100/min"}
+
+    def setUp(self):
+        self.clock = 1000.0
+        patches = [
+            mock.patch.object(TokenBucketThrottle, "THROTTLE_RATES", self.rates),
+            mock.patch.object(TokenBucketThrottle, "timer", staticmethod(lambda: self.clock)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def login(self, username="someone"):
+        return self.client.post("/api/login/", {"username": username, "password": "wrong"})
+
+    def test_burst_then_429_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 401)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        # 3/min：每 20 秒補一個 token
+        self.assertEqual(response["Retry-After"], "20")
+
+        self.clock += 15
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "5")
+
+        self.clock += 5
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_buckets_are_per_username(self):
+        for _ in range(3):
+            self.login("a")
+        self.assertEqual(self.login("a").status_code, 429)
+        self.assertEqual(self.login("b").status_code, 401)
+        self.assertEqual(ThrottleBucket.objects.filter(key__contains="name:").count(), 2)
+
+    def test_throttled_requests_do_not_take_tokens(self):
+        for _ in range(10):
+            self.login()
+        self.clock += 20
+        self.assertEqual(self.login().status_code, 401)
+
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("syncer")
+        cls.club = Club.objects.create(name="mine", description="d", max_member=10)
+        cls.other = Club.objects.create(name="other", description="d", max_member=10)
+        Membership.objects.create(user=cls.user, club=cls.club, status="accepted")
+        cls.events = [cls.event(club, public) for club in (cls.club, cls.other) for public in (True, False)]
+        # 資料都放到過去，cursor 之後的變動才只有測試自己做的
+        an_hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        for model in (Club, Membership, Event):
+            model.objects.update(updated_at=an_hour_ago)
+
+    @classmethod
+    def event(cls, club, public):
+        day = datetime.date(2025, 1, 1)
+        return Event.objects.create(club=club, name="e", description="d", start_date=day, end_date=day, is_public=public)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, **params):
+        response = self.client.get("/api/sync/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def sync_all(self, **params):
+        pages = [self.sync(**params)]
+        while pages[-1]["next"]:
+            pages.append(self.sync(page=pages[-1]["next"], limit=params.get("limit", 1000)))
+        return pages
+
+    def test_snapshot_is_paged(self):
+        pages = self.sync_all(limit=2)
+        self.assertGreater(len(pages), 2)
+        self.assertTrue(all(sum(len(page[key]) for key in SYNC_FIELDS) <= 2 for page in pages))
+        self.assertEqual([page["reset"] for page in pages], [True] + [False] * (len(pages) - 1))
+        self.assertTrue(all(page["cursor"] is None for page in pages[:-1]))
+        self.assertIsNotNone(pages[-1]["cursor"])
+        clubs = [row["id"] for page in pages for row in page["clubs"]]
+        events = [row["id"] for page in pages for row in page["events"]]
+        self.assertEqual(sorted(clubs), [self.club.id, self.other.id])
+        # 別社團的非公開活動看不到
+        self.assertEqual(sorted(events), sorted(e.id for e in self.events[:3]))
+
+    def test_page_token_is_bound_to_the_user(self):
+        token = self.sync(limit=1)["next"]
+        self.client.force_authenticate(User.objects.create_user("someone else"))
+        self.assertEqual(self.client.get("/api/sync/", {"page": token}).status_code, 400)
+        self.assertEqual(self.client.get("/api/sync/", {"page": "garbage"}).status_code, 400)
+
+    def test_delta_since_cursor(self):
+        cursor = self.sync()["cursor"]
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + datetime.timedelta(minutes=1)):
+            self.events[0].name = "renamed"
+            self.events[0].save()
+            data = self.sync(since=cursor.isoformat())
+        self.assertFalse(data["reset"])
+        self.assertEqual([row["id"] for row in data["events"]], [self.events[0].id])
+        self.assertEqual(data["clubs"], [])
+
+    def test_tombstones_follow_visibility(self):
+        cursor = self.sync()["cursor"]
+        visible = {e.id for e in self.events[:3]}
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + datetime.timedelta(minutes=1)):
+            with self.captureOnCommitCallbacks(execute=True):
+                for event in self.events:
+                    event.delete()
+                Club.objects.create(name="gone", description="d", max_member=1).delete()
+            data = self.sync(since=cursor.isoformat())
+        deleted = {(row["type"], row["id"]) for row in data["deleted"]}
+        events = {row_id for kind, row_id in deleted if kind == "events"}
+        self.assertEqual(events, visible)
+        self.assertEqual(len({row_id for kind, row_id in deleted if kind == "clubs"}), 1)
+
+    def test_events_made_private_are_deleted_for_non_members(self):
+        cursor = self.sync()["cursor"]
+        own, other = self.events[0], self.events[2]
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + datetime.timedelta(minutes=1)):
+            for event in (own, other):
+                event.is_public = False
+                event.save()
+            data = self.sync(since=cursor.isoformat())
+            self.assertFalse(data["reset"])
+            self.assertEqual([row["id"] for row in data["events"]], [own.id])
+            self.assertEqual(data["deleted"], [{"type": "events", "id": other.id}])
+
+            other.is_public = True
+            other.save()
+            data = self.sync(since=cursor.isoformat())
+        self.assertEqual(sorted(row["id"] for row in data["events"]), sorted([own.id, other.id]))
+        self.assertEqual(data["deleted"], [])
+
+    def test_cascading_delete_batches_follow_up_work(self):
+        def delete_event(participants):
+            event = self.event(self.club, True)
+            for i in range(participants):
+                EventParticipation.objects.create(user=User.objects.create_user(f"p{participants}-{i}"), event=event)
+            with mock.patch("api.signals.invalidate_club_analytics") as invalidate:
+                with CaptureQueriesContext(connection) as queries:
+                    with self.captureOnCommitCallbacks(execute=True):
+                        event.delete()
+            invalidate.assert_called_once_with(self.club.id)
+            return len(queries)
+
+        self.assertEqual(delete_event(2), delete_event(10))
+        self.assertEqual(Tombstone.objects.filter(model="eventparticipation").count(), 12)
+        self.assertEqual(Tombstone.objects.filter(model="event").count(), 2)
+
+    def test_membership_change_or_expired_cursor_resets(self):
+        cursor = self.sync()["cursor"]
+        later = timezone.now() + datetime.timedelta(minutes=1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            Membership.objects.create(user=self.user, club=self.other, status="pending")
+            data = self.sync(since=cursor.isoformat())
+        self.assertTrue(data["reset"])
+        self.assertEqual(len(data["clubs"]), 2)
+
+        old = timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1)
+        self.assertTrue(self.sync(since=old.isoformat())["reset"])
+
+
+class JobQueueTests(TestCase):
+    def test_claim_counts_attempts_and_fails_abandoned_jobs(self):
+        handler = mock.Mock(side_effect=SystemExit)
+        with mock.patch.dict(jobs.HANDLERS, {"crash": handler}):
+            job = jobs.enqueue("crash")
+            for attempt in range(1, job.max_attempts + 1):
+                with self.assertRaises(SystemExit):
+                    jobs.work("worker")
+                job.refresh_from_db()
+                self.assertEqual((job.status, job.attempts), ("running", attempt))
+                # 模擬 worker 中斷後 lock 過期
+                Job.objects.filter(id=job.id).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+            self.assertEqual(jobs.work("worker"), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(handler.call_count, job.max_attempts)
+
+    def test_prune_deletes_only_old_done_jobs(self):
+        old = timezone.now() - datetime.timedelta(days=settings.JOB_RETENTION_DAYS + 1)
+        done = Job.objects.create(name="a", status="done", run_at=old)
+        failed = Job.objects.create(name="a", status="failed", run_at=old)
+        recent = Job.objects.create(name="a", status="done")
+        self.assertEqual(jobs.prune_jobs(), 1)
+        self.assertEqual(set(Job.objects.values_list("id", flat=True)), {failed.id, recent.id})
+        self.assertFalse(Job.objects.filter(id=done.id).exists())
+
+    def test_club_jobs_notify_admins_and_managers(self):
+        admin = User.objects.create_user("admin", is_admin=True)
+        manager = User.objects.create_user("manager")
+        client = APIClient()
+        client.force_authenticate(manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post("/api/clubs/", {"name": "club", "description": "d", "max_member": 10})
+        self.assertEqual(response.status_code, 201)
+        jobs.work("worker")
+        self.assertEqual(list(Notification.objects.values_list("user", "kind")), [(admin.id, "club.created")])
+        client.force_authenticate(admin)
+        client.post(f"/api/clubs/{response.data['id']}/approve/", {"action": "approve"})
+        jobs.work("worker")
+        self.assertTrue(Notification.objects.filter(user=manager, kind="club.status_changed").exists())
+        self.assertFalse(Job.objects.exclude(status="done").exists())
+
+
+@override_settings(USER_IMPORT_WORKERS=1)
+class UserImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", email="Admin@Example.com", is_admin=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, users):
+        return self.client.post("/api/users/import/", users, format="json")
+
+    def test_emails_are_deduplicated_case_insensitively(self):
+        response = self.post([
+            {"username": "a", "email": "admin@example.COM", "password": "pw"},
+            {"username": "b", "email": "b@example.com", "password": "pw"},
+            {"username": "c", "email": "B@EXAMPLE.com", "password": "pw"},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([(e["row"], list(e["errors"])) for e in response.data["errors"]], [(1, ["email"]), (3, ["email"])])
+
+    def test_concurrent_conflict_only_fails_its_row(self):
+        def hash_and_race(passwords, workers=None):
+            # 查重之後、寫入之前有人註冊了 bob
+            User.objects.create_user("bob")
+            return [f"hash-{password}" for password in passwords]
+
+        with mock.patch.object(provisioning, "hash_passwords", hash_and_race):
+            response = self.post([
+                {"username": name, "email": f"{name}@example.com", "password": "pw"}
+                for name in ("alice", "bob", "carol")
+            ])
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([(e["row"], e["username"]) for e in response.data["errors"]], [(2, "bob")])
+        self.assertEqual(
+            set(User.objects.filter(password__startswith="hash-").values_list("username", flat=True)),
+            {"alice", "carol"},
+        )
+
+    def test_process_pool_is_reused(self):
+        self.addCleanup(lambda: hashing._pool and hashing.discard_pool(hashing._pool))
+        first = hashing.hash_passwords(["one", "two"], workers=2)
+        pool = hashing._pool
+        hashing.hash_passwords(["three", "four"], workers=2)
+        self.assertIs(hashing._pool, pool)
+        user = User(password=first[1])
+        self.assertTrue(user.check_password("two"))
+
+    def test_small_imports_hash_in_process(self):
+        with mock.patch.object(hashing, "get_pool") as get_pool:
+            response = self.post([{"username": "dave", "email": "dave@example.com", "password": "pw"}])
+        self.assertEqual(response.status_code, 201)
+        get_pool.assert_not_called()
+
+    @override_settings(USER_IMPORT_SYNC_ROWS=2, USER_IMPORT_ROOT=tempfile.mkdtemp())
+    def test_large_imports_run_in_the_job_worker(self):
+        users = [{"username": f"u{i}", "email": f"u{i}@example.com", "password": f"secret-{i}"} for i in range(3)]
+        users.append({"username": "u0", "email": "dup@example.com", "password": "pw"})
+        with mock.patch.object(hashing, "get_pool") as get_pool:
+            response = self.post(users)
+        self.assertEqual(response.status_code, 202)
+        get_pool.assert_not_called()
+        self.assertFalse(User.objects.filter(username="u0").exists())
+        status_url = response.data["url"]
+        self.assertEqual(self.client.get(status_url).data["status"], "pending")
+
+        other = User.objects.create_user("other", is_admin=True)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+        self.client.force_authenticate(self.admin)
+
+        jobs.work("worker")
+        self.assertEqual(User.objects.filter(username__in=["u0", "u1", "u2"]).count(), 3)
+        data = self.client.get(status_url).data
+        self.assertEqual(data["status"], "done")
+        self.assertEqual(data["report"]["created"], 3)
+        self.assertEqual([e["row"] for e in data["report"]["errors"]], [4])
+        self.assertTrue(Notification.objects.filter(user=self.admin, kind="users.import").exists())
+        name = Job.objects.get(id=response.data["job"]).payload["file"]
+        with open(provisioning.import_path(name), encoding="utf-8") as f:
+            self.assertNotIn("secret-", f.read())
+
+
+class ClubCardRefreshTests(TestCase):
+    def test_saving_an_upcoming_event_schedules_one_refresh(self):
+        club = Club.objects.create(name="club", description="d", max_member=10)
+        start = timezone.localdate() + datetime.timedelta(days=3)
+        event = Event.objects.create(club=club, name="e", description="d", start_date=start, end_date=start)
+        for i in range(3):
+            event.name = f"e{i}"
+            event.save()
+        self.assertEqual(Job.objects.filter(name="club.refresh_card", payload__club_id=club.id).count(), 1)
+        event.start_date = event.end_date = start + datetime.timedelta(days=1)
+        event.save()
+        self.assertEqual(Job.objects.filter(name="club.refresh_card", payload__club_id=club.id).count(), 2)
+        self.assertEqual(ClubCard.objects.get(club=club).next_event_name, "e2")
+
+
+class PaymentReconcileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.club = Club.objects.create(name="club", description="d", max_member=10)
+        Membership.objects.create(user=cls.manager, club=cls.club, status="accepted", is_manager=True)
+        cls.event = Event.objects.create(
+            club=cls.club, name="e", description="d", fee=100,
+            start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 1, 2),
+        )
+        cls.participations = [
+            EventParticipation.objects.create(event=cls.event, user=User.objects.create_user(f"p{i}"), payment_method="cash")
+            for i in range(3)
+        ]
+
+    def test_bulk_update_publishes_and_invalidates(self):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        broker = mock.Mock()
+        with mock.patch.object(push, "get_broker", return_value=broker), \
+                mock.patch("api.views.invalidate_club_analytics") as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(
+                    f"/api/events/{self.event.id}/payments/",
+                    {"payment_status": "confirmed", "ids": [p.id for p in self.participations[:2]]},
+                    format="json",
+                )
+        self.assertEqual(response.data["updated"], 2)
+        invalidate.assert_called_once_with(self.club.id)
+        published = [call.args[1] for call in broker.publish.call_args_list]
+        self.assertEqual(sorted(m["id"] for m in published), sorted(p.id for p in self.participations[:2]))
+        self.assertTrue(all(m["payment_status"] == "confirmed" for m in published))
+
+
+class EventParticipantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", is_admin=True)
+        cls.manager = User.objects.create_user("manager")
+        cls.member = User.objects.create_user("member", name="Member")
+        cls.club = Club.objects.create(name="club", description="d", max_member=100)
+        Membership.objects.create(user=cls.manager, club=cls.club, status="accepted", is_manager=True)
+        Membership.objects.create(user=cls.member, club=cls.club, status="accepted")
+        day = datetime.date(2030, 1, 1)
+        cls.event = Event.objects.create(club=cls.club, name="e", description="d", start_date=day, end_date=day)
+        EventParticipation.objects.create(user=cls.member, event=cls.event, payment_method="cash")
+        for i in range(12):
+            user = User.objects.create_user(f"user{i}")
+            EventParticipation.objects.create(
+                user=user, event=cls.event, payment_method="cash" if i % 2 else "transfer",
+                payment_status="confirmed" if i % 3 == 0 else "pending",
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = f"/api/events/{self.event.id}/participants/"
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def all_pages(self, **params):
+        rows, response = [], self.client.get(self.url, {"page_size": 5, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            rows += response.data["results"]
+            if not response.data["next"]:
+                return rows
+            response = self.client.get(response.data["next"])
+
+    def test_only_admins_and_managers_can_list(self):
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+        self.assertEqual(self.as_user(self.member).get(self.url).status_code, 403)
+        self.assertEqual(self.as_user(self.manager).get(self.url).status_code, 200)
+        self.assertEqual(self.as_user(self.admin).get(self.url).status_code, 200)
+
+    def test_filters_and_pages(self):
+        self.as_user(self.manager)
+        participations = EventParticipation.objects.filter(event=self.event).order_by("id")
+        self.assertEqual([row["id"] for row in self.all_pages()], [p.id for p in participations])
+        for params, expected in [
+            ({"payment_status": "confirmed"}, participations.filter(payment_status="confirmed")),
+            ({"payment_method": "transfer"}, participations.filter(payment_method="transfer")),
+            ({"search": "Memb"}, participations.filter(user=self.member)),
+        ]:
+            self.assertEqual([row["id"] for row in self.all_pages(**params)], [p.id for p in expected], params)
+        self.assertEqual(self.client.get(self.url, {"payment_status": "paid"}).status_code, 400)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.as_user(self.manager)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {"page_size": 2})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {"page_size": 13})
+        self.assertEqual(len(small), len(large))
+
+    def test_deprecated_participants_field(self):
+        url = f"/api/clubs/{self.club.id}/events/{self.event.id}/"
+        with override_settings(EVENT_EMBED_PARTICIPANTS=True):
+            rows = self.as_user(self.manager).get(url).data["participants"]
+            self.assertEqual(len(rows), 13)
+            # 淘汰期間內容不變：一般社員也拿到完整名單
+            rows = self.as_user(self.member).get(url).data["participants"]
+            self.assertEqual(len(rows), 13)
+        with override_settings(EVENT_EMBED_PARTICIPANTS=False):
+            data = self.as_user(self.manager).get(url).data
+            self.assertNotIn("participants", data)
+            self.assertEqual((data["participant_count"], data["confirmed_count"]), (13, 4))
+
+
+@override_settings(ANALYTICS_CACHE="default")
+class ClubAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.member = User.objects.create_user("member")
+        cls.club = Club.objects.create(name="club", description="d", max_member=50)
+        joined = [datetime.datetime(2025, 1, 5), datetime.datetime(2025, 1, 20), datetime.datetime(2025, 3, 1)]
+        memberships = [Membership.objects.create(user=cls.manager, club=cls.club, status="accepted", is_manager=True)]
+        memberships.append(Membership.objects.create(user=cls.member, club=cls.club, status="accepted"))
+        memberships.append(Membership.objects.create(user=User.objects.create_user("late"), club=cls.club, status="accepted"))
+        Membership.objects.create(user=User.objects.create_user("waiting"), club=cls.club, status="pending")
+        # 二月加入、後來退出的社員仍算在二月；沒有加入時間的舊資料不算
+        joined.append(datetime.datetime(2025, 2, 3))
+        memberships.append(Membership.objects.create(user=User.objects.create_user("gone"), club=cls.club, status="left"))
+        Membership.objects.create(user=User.objects.create_user("legacy"), club=cls.club, status="accepted", created_at=None)
+        for membership, created_at in zip(memberships, joined):
+            Membership.objects.filter(id=membership.id).update(created_at=timezone.make_aware(created_at))
+        cls.january = Event.objects.create(
+            club=cls.club, name="jan", description="d", quota=4,
+            start_date=datetime.date(2025, 1, 10), end_date=datetime.date(2025, 1, 10),
+        )
+        cls.march = Event.objects.create(
+            club=cls.club, name="mar", description="d",
+            start_date=datetime.date(2025, 3, 10), end_date=datetime.date(2025, 3, 10),
+        )
+        for user in (cls.manager, cls.member, User.objects.get(username="late")):
+            EventParticipation.objects.create(user=user, event=cls.january)
+        EventParticipation.objects.create(user=cls.member, event=cls.march)
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        self.url = f"/api/clubs/{self.club.id}/analytics/"
+
+    def test_counts(self):
+        data = self.client.get(self.url).data
+        self.assertEqual(
+            [(e["name"], e["participants"], e["fill_rate"]) for e in data["events"]],
+            [("jan", 3, 0.75), ("mar", 1, None)],
+        )
+        self.assertEqual(
+            [(str(row["month"]), row["events"], row["participants"]) for row in data["participation_by_month"]],
+            [("2025-01-01", 1, 3), ("2025-03-01", 1, 1)],
+        )
+        self.assertEqual(
+            [(str(row["month"]), row["joined"], row["total"]) for row in data["membership_growth"]],
+            [("2025-01-01", 2, 2), ("2025-02-01", 1, 3), ("2025-03-01", 1, 4)],
+        )
+
+    def test_cached_until_club_data_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            analytics.get_club_analytics(self.club.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            EventParticipation.objects.create(user=User.objects.get(username="waiting"), event=self.march)
+        data = self.client.get(self.url).data
+        self.assertEqual(data["events"][1]["participants"], 2)
+
+    def test_only_managers_and_admins(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_authenticate(User.objects.create_user("admin", is_admin=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class ClubDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.club = Club.objects.create(name="club", description="d", max_member=30)
+        Membership.objects.create(user=cls.manager, club=cls.club, status="accepted", is_manager=True)
+        users = [User.objects.create_user(f"user{i}") for i in range(4)]
+        Membership.objects.create(user=users[0], club=cls.club, status="accepted")
+        Membership.objects.create(user=users[1], club=cls.club, status="pending")
+        Membership.objects.create(user=users[2], club=cls.club, status="pending")
+        Membership.objects.create(user=users[3], club=cls.club, status="left")
+        today = timezone.localdate()
+
+        def event(name, days, **fields):
+            day = today + datetime.timedelta(days=days)
+            return Event.objects.create(club=cls.club, name=name, description="d", start_date=day, end_date=day, **fields)
+
+        cls.paid = event("paid", 3, quota=4, fee=200, status="open")
+        cls.free = event("free", 1, status="open")
+        event("past", -10, fee=50)
+        event("cancelled", 2, status="cancelled")
+        for i, user in enumerate(users[:3]):
+            EventParticipation.objects.create(
+                user=user, event=cls.paid, payment_status="confirmed" if i == 0 else "pending"
+            )
+        EventParticipation.objects.create(user=users[0], event=cls.free)
+        FinanceRecord.objects.create(club=cls.club, amount=Decimal("100.50"), description="d", date=today)
+        FinanceRecord.objects.create(club=cls.club, amount=Decimal("-30"), description="d", date=today)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        self.url = f"/api/clubs/{self.club.id}/dashboard/"
+
+    def test_aggregates(self):
+        data = json.loads(self.client.get(self.url).content)
+        self.assertEqual(data["members"], {"pending": 2, "accepted": 2, "max": 30})
+        self.assertEqual(
+            [(e["name"], e["participants"], e["fill_rate"]) for e in data["upcoming_events"]],
+            [("free", 1, None), ("paid", 3, 0.75)],
+        )
+        self.assertEqual(data["unconfirmed_payments"], {"count": 2, "amount": 400})
+        self.assertEqual(Decimal(str(data["balance"])), Decimal("70.50"))
+
+    def test_query_count_is_fixed(self):
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.url)
+        for i in range(5):
+            day = timezone.localdate() + datetime.timedelta(days=i + 5)
+            event = Event.objects.create(club=self.club, name=f"more{i}", description="d", start_date=day, end_date=day)
+            EventParticipation.objects.create(user=self.manager, event=event)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data["upcoming_events"]), 5)
+        self.assertEqual(len(before), len(after))
+
+    def test_missing_club_and_permissions(self):
+        self.client.force_authenticate(User.objects.create_user("admin", is_admin=True))
+        self.assertEqual(self.client.get("/api/clubs/999999/dashboard/").status_code, 404)
+        self.client.force_authenticate(User.objects.get(username="user0"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.member = User.objects.create_user("member")
+        cls.club = Club.objects.create(name="club", description="d", max_member=10)
+        Membership.objects.create(user=cls.manager, club=cls.club, status="accepted", is_manager=True)
+        old = timezone.localdate() - datetime.timedelta(days=settings.ARCHIVE_EVENT_DAYS + 10)
+        cls.old_event = Event.objects.create(
+            club=cls.club, name="old", description="d", status="completed", start_date=old, end_date=old,
+            payment_methods={"cash": {"label": "現金"}},
+        )
+        cls.open_event = Event.objects.create(
+            club=cls.club, name="open", description="d", status="open", start_date=old, end_date=old,
+        )
+        cls.participation = EventParticipation.objects.create(
+            user=cls.member, event=cls.old_event, payment_method="cash", payment_status="confirmed",
+        )
+        cls.notification = Notification.objects.create(
+            user=cls.member, club=cls.club, event=cls.old_event, kind="event.opened", message="old",
+        )
+        cls.left = Membership.objects.create(user=cls.member, club=cls.club, status="left")
+        Membership.objects.filter(id=cls.left.id).update(
+            updated_at=timezone.now() - datetime.timedelta(days=settings.ARCHIVE_MEMBERSHIP_DAYS + 1)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("archive", stdout=out)
+        self.assertIn("Archived 1 events", out.getvalue())
+        self.assertIn("Archived 1 memberships", out.getvalue())
+
+    def test_archive_moves_only_old_rows(self):
+        self.assertEqual(list(Event.objects.values_list("id", flat=True)), [self.open_event.id])
+        self.assertFalse(EventParticipation.objects.exists())
+        self.assertEqual(list(Membership.objects.values_list("user", flat=True)), [self.manager.id])
+        self.assertTrue(Tombstone.objects.filter(model="event", object_id=self.old_event.id).exists())
+
+        response = self.client.get(f"/api/clubs/{self.club.id}/archive/events/{self.old_event.id}/")
+        self.assertEqual(response.data["payment_methods"], {"cash": {"label": "現金"}})
+        self.assertEqual(
+            [(p["id"], p["username"], p["payment_status"]) for p in response.data["participations"]],
+            [(self.participation.id, "member", "confirmed")],
+        )
+        response = self.client.get(f"/api/clubs/{self.club.id}/archive/memberships/", {"status": "left"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.left.id])
+        response = self.client.post(f"/api/clubs/{self.club.id}/archive/events/", {})
+        self.assertEqual(response.status_code, 405)
+
+    def test_restore_event(self):
+        url = f"/api/clubs/{self.club.id}/archive/events/{self.old_event.id}/restore/"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 200)
+        event = Event.objects.get(id=self.old_event.id)
+        self.assertEqual((event.name, event.payment_methods), ("old", {"cash": {"label": "現金"}}))
+        self.assertEqual(EventParticipation.objects.get(event=event).id, self.participation.id)
+        self.assertFalse(Tombstone.objects.filter(model__in=["event", "eventparticipation"]).exists())
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_notifications_survive_archive_and_restore(self):
+        notification = Notification.objects.get(id=self.notification.id)
+        self.assertEqual((notification.event_id, notification.archived_event_id), (None, self.old_event.id))
+        url = f"/api/clubs/{self.club.id}/archive/events/{self.old_event.id}/restore/"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        notification.refresh_from_db()
+        self.assertEqual((notification.event_id, notification.archived_event_id), (self.old_event.id, None))
+
+    def test_restore_membership(self):
+        url = f"/api/clubs/{self.club.id}/archive/memberships/{self.left.id}/restore/"
+        rejoined = Membership.objects.create(user=self.member, club=self.club)
+        self.assertEqual(self.client.post(url).status_code, 409)
+        rejoined.delete()
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(Membership.objects.get(user=self.member).status, "left")
+
+    def test_archive_requires_a_manager(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(f"/api/clubs/{self.club.id}/archive/events/").status_code, 403)
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_percentiles_and_summary(self):
+        values = list(range(1, 101))
+        self.assertEqual([loadtest.percentile(values, p) for p in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertIsNone(loadtest.percentile([], 50))
+        summary = loadtest.summarize([3, 1, 2], {"200": 1, "429": 1, "error": 1}, 2)
+        self.assertEqual((summary["count"], summary["errors"], summary["rps"]), (3, 2, 1.5))
+        self.assertEqual((summary["p50_ms"], summary["max_ms"], summary["mean_ms"]), (2, 3, 2))
+
+    def test_replays_every_route_against_a_live_server(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "loadtest", "--setup", "--base-url", self.live_server_url, "--scenario", "mixed",
+                "--users", "4", "--managers", "1", "--clubs", "2", "--duration", "1",
+                "--output", output.name, stdout=io.StringIO(), stderr=io.StringIO(),
+            )
+            report = json.load(output)
+        self.assertGreater(report["total"]["count"], 0)
+        for route, row in report["routes"].items():
+            self.assertTrue(all(status not in ("error", "500") for status in row["status"]), (route, row))
+        self.assertIn("browse", report["routes"])
+
+
+class RoleResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user")
+        cls.clubs = [Club.objects.create(name=f"club{i}", description="d", max_member=10) for i in range(3)]
+        Membership.objects.create(user=cls.user, club=cls.clubs[0], status="accepted", is_manager=True)
+        Membership.objects.create(user=cls.user, club=cls.clubs[1], status="pending")
+        cls.other = User.objects.create_user("other")
+        Membership.objects.create(user=cls.other, club=cls.clubs[0], status="accepted", is_manager=True)
+
+    def test_memberships_load_once(self):
+        roles = RoleResolver(self.user)
+        with self.assertNumQueries(1):
+            self.assertTrue(roles.is_manager(self.clubs[0].id))
+            self.assertTrue(roles.is_member(str(self.clubs[1].id)))
+            self.assertFalse(roles.is_manager(self.clubs[1].id))
+            self.assertIsNone(roles.membership(self.clubs[2].id))
+        with self.assertNumQueries(1):
+            self.assertEqual(roles.managers(self.clubs[0].id), {self.user.id, self.other.id})
+            self.assertEqual(roles.managers(str(self.clubs[0].id)), {self.user.id, self.other.id})
+        with self.assertNumQueries(0):
+            anonymous = RoleResolver(AnonymousUser())
+            self.assertFalse(anonymous.is_member(self.clubs[0].id))
+            self.assertIsNone(anonymous.participation(1))
+
+    def test_one_resolver_per_request_and_user(self):
+        request = Request(RequestFactory().get("/"))
+        request.user = self.user
+        roles = get_roles(request)
+        self.assertIs(get_roles(request), roles)
+        self.assertIs(get_roles(request._request), roles)
+        self.assertIs(context_roles({"request": request}), roles)
+        request.user = self.other
+        self.assertIsNot(get_roles(request), roles)
+
+    def test_event_list_query_count_does_not_grow(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        club = self.clubs[0]
+        url = f"/api/clubs/{club.id}/events/"
+
+        def add_events(count):
+            for i in range(count):
+                day = datetime.date(2030, 1, 1) + datetime.timedelta(days=i)
+                event = Event.objects.create(club=club, name="e", description="d", start_date=day, end_date=day)
+                EventParticipation.objects.create(user=self.user, event=event)
+                EventParticipation.objects.create(user=self.other, event=event)
+
+        add_events(2)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(len(client.get(url).data), 2)
+        add_events(6)
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(url)
+        self.assertEqual(len(response.data), 8)
+        self.assertTrue(all(row["my_membership"]["is_manager"] for row in response.data))
+        self.assertTrue(all(row["my_participation"]["is_manager"] for row in response.data))
+        self.assertEqual(len(few), len(many))
+
+
+class FinanceLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("manager")
+        cls.club = Club.objects.create(name="club", description="d", max_member=10)
+        Membership.objects.create(user=cls.manager, club=cls.club, status="accepted", is_manager=True)
+        cls.amounts = {}
+        for i in range(30):
+            amount = Decimal(i * 10 - 100)
+            record = FinanceRecord.objects.create(
+                club=cls.club, amount=amount, description="d",
+                date=datetime.date(2025, 1, 1) + datetime.timedelta(days=i * 7),
+            )
+            cls.amounts[record.id] = amount
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def ledger(self, **params):
+        rows, url = [], f"/api/clubs/{self.club.id}/finances/"
+        while url:
+            response = self.client.get(url, {"page_size": 7, **params} if not rows else None)
+            self.assertEqual(response.status_code, 200)
+            rows += response.data["results"]
+            url = response.data["next"]
+        return rows
+
+    def expected_balances(self):
+        balance, balances = Decimal(0), {}
+        for record in FinanceRecord.objects.filter(club=self.club).order_by("date", "id"):
+            balance += record.amount
+            balances[record.id] = balance
+        return balances
+
+    def test_balances_are_continuous_across_pages_and_filters(self):
+        expected = self.expected_balances()
+        for params in [{}, {"from": "2025-03-01"}, {"min_amount": "0"}, {"from": "2025-02-10", "max_amount": "50"}]:
+            rows = self.ledger(**params)
+            self.assertTrue(rows)
+            for row in rows:
+                self.assertEqual(Decimal(row["balance"]), expected[row["id"]], params)
+        self.assertEqual(len(self.ledger()), 30)
+
+    def test_editing_an_old_record_moves_later_balances(self):
+        first = FinanceRecord.objects.filter(club=self.club).order_by("date", "id").first()
+        response = self.client.patch(
+            f"/api/clubs/{self.club.id}/finances/{first.id}/", {"amount": "5", "date": "2025-05-02"}
+        )
+        self.assertEqual(response.status_code, 200)
+        FinanceRecord.objects.filter(club=self.club).order_by("-date").first().delete()
+        expected = self.expected_balances()
+        rows = self.ledger(**{"from": "2025-02-01"})
+        self.assertEqual({row["id"]: Decimal(row["balance"]) for row in rows},
+                         {pk: balance for pk, balance in expected.items()
+                          if FinanceRecord.objects.get(pk=pk).date >= datetime.date(2025, 2, 1)})
+
+    def test_cursors_from_other_lists_are_rejected(self):
+        for i in range(3):
+            Notification.objects.create(user=self.manager, kind="k", message=str(i))
+        inbox = self.client.get("/api/notifications/", {"page_size": 1}).data["next"]
+        cursor = parse_qs(urlsplit(inbox).query)["cursor"][0]
+        url = f"/api/clubs/{self.club.id}/finances/"
+        self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 404)
+        salt = LedgerPagination().cursor_salt
+        for position in ([5], ["x", "y"], ["2025-01-01", "x"], [1, 2], ["2025-01-01", [1]], "2025-01-01"):
+            forged = signing.dumps({"position": position}, salt=salt)
+            self.assertEqual(self.client.get(url, {"cursor": forged}).status_code, 404, position)
+        ledger = self.client.get(url, {"page_size": 2}).data["next"]
+        self.assertEqual(self.client.get(ledger).status_code, 200)
+
+    def test_page_query_count_does_not_grow_with_history(self):
+        url = f"/api/clubs/{self.club.id}/finances/"
+        with CaptureQueriesContext(connection) as short:
+            self.client.get(url, {"page_size": 5, "from": "2025-01-01"})
+        with CaptureQueriesContext(connection) as late:
+            self.client.get(url, {"page_size": 5, "from": "2025-06-01"})
+        self.assertEqual(len(short), len(late))
+
+
+class FinanceReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("boss", is_admin=True)
+        cls.club = Club.objects.create(name='=HYPERLINK("http://evil")', description="d", max_member=10)
+        FinanceRecord.objects.create(club=cls.club, amount=Decimal("-50"), description="d", date=datetime.date(2025, 1, 5))
+        FinanceRecord.objects.create(club=cls.club, amount=Decimal("80"), description="d", date=datetime.date(2025, 2, 5))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_csv_escapes_formulas_but_not_numbers(self):
+        response = self.client.get("/api/finances/report/", {"output": "csv"})
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[1][1], "'" + self.club.name)
+        self.assertEqual(rows[1][2:], ["2025-01", "1", "0.00", "-50.00", "-50.00", "0.00", "-50.00"])
+        self.assertEqual(rows[2][-1], "30.00")
+
+    def test_months_without_records_are_filled(self):
+        FinanceRecord.objects.create(club=self.club, amount=Decimal("5"), description="d", date=datetime.date(2025, 4, 9))
+        rows = [row[2:] for row in reports.report_rows()]
+        self.assertEqual([row[0] for row in rows], ["2025-01", "2025-02", "2025-03", "2025-04"])
+        self.assertEqual(rows[2][1:], [0, Decimal("0.00"), Decimal("0.00"), Decimal("0.00"), Decimal("30.00"), Decimal("30.00")])
+
+        rows = [row[2:] for row in reports.report_rows(datetime.date(2025, 2, 10), datetime.date(2025, 6, 30))]
+        self.assertEqual([row[0] for row in rows], ["2025-02", "2025-03", "2025-04", "2025-05", "2025-06"])
+        self.assertEqual([row[-2:] for row in rows], [
+            [Decimal("30.00"), Decimal("30.00")], [Decimal("30.00"), Decimal("30.00")],
+            [Decimal("30.00"), Decimal("35.00")], [Decimal("35.00"), Decimal("35.00")],
+            [Decimal("35.00"), Decimal("35.00")],
+        ])
+
+    @skipUnless(reports.openpyxl, "openpyxl is not installed")
+    def test_xlsx_cells_are_text(self):
+        response = self.client.get("/api/finances/report/", {"output": "xlsx"})
+        workbook = reports.openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        cell = workbook.active.cell(row=2, column=2)
+        self.assertEqual(cell.data_type, "s")
+        self.assertEqual(cell.value, "'" + self.club.name)
+
+
+class NotificationReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        cls.notifications = [Notification.objects.create(user=cls.user, kind="k", message=str(i)) for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_marks_the_given_ids(self):
+        response = self.client.post("/api/notifications/read/", {"ids": [self.notifications[0].id]}, format="json")
+        self.assertEqual(response.data, {"updated": 1})
+        self.assertEqual(Notification.objects.filter(is_read=True).count(), 1)
+
+    def test_invalid_ids_are_a_400(self):
+        for ids in (5, "1,2", ["a"], [None], {"id": 1}):
+            with self.subTest(ids=ids):
+                response = self.client.post("/api/notifications/read/", {"ids": ids}, format="json")
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Notification.objects.filter(is_read=True).exists())
+
+
+class MetricsEndpointTests(TestCase):
+    def test_disabled_without_a_token(self):
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requires_the_bearer_token(self):
+        # 經過 reverse proxy 時來源都是 127.0.0.1，不能以此放行
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="127.0.0.1").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        self.client.get("/api/clubs/")
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'django_db_queries_total{view="club_list"}')
+
+
+@override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_SAMPLE_RATE=1.0)
+class SlowQueryLogTests(TestCase):
+    def test_only_successful_queries_are_explained(self):
+        with mock.patch.object(slowlog, "explain") as explain, mock.patch.object(slowlog, "get_logger") as get_logger:
+            with self.assertRaises(DatabaseError):
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT * FROM no_such_table")
+            Club.objects.exists()
+        explained = [call.args[1] for call in explain.call_args_list]
+        self.assertFalse(any("no_such_table" in sql for sql in explained))
+        self.assertTrue(any("api_club" in sql for sql in explained))
+        logged = [json.loads(call.args[0]) for call in get_logger.return_value.info.call_args_list]
+        failed = [entry for entry in logged if "no_such_table" in entry["sql"]]
+        self.assertEqual([(entry["failed"], entry["plan"]) for entry in failed], [(True, None)])
+
+
+class PushTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("member")
+        cls.club = Club.objects.create(name="club", description="d", max_member=10)
+        cls.other = Club.objects.create(name="other", description="d", max_member=10)
+        cls.membership = Membership.objects.create(user=cls.user, club=cls.club, status="accepted")
+
+    def ticket(self, club):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post(f"/api/clubs/{club.id}/stream/ticket/")
+
+    def test_stream_takes_a_ticket_not_a_jwt_in_the_url(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        self.assertEqual(self.client.get(f"/api/clubs/{self.club.id}/stream/?token={token}").status_code, 401)
+        self.assertEqual(self.client.get(f"/api/clubs/{self.club.id}/stream/?ticket=forged").status_code, 401)
+
+        response = self.ticket(self.club)
+        self.assertEqual(response.status_code, 200)
+        ticket = response.data["ticket"]
+        self.assertNotIn(token, ticket)
+        # 票只能開發出它的社團
+        self.assertEqual(self.client.get(f"/api/clubs/{self.other.id}/stream/?ticket={ticket}").status_code, 401)
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + settings.PUSH_TICKET_SECONDS + 1):
+            self.assertEqual(self.client.get(f"/api/clubs/{self.club.id}/stream/?ticket={ticket}").status_code, 401)
+        response = self.client.get(f"/api/clubs/{self.club.id}/stream/?ticket={ticket}")
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_ticket_requires_access_to_the_club(self):
+        self.assertEqual(self.ticket(self.other).status_code, 403)
+
+    def test_deleted_membership_is_published_with_its_id(self):
+        broker = mock.Mock()
+        with mock.patch.object(push, "get_broker", return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                membership_id = self.membership.pk
+                self.membership.delete()
+        message = broker.publish.call_args.args[1]
+        self.assertEqual((message["op"], message["id"]), ("delete", membership_id))
+
+    def test_removed_member_stream_is_closed(self):
+        async def run():
+            subscription = push.Subscription(self.club.id, self.user, True)
+            events = push.stream(subscription)
+            await events.__anext__()
+            subscription.deliver({"type": "membership", "op": "delete", "id": 1, "user": self.user.pk})
+            subscription.deliver({"type": "participation", "op": "save", "id": 2, "user": 99})
+            with mock.patch.object(push, "get_access", return_value=(False, False)):
+                return [event async for event in events]
+
+        with mock.patch.object(push, "get_broker"):
+            sent = asyncio.run(run())
+        self.assertEqual(len(sent), 2)
+        self.assertTrue(sent[0].startswith("event: membership"))
+        self.assertTrue(sent[1].startswith("event: revoked"))
+
+    def test_accepted_applicant_starts_receiving_club_events(self):
+        async def run():
+            subscription = push.Subscription(self.club.id, self.user, False)
+            events = push.stream(subscription)
+            await events.__anext__()
+            subscription.deliver({"type": "membership", "op": "save", "id": 1, "user": self.user.pk, "status": "accepted"})
+            with mock.patch.object(push, "get_access", return_value=(True, True)):
+                first = await events.__anext__()
+            subscription.deliver({"type": "participation", "op": "save", "id": 2, "user": 99})
+            second = await events.__anext__()
+            await events.aclose()
+            return first, second, subscription.full_access
+
+        with mock.patch.object(push, "get_broker"):
+            first, second, full_access = asyncio.run(run())
+        self.assertTrue(full_access)
+        self.assertTrue(second.startswith("event: participation"))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_ACCEL=None)
+class MediaRangeTests(TestCase):
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.path = default_storage.save("range.bin", io.BytesIO(self.data))
+        self.empty = default_storage.save("empty.bin", io.BytesIO(b""))
+        self.addCleanup(default_storage.delete, self.path)
+        self.addCleanup(default_storage.delete, self.empty)
+
+    def get(self, name=None, **headers):
+        response = self.client.get(f"/media/{name or self.path}", **headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_byte_ranges(self):
+        size = len(self.data)
+        for header, start, end in [("bytes=0-9", 0, 9), ("bytes=1000-", 1000, size - 1),
+                                   ("bytes=-24", size - 24, size - 1), ("bytes=1020-5000", 1020, size - 1)]:
+            response, body = self.get(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(body, self.data[start:end + 1], header)
+            self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{size}")
+            self.assertEqual(response["Content-Length"], str(end - start + 1))
+
+    def test_multiple_or_malformed_ranges_send_the_whole_file(self):
+        for header in ("bytes=0-1,4-5", "bytes=-", "items=0-1", "bytes=a-b", "bytes=5-3"):
+            response, body = self.get(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 200, header)
+            self.assertEqual(body, self.data)
+            self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self.get(self.empty, HTTP_RANGE="bytes=5-3")[0].status_code, 200)
+
+    def test_unsatisfiable_ranges_return_416(self):
+        cases = [(self.path, "bytes=5000-"), (self.path, "bytes=-0"), (self.path, "bytes=5000-6000"),
+                 (self.empty, "bytes=-10"), (self.empty, "bytes=0-")]
+        for name, header in cases:
+            response, _ = self.get(name, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416, (name, header))
+            self.assertEqual(response["Content-Range"], f"bytes */{default_storage.size(name)}")
+
+    def test_if_range(self):
+        etag = self.get()[0]["ETag"]
+        last_modified = self.get()[0]["Last-Modified"]
+        for if_range, status in [(etag, 206), (last_modified, 206), ('"stale"', 200),
+                                 (f"W/{etag}", 200), ("Thu, 01 Jan 1970 00:00:00 GMT", 200)]:
+            response, body = self.get(HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE=if_range)
+            self.assertEqual(response.status_code, status, if_range)
+            self.assertEqual(body, self.data[:4] if status == 206 else self.data)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), UPLOAD_TEMP_DIR=tempfile.mkdtemp())
+class UploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("uploader")
+        cls.club = Club.objects.create(name="club", description="d", max_member=10)
+        Membership.objects.create(user=cls.user, club=cls.club, status="accepted", is_manager=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def png(self, size=(10, 10), color="red"):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, color).save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def start(self, data):
+        response = self.client.post("/api/uploads/", {"filename": "a.png", "size": len(data)}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def put_chunk(self, pk, data, start, end):
+        return self.client.put(
+            f"/api/uploads/{pk}/", data[start:end + 1], content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{len(data)}",
+        )
+
+    @override_settings(CLUB_IMAGE_MAX_SIZE=50)
+    def test_replacing_the_image_enqueues_processing(self):
+        image = SimpleUploadedFile("big.png", self.png((200, 100)), "image/png")
+        response = self.client.patch(f"/api/clubs/{self.club.id}/", {"image": image}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Job.objects.filter(name="club.process_image", payload__club_id=self.club.id).exists())
+
+    def test_chunk_is_not_written_while_another_holds_the_range(self):
+        data = self.png()
+        pk = self.start(data)
+        UploadSession.objects.filter(pk=pk).update(locked_until=timezone.now() + datetime.timedelta(minutes=1))
+        response = self.put_chunk(pk, data, 0, 19)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 0)
+        session = UploadSession.objects.get(pk=pk)
+        self.assertEqual(os.path.getsize(uploads.part_path(session)), 0)
+
+    def test_stale_offset_is_rejected(self):
+        data = self.png()
+        pk = self.start(data)
+        self.assertEqual(self.put_chunk(pk, data, 0, 19).data["offset"], 20)
+        response = self.put_chunk(pk, data, 0, 19)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 20)
+        response = self.put_chunk(pk, data, 20, len(data) - 1)
+        self.assertTrue(response.data["complete"])
+
+    def test_cleanup_deletes_only_unreferenced_blobs(self):
+        blobs = []
+        for color in ("red", "green", "blue"):
+            data = self.png(color=color)
+            pk = self.start(data)
+            self.put_chunk(pk, data, 0, len(data) - 1)
+            blobs.append(UploadSession.objects.get(pk=pk).blob)
+        Club.objects.filter(pk=self.club.pk).update(image=blobs[0].file.name)
+        UploadSession.objects.exclude(blob=blobs[1]).delete()
+        later = timezone.now() + datetime.timedelta(seconds=settings.UPLOAD_SESSION_TTL + 1)
+        self.assertEqual(uploads.delete_unreferenced_blobs(later), 1)
+        self.assertEqual(set(Blob.objects.values_list("pk", flat=True)), {blobs[0].pk, blobs[1].pk})
+        self.assertFalse(default_storage.exists(blobs[2].file.name))
+        self.assertTrue(default_storage.exists(blobs[0].file.name))
@@ -0,0 +1,122 @@
+import random
+
+from django.db import IntegrityError, connection, transaction
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import ThrottleBucket
+
+# 每建立這麼多個新 bucket 約清一次已經全滿（等同不存在）的舊 bucket
+CULL_FREQUENCY = 1000
+
+
+def take_token_sql():
+    # 每個 request 都會跑，直接用預先組好的 SQL，省掉 ORM 編譯查詢的時間
+    table = connection.ops.quote_name(ThrottleBucket._meta.db_table)
+    return (
+        f"UPDATE {table} SET tat = (CASE WHEN tat > %s THEN tat ELSE %s END) + %s "
+        f"WHERE {connection.ops.quote_name('key')} = %s AND tat <= %s"
+    )
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token-bucket throttle for views that set `throttle_scope`.
+
+    A rate of 'N/period' is a bucket holding N tokens that refills at N per
+    period, so clients may burst up to N requests and are then held to the
+    average rate. Views without a scope, or scopes without a rate in
+    DEFAULT_THROTTLE_RATES, are not throttled.
+
+    Each bucket is a ThrottleBucket row storing `tat`, the time at which the
+    bucket would be full again (the GCRA form of a token bucket): a request
+    is allowed when tat + period/N <= now + period, and then moves tat on by
+    period/N. Taking a token is a single conditional UPDATE, so concurrent
+    requests in different worker processes can't overdraw a bucket.
+    """
+    scope_attr = 'throttle_scope'
+    scope_suffix = None
+    cache_format = 'bucket_%(scope)s_%(ident)s'
+
+    def __init__(self):
+        # 與 ScopedRateThrottle 相同，rate 要等到拿到 view 才能決定
+        pass
+
+    def get_ident_for(self, request):
+        raise NotImplementedError('.get_ident_for() must be overridden')
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_for(request)
+        if ident is None:
+            return None
+        return (self.cache_format % {'scope': self.scope, 'ident': ident})[:255]
+
+    def allow_request(self, request, view):
+        scope = getattr(view, self.scope_attr, None)
+        if not scope:
+            return True
+        self.scope = f'{scope}_{self.scope_suffix}'
+        self.rate = self.THROTTLE_RATES.get(self.scope)
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        if self.take_token() or self.create_bucket() or self.take_token():
+            return True
+        return self.throttle_failure()
+
+    @property
+    def interval(self):
+        return self.duration / self.num_requests
+
+    def take_token(self):
+        now, interval = self.now, self.interval
+        with connection.cursor() as cursor:
+            cursor.execute(take_token_sql(), [now, now, interval, self.key, now + self.duration - interval])
+            return cursor.rowcount
+
+    def create_bucket(self):
+        if random.randrange(CULL_FREQUENCY) == 0:
+            ThrottleBucket.objects.filter(tat__lt=self.now).delete()
+        try:
+            with transaction.atomic():
+                ThrottleBucket.objects.create(key=self.key, tat=self.now + self.interval)
+        except IntegrityError:
+            return False  # bucket 已存在（可能是另一個 request 剛建立的）
+        return True
+
+    def wait(self):
+        tat = ThrottleBucket.objects.filter(key=self.key).values_list('tat', flat=True).first()
+        if tat is None:
+            return None
+        return max(0, tat + self.interval - self.now - self.duration)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Bucket per user. Anonymous login/register requests are keyed on the
+    submitted username so one account can't be hammered from many IPs.
+    """
+    scope_suffix = 'user'
+
+    def get_ident_for(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username or not isinstance(username, str):
+            return None
+        return 'name:' + username.strip().lower()[:150]
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Bucket per client address.
+    """
+    scope_suffix = 'ip'
+
+    def get_ident_for(self, request):
+        return self.get_ident(request)
@@ -0,0 +1,277 @@
+"""
+Resumable chunked uploads and content-addressed blobs.
+
+A client opens an UploadSession with the file's size (and optionally its
+SHA-256, which skips the upload entirely when that content is already
+stored), then PUTs the bytes in any number of chunks, each with a
+`Content-Range` header. Chunks are streamed from the request straight
+into a part file under UPLOAD_TEMP_DIR; after an interruption the client
+asks for the session's offset and continues from there.
+
+When the last byte arrives the file is hashed and stored once under
+MEDIA_ROOT/blobs/ by its SHA-256. The name never changes meaning, so
+blobs are served with immutable cache headers. Blobs nothing points to
+any more are removed by `manage.py cleanuploads`.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from .files import BLOB_PREFIX
+from .models import Blob, Club, UploadSession
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+IMAGE_TYPES = {
+    "JPEG": ("image/jpeg", ".jpg"),
+    "PNG": ("image/png", ".png"),
+    "GIF": ("image/gif", ".gif"),
+    "WEBP": ("image/webp", ".webp"),
+}
+
+
+class UploadError(Exception):
+    """
+    A chunk or upload the server can't accept; `status` is the HTTP status
+    to answer with.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def blob_name(sha256, extension):
+    return f"{BLOB_PREFIX}{sha256[:2]}/{sha256}{extension}"
+
+
+def part_path(session):
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f"{session.pk}.part")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def inspect_image(path):
+    """
+    (content_type, extension, width, height) of the image at `path`.
+    """
+    try:
+        with Image.open(path) as image:
+            image.verify()
+            kind, size = image.format, image.size
+    except (UnidentifiedImageError, OSError, SyntaxError) as exc:
+        raise UploadError(f"Not a valid image: {exc}", status=422)
+    if kind not in IMAGE_TYPES:
+        raise UploadError(f"Unsupported image type: {kind}", status=422)
+    content_type, extension = IMAGE_TYPES[kind]
+    return content_type, extension, *size
+
+
+def store_blob(path, sha256=None):
+    """
+    Move the image at `path` into blob storage and return its Blob. When the
+    same content is already stored, `path` is deleted and the existing Blob
+    returned.
+    """
+    sha256 = sha256 or file_sha256(path)
+    blob = Blob.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        os.remove(path)
+        return blob
+    content_type, extension, width, height = inspect_image(path)
+    name = blob_name(sha256, extension)
+    target = default_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # 先搬到目標目錄再 rename，同一檔案系統上是原子操作
+    fd, staging = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    os.close(fd)
+    shutil.move(path, staging)
+    os.replace(staging, target)
+    try:
+        with transaction.atomic():
+            return Blob.objects.create(
+                sha256=sha256, file=name, size=os.path.getsize(target),
+                content_type=content_type, width=width, height=height,
+            )
+    except IntegrityError:
+        # 另一個請求剛存了同樣的內容；檔名相同，檔案已經是同一份
+        return Blob.objects.get(sha256=sha256)
+
+
+def blob_from_upload(uploaded):
+    """
+    Store a Django UploadedFile (a plain multipart upload) as a blob.
+    """
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=settings.UPLOAD_TEMP_DIR, suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        for chunk in uploaded.chunks():
+            f.write(chunk)
+    try:
+        return store_blob(path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def start_session(user, filename, size, sha256=""):
+    """
+    Open an upload. If a blob with `sha256` already exists the session is
+    returned already complete, without any bytes being sent.
+    """
+    max_size = settings.UPLOAD_MAX_SIZE
+    if size <= 0 or size > max_size:
+        raise UploadError(f"size must be between 1 and {max_size} bytes.")
+    sha256 = sha256.lower()
+    blob = Blob.objects.filter(sha256=sha256, size=size).first() if sha256 else None
+    session = UploadSession.objects.create(
+        user=user, filename=filename, size=size, sha256=sha256,
+        blob=blob, received=size if blob else 0,
+    )
+    if blob is None:
+        os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+        open(part_path(session), "wb").close()
+    return session
+
+
+def parse_content_range(header, session):
+    match = CONTENT_RANGE_RE.match(header or "")
+    if not match:
+        raise UploadError("Content-Range: bytes <start>-<end>/<total> is required.")
+    start, end, total = map(int, match.groups())
+    if total != session.size or end < start or end >= total:
+        raise UploadError("Content-Range doesn't match the upload.", status=416)
+    return start, end
+
+
+def write_chunk(session, stream, content_range, content_length):
+    """
+    Append one chunk, read from `stream` in small pieces, at the offset given
+    by `content_range`. Returns the refreshed session, finishing the upload
+    when the last byte arrives.
+
+    The range is claimed (a short lease on the session, taken with a
+    conditional UPDATE) before any byte is written, so two requests racing
+    for the same offset can't both write into the part file.
+    """
+    if session.blob_id:
+        return session
+    start, end = parse_content_range(content_range, session)
+    length = end - start + 1
+    if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(f"Chunks are limited to {settings.UPLOAD_CHUNK_MAX_SIZE} bytes.", status=413)
+    if content_length != length:
+        raise UploadError("Content-Length doesn't match Content-Range.")
+
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.UPLOAD_CHUNK_LOCK_SECONDS)
+    claimed = (
+        UploadSession.objects.filter(pk=session.pk, received=start, blob__isnull=True)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        .update(locked_until=lease)
+    )
+    if not claimed:
+        session.refresh_from_db()
+        if session.received == start and session.blob_id is None:
+            raise UploadError("Another chunk is being written; retry shortly.", status=409)
+        raise UploadError(f"Expected offset {session.received}.", status=409)
+    owned = UploadSession.objects.filter(pk=session.pk, locked_until=lease)
+
+    written = 0
+    try:
+        with open(part_path(session), "r+b") as f:
+            f.seek(start)
+            while written < length:
+                data = stream.read(min(CHUNK_SIZE, length - written))
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+    finally:
+        if written != length:
+            owned.update(locked_until=None)
+    if written != length:
+        raise UploadError("Connection closed before the chunk was complete.")
+
+    # 租約逾期被別的 request 接手時，這段不算數
+    if not owned.update(received=start + length, locked_until=None, updated_at=timezone.now()):
+        session.refresh_from_db()
+        raise UploadError(f"Expected offset {session.received}.", status=409)
+    session.refresh_from_db()
+    if session.received == session.size:
+        finish_session(session)
+    return session
+
+
+def finish_session(session):
+    path = part_path(session)
+    sha256 = file_sha256(path)
+    if session.sha256 and session.sha256 != sha256:
+        cancel_session(session)
+        raise UploadError("Content doesn't match the declared sha256; upload again.", status=422)
+    try:
+        session.blob = store_blob(path, sha256)
+    except UploadError:
+        cancel_session(session)
+        raise
+    session.save(update_fields=["blob", "updated_at"])
+
+
+def cancel_session(session):
+    if os.path.exists(part_path(session)):
+        os.remove(part_path(session))
+    session.delete()
+
+
+def expire_sessions(now=None):
+    """
+    Delete sessions (and their part files) untouched for UPLOAD_SESSION_TTL
+    seconds. Blobs are kept.
+    """
+    now = now or timezone.now()
+    stale = UploadSession.objects.filter(updated_at__lt=now - timedelta(seconds=settings.UPLOAD_SESSION_TTL))
+    count = 0
+    for session in stale.iterator():
+        cancel_session(session)
+        count += 1
+    return count
+
+
+def delete_unreferenced_blobs(now=None):
+    """
+    Delete blobs (rows and files) that no club image or upload session
+    points to any more, e.g. the original after a resize or an image that
+    was replaced. Blobs younger than UPLOAD_SESSION_TTL are kept so one
+    that was just stored isn't removed before it is attached.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    in_use = Club.objects.filter(image__startswith=BLOB_PREFIX).values("image")
+    unreferenced = Blob.objects.filter(created_at__lt=cutoff, uploadsession__isnull=True).exclude(file__in=in_use)
+    count = 0
+    for sha256, name in unreferenced.values_list("sha256", "file").iterator():
+        # 再檢查一次條件，期間被引用的 blob 不刪
+        if unreferenced.filter(sha256=sha256).delete()[0]:
+            default_storage.delete(name)
+            count += 1
+    return count
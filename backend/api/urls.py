@@ -23,13 +23,12 @@
 # ]
 
 from django.conf import settings
-from django.conf.urls.static import static
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
-from . import views
+from . import files, push, views
 from .views import MyClubsView
 
 router = DefaultRouter()
@@ -40,23 +39,46 @@ urlpatterns = [
   path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
   path('me/', views.UserSelfView.as_view(), name='user_self'),
   path('users/', views.UserAdminListView.as_view(), name='user_list_admin'),
+  path('users/import/', views.UserImportView.as_view(), name='user_import'),
+  path('users/import/<int:job_id>/', views.UserImportStatusView.as_view(), name='user_import_status'),
   path('users/<int:pk>/', views.UserAdminDetailView.as_view(), name='user_detail_admin'),
   path('clubs/', views.ClubListView.as_view(), name='club_list'),
+  path('clubs/cards/', views.ClubCardListView.as_view(), name='club_cards'),
+  path('clubs/<int:club_id>/image/', views.ClubImageView.as_view(), name='club_image'),
   path('clubs/<int:club_id>/join/', views.ClubJoinView.as_view(), name='club_join'),
   path('clubs/<int:club_id>/events/', views.EventListView.as_view(), name='event_list'),
   path('clubs/<int:club_id>/events/<int:pk>/', views.EventDetailView.as_view(), name='event_detail'),
   path('events/<int:event_id>/join/', views.EventJoinView.as_view(), name='event_join'),
+  path('events/<int:event_id>/payments/', views.EventPaymentView.as_view(), name='event_payments'),
   path('clubs/<int:club_id>/finances/', views.FinanceRecordListView.as_view(), name='finance_list'),
   path('clubs/<int:club_id>/finances/<int:pk>/', views.FinanceRecordDetailView.as_view(), name='finance_detail'),
   path('clubs/<int:club_id>/finances/stats/', views.FinanceStatsView.as_view(), name='finance_stats'),
+  path('finances/report/', views.FinanceReportView.as_view(), name='finance_report'),
+  path('finances/report/<str:name>/', views.FinanceReportDownloadView.as_view(), name='finance_report_download'),
+  path('clubs/<int:club_id>/analytics/', views.ClubAnalyticsView.as_view(), name='club_analytics'),
+  path('clubs/<int:club_id>/dashboard/', views.ClubDashboardView.as_view(), name='club_dashboard'),
+  path('clubs/<int:club_id>/stream/', push.club_stream, name='club_stream'),
+  path('clubs/<int:club_id>/stream/ticket/', views.ClubStreamTicketView.as_view(), name='club_stream_ticket'),
+  path('clubs/<int:club_id>/archive/events/', views.ArchivedEventListView.as_view(), name='archived_events'),
+  path('clubs/<int:club_id>/archive/events/<int:pk>/', views.ArchivedEventDetailView.as_view(), name='archived_event'),
+  path('clubs/<int:club_id>/archive/events/<int:pk>/restore/', views.ArchivedEventRestoreView.as_view(), name='archived_event_restore'),
+  path('clubs/<int:club_id>/archive/memberships/', views.ArchivedMembershipListView.as_view(), name='archived_memberships'),
+  path('clubs/<int:club_id>/archive/memberships/<int:pk>/restore/', views.ArchivedMembershipRestoreView.as_view(), name='archived_membership_restore'),
   path('myclubs/', MyClubsView.as_view(), name='myclubs'),
   path('clubs/<int:club_id>/approve/', views.ClubApproveView.as_view(), name='club_approve'),
   path('clubs/<int:pk>/', views.ClubDetailView.as_view(), name="club-detail"),
   path('login/', views.MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
   path('memberships/<int:pk>/', views.MembershipDetailView.as_view(), name='membership-detail'),
+  path('events/<int:event_id>/participants/', views.EventParticipantListView.as_view(), name='event_participants'),
   path('events/<int:event_id>/participants/<int:pk>/', views.EventParticipantDetailView.as_view(), name='event_participant_detail'),
+  path('notifications/', views.NotificationListView.as_view(), name='notification_list'),
+  path('notifications/read/', views.NotificationReadView.as_view(), name='notification_read'),
+  path('uploads/', views.UploadListView.as_view(), name='upload_list'),
+  path('uploads/<uuid:pk>/', views.UploadDetailView.as_view(), name='upload_detail'),
+  path('sync/', views.SyncView.as_view(), name='sync'),
   
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+urlpatterns += [
+  re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), files.serve_media),
+]
\ No newline at end of file
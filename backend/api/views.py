@@ -1,25 +1,73 @@
-from rest_framework import generics, status, views
+import csv
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import generics, serializers, status, views
 from rest_framework.decorators import action
 from rest_framework.generics import RetrieveAPIView, RetrieveUpdateAPIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .models import (Club, Event, EventParticipation, FinanceRecord,
-                     Membership, User)
-from .permissions import CanViewEvent, IsAdmin, IsClubManager
-from .serializers import (ClubSerializer, EventParticipationSerializer,
-                          EventSerializer, FinanceRecordSerializer,
-                          MembershipSerializer, UserRegisterSerializer,
-                          UserSerializer)
+from .analytics import (club_dashboard, get_club_analytics,
+                        invalidate_club_analytics)
+from .archive import restore_event, restore_membership
+from .files import serve_file
+from .jobs import enqueue
+from .ledger import with_balances
+from .models import (ArchivedEvent, ArchivedMembership, Club, ClubCard, Event,
+                     EventParticipation, FinanceRecord, Job, Membership,
+                     Notification, UploadSession, User)
+from .pagination import (ArchivePagination, InboxPagination, LedgerPagination,
+                         ParticipantPagination)
+from .parsers import CSVParser
+from .permissions import (CanViewEvent, IsAdmin, IsClubManager,
+                          IsEventClubManager)
+from .provisioning import (import_users, load_report, new_import_name,
+                           parse_rows, save_import)
+from .push import get_access, issue_ticket, publish_participations
+from .reports import (FORMATS, csv_lines, new_report_name, report_path,
+                      report_rows, xlsx_file)
+from .roles import get_roles
+from .serializers import (ArchivedEventDetailSerializer,
+                          ArchivedEventSerializer,
+                          ArchivedMembershipSerializer, ClubCardSerializer,
+                          ClubImageSerializer, ClubSerializer,
+                          EventParticipationSerializer, EventSerializer,
+                          FinanceLedgerSerializer, FinanceRecordSerializer,
+                          FinanceReportSerializer, MembershipSerializer,
+                          NotificationReadSerializer, NotificationSerializer,
+                          PaymentReconcileSerializer, UploadSessionSerializer,
+                          UserRegisterSerializer, UserSerializer,
+                          with_participant_counts)
+from .sync import changes_page, changes_since, decode_page
+from .uploads import (UploadError, blob_from_upload, cancel_session,
+                      start_session, write_chunk)
+
+
+def get_query_param(request, name, field):
+  value = request.query_params.get(name)
+  if value in (None, ''):
+    return None
+  try:
+    return field.to_internal_value(value)
+  except serializers.ValidationError as exc:
+    raise serializers.ValidationError({name: exc.detail})
+
 
 
 class RegisterView(generics.CreateAPIView):
   queryset = User.objects.all()
   serializer_class = UserRegisterSerializer
   permission_classes = [AllowAny]
+  throttle_scope = 'register'
   def perform_create(self, serializer):
     user = serializer.save()
     user.set_password(serializer.validated_data['password'])
@@ -41,6 +89,53 @@ class UserAdminDetailView(generics.RetrieveUpdateDestroyAPIView):
   serializer_class = UserSerializer
   permission_classes = [IsAdmin]
 
+class UserImportView(APIView):
+  # 批次建立帳號：JSON（list 或 {"users": [...]}）、text/csv，或 multipart 上傳的
+  # .csv/.json 檔（欄位 file）。有問題的列略過並逐列回報；?dry_run=1 只檢查。
+  # 超過 USER_IMPORT_SYNC_ROWS 列的匯入交給背景工作，回 202 與查詢網址
+  permission_classes = [IsAdmin]
+  parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, CSVParser]
+
+  def post(self, request):
+    dry_run = request.query_params.get('dry_run') in ('1', 'true')
+    upload = request.FILES.get('file')
+    try:
+      if upload is not None:
+        rows = parse_rows(upload.read(), 'json' if upload.name.lower().endswith('.json') else 'csv')
+      else:
+        rows = request.data.get('users') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+          raise ValueError('Expected a list of users.')
+      if dry_run or len(rows) <= getattr(settings, 'USER_IMPORT_SYNC_ROWS', 10):
+        # 少量資料直接在這個行程裡雜湊，不開行程池
+        report = import_users(rows, dry_run=dry_run, workers=1)
+      else:
+        max_rows = getattr(settings, 'USER_IMPORT_MAX_ROWS', None)
+        if max_rows is not None and len(rows) > max_rows:
+          raise ValueError(f'At most {max_rows} rows can be imported at once.')
+        report = None
+    except (ValueError, csv.Error) as exc:
+      return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if report is None:
+      name = new_import_name()
+      save_import(name, rows)
+      job = enqueue('users.import', user_id=request.user.id, file=name)
+      return Response(
+        {'job': job.id, 'url': reverse('user_import_status', args=[job.id])},
+        status=status.HTTP_202_ACCEPTED,
+      )
+    created = report['created'] and not dry_run
+    return Response(report, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+class UserImportStatusView(APIView):
+  # 背景匯入的進度；完成後附上逐列報告。只有送出匯入的管理員看得到
+  permission_classes = [IsAdmin]
+
+  def get(self, request, job_id):
+    job = generics.get_object_or_404(Job, id=job_id, name='users.import', payload__user_id=request.user.id)
+    report = load_report(job.payload['file']) if job.status == 'done' else None
+    return Response({'job': job.id, 'status': job.status, 'report': report})
+
 class ClubApproveView(views.APIView):
     permission_classes = [IsAdmin]  # 只允許管理員
 
@@ -57,16 +152,31 @@ class ClubApproveView(views.APIView):
             club.status = 'disbanded'
         else:
             return Response({'detail': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
-        club.save()
+        with transaction.atomic():
+            club.save()
+            enqueue('club.status_changed', club_id=club.id, status=club.status)
         return Response({'status': club.status})
 
+def store_club_image(serializer):
+  # 上傳的社團圖片改存成以內容雜湊命名的 blob，相同的圖只存一份
+  if 'image' not in serializer.validated_data:
+    return {}
+  image = serializer.validated_data.pop('image')
+  if not image:
+    return {'image': image}
+  try:
+    return {'image': blob_from_upload(image).file.name}
+  except UploadError as exc:
+    raise serializers.ValidationError({'image': [str(exc)]})
+
 class ClubListView(generics.ListCreateAPIView):
     queryset = Club.objects.all()
     serializer_class = ClubSerializer
     permission_classes = [AllowAny]
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        club = serializer.save()
+        club = serializer.save(**store_club_image(serializer))
         # 建立者自動成為社長
         Membership.objects.create(
             user=self.request.user,
@@ -75,6 +185,81 @@ class ClubListView(generics.ListCreateAPIView):
             is_manager=True,
             position="社長"
         )
+        enqueue('club.created', club_id=club.id)
+        if club.image:
+            enqueue('club.process_image', club_id=club.id)
+
+class ClubImageView(views.APIView):
+    # 以完成的分段上傳（uploads/）設定社團圖片
+    permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+
+    @transaction.atomic
+    def put(self, request, club_id):
+        data = ClubImageSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        club = generics.get_object_or_404(Club, pk=club_id)
+        session = generics.get_object_or_404(
+            UploadSession, pk=data.validated_data['upload'], user=request.user, blob__isnull=False
+        )
+        blob = session.blob
+        club.image = blob.file.name
+        club.save(update_fields=['image', 'updated_at'])
+        if max(blob.width or 0, blob.height or 0) > settings.CLUB_IMAGE_MAX_SIZE:
+            enqueue('club.process_image', club_id=club.id)
+        return Response({'image': request.build_absolute_uri(club.image.url)})
+
+class UploadListView(views.APIView):
+    # 開始一個分段上傳；帶 sha256 且內容已存在時直接完成，不必上傳
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = start_session(request.user, **serializer.validated_data)
+        except UploadError as exc:
+            return Response({'detail': str(exc)}, status=exc.status)
+        return Response(UploadSessionSerializer(session, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+class UploadDetailView(views.APIView):
+    # GET：目前 offset（續傳用）；PUT：以 Content-Range 寫入一段；DELETE：放棄上傳
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self, request, pk):
+        return generics.get_object_or_404(UploadSession.objects.select_related('blob'), pk=pk, user=request.user)
+
+    def get(self, request, pk):
+        session = self.get_session(request, pk)
+        return Response(UploadSessionSerializer(session, context={'request': request}).data)
+
+    def put(self, request, pk):
+        session = self.get_session(request, pk)
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        try:
+            # 直接讀 request body 串流，不經 parser，整段不會留在記憶體
+            session = write_chunk(session, request._request, request.META.get('HTTP_CONTENT_RANGE'), content_length)
+        except UploadError as exc:
+            offset = UploadSession.objects.filter(pk=pk).values_list('received', flat=True).first()
+            return Response({'detail': str(exc), 'offset': offset}, status=exc.status)
+        return Response(UploadSessionSerializer(session, context={'request': request}).data)
+
+    def delete(self, request, pk):
+        cancel_session(self.get_session(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class ClubCardListView(generics.ListAPIView):
+    serializer_class = ClubCardSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        queryset = ClubCard.objects.order_by('club_id')
+        status_param = self.request.query_params.get('status')
+        if status_param:
+            queryset = queryset.filter(status=status_param)
+        return queryset
 
 class MyClubsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -92,10 +277,32 @@ class ClubDetailView(RetrieveUpdateAPIView):
     queryset = Club.objects.all()
     serializer_class = ClubSerializer
     permission_classes = [AllowAny]
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # store_club_image 會把 image 從 validated_data 取出，先記下是否有換圖
+        image_changed = 'image' in serializer.validated_data
+        club = serializer.save(**store_club_image(serializer))
+        if club.image and image_changed:
+            enqueue('club.process_image', club_id=club.id)
     
 
+class ClubStreamTicketView(views.APIView):
+    # EventSource 無法帶 header：先以 JWT 換一張短效、只能開這個社團串流的票
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, club_id):
+        subscribed, _ = get_access(request.user, club_id)
+        if not subscribed:
+            return Response({'detail': 'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN)
+        return Response({
+            'ticket': issue_ticket(request.user, club_id),
+            'expires_in': settings.PUSH_TICKET_SECONDS,
+        })
+
 class ClubJoinView(views.APIView):
   permission_classes = [IsAuthenticated]
+  throttle_scope = 'join'
   def post(self, request, club_id):
     club = Club.objects.get(id=club_id)
     Membership.objects.get_or_create(user=request.user, club=club, defaults={'is_manager': False})
@@ -107,24 +314,41 @@ class EventListView(generics.ListCreateAPIView):
   def get_queryset(self):
     club_id = self.kwargs['club_id']
     queryset = Event.objects.filter(club_id=club_id)
-    if not self.request.user.is_authenticated or not Membership.objects.filter(user=self.request.user, club_id=club_id).exists():
+    if not get_roles(self.request).is_member(club_id):
       queryset = queryset.filter(is_public=True)
-    return queryset
+    return with_participant_counts(queryset)
+  def get_serializer_context(self):
+    context = super().get_serializer_context()
+    context['roles'] = get_roles(self.request)
+    return context
+  @transaction.atomic
   def perform_create(self, serializer):
-    serializer.save(club_id=self.kwargs['club_id'])
+    event = serializer.save(club_id=self.kwargs['club_id'])
+    if event.status == 'open':
+      enqueue('event.opened', event_id=event.id)
 
 class EventDetailView(generics.RetrieveUpdateAPIView):
-    queryset = Event.objects.all()
+    queryset = with_participant_counts(Event.objects.all())
     serializer_class = EventSerializer
     permission_classes = [AllowAny]
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        was_open = serializer.instance.status == 'open'
+        event = serializer.save()
+        # 開放報名時通知社員（背景分批處理）
+        if event.status == 'open' and not was_open:
+            enqueue('event.opened', event_id=event.id)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
+        context['roles'] = get_roles(self.request)
         return context
 
 class EventJoinView(views.APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'join'
     def post(self, request, event_id):
         event = Event.objects.get(id=event_id)
         payment_method = request.data.get("payment_method")
@@ -141,10 +365,33 @@ class EventJoinView(views.APIView):
         return Response({"detail": "Cannot join event of unjoined club"}, status=status.HTTP_403_FORBIDDEN)
 
 class FinanceRecordListView(generics.ListCreateAPIView):
-  serializer_class = FinanceRecordSerializer
   permission_classes = [IsAuthenticated, IsClubManager]
+  pagination_class = LedgerPagination
+
+  def get_serializer_class(self):
+    if self.request.method == 'GET':
+      return FinanceLedgerSerializer
+    return FinanceRecordSerializer
+
   def get_queryset(self):
-    return FinanceRecord.objects.filter(club_id=self.kwargs['club_id'])
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    date_from = get_query_param(self.request, 'from', serializers.DateField())
+    date_to = get_query_param(self.request, 'to', serializers.DateField())
+    min_amount = get_query_param(self.request, 'min_amount', amount)
+    max_amount = get_query_param(self.request, 'max_amount', amount)
+
+    queryset = FinanceRecord.objects.filter(club_id=self.kwargs['club_id'])
+    if date_from:
+      queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+      queryset = queryset.filter(date__lte=date_to)
+    if min_amount is not None:
+      queryset = queryset.filter(amount__gte=min_amount)
+    if max_amount is not None:
+      queryset = queryset.filter(amount__lte=max_amount)
+    # 餘額由每月 checkpoint 計算，與篩選條件及分頁位置無關
+    return with_balances(queryset)
+
   def perform_create(self, serializer):
     serializer.save(club_id=self.kwargs['club_id'])
 
@@ -154,6 +401,19 @@ class FinanceRecordDetailView(generics.RetrieveUpdateDestroyAPIView):
   def get_queryset(self):
     return FinanceRecord.objects.filter(club_id=self.kwargs['club_id'])
 
+class ClubAnalyticsView(views.APIView):
+  permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+  def get(self, request, club_id):
+    return Response(get_club_analytics(club_id))
+
+class ClubDashboardView(views.APIView):
+  permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+  def get(self, request, club_id):
+    dashboard = club_dashboard(club_id)
+    if dashboard is None:
+      return Response(status=status.HTTP_404_NOT_FOUND)
+    return Response(dashboard)
+
 class FinanceStatsView(views.APIView):
   permission_classes = [IsAuthenticated, IsClubManager]
   def get(self, request, club_id):
@@ -161,6 +421,53 @@ class FinanceStatsView(views.APIView):
     total = sum(record.amount for record in records)
     return Response({"total": total})
   
+class FinanceReportView(views.APIView):
+  # 跨社團月報表（社團 x 月份的收支與期末餘額）。
+  # GET 直接下載；POST 交給背景工作產生，完成後以通知告知下載網址
+  permission_classes = [IsAuthenticated, IsAdmin]
+
+  def get_params(self, data):
+    params = FinanceReportSerializer(data=data)
+    params.is_valid(raise_exception=True)
+    return params.validated_data
+
+  def get(self, request):
+    params = self.get_params(request.query_params)
+    rows = report_rows(params.get('from'), params.get('to'), params.get('club'))
+    filename = f"finance-report.{params['output']}"
+    if params['output'] == 'xlsx':
+      return FileResponse(xlsx_file(rows), as_attachment=True, filename=filename, content_type=FORMATS['xlsx'])
+    response = StreamingHttpResponse(csv_lines(rows), content_type=FORMATS['csv'])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+  def post(self, request):
+    params = self.get_params(request.data)
+    name = new_report_name(params['output'])
+    enqueue(
+      'finance.report',
+      user_id=request.user.id,
+      report=name,
+      date_from=params.get('from') and params['from'].isoformat(),
+      date_to=params.get('to') and params['to'].isoformat(),
+      club_ids=params.get('club'),
+    )
+    return Response(
+      {'report': name, 'url': reverse('finance_report_download', args=[name])},
+      status=status.HTTP_202_ACCEPTED,
+    )
+
+class FinanceReportDownloadView(views.APIView):
+  permission_classes = [IsAuthenticated, IsAdmin]
+
+  def get(self, request, name):
+    path = report_path(name)
+    if path is None:
+      raise Http404
+    response = serve_file(request, path, 'private, no-store')
+    response['Content-Disposition'] = f'attachment; filename="{name}"'
+    return response
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
@@ -178,12 +485,41 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    throttle_scope = 'login'
 
 class MembershipDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Membership.objects.all()
     serializer_class = MembershipSerializer
     permission_classes = [IsAuthenticated]
 
+class EventParticipantListView(generics.ListAPIView):
+    # 活動參加者分頁列表，可依付款狀態／方式篩選、以帳號或姓名搜尋
+    serializer_class = EventParticipationSerializer
+    permission_classes = [IsAuthenticated, IsAdmin | IsEventClubManager]
+    pagination_class = ParticipantPagination
+
+    def get_queryset(self):
+        event = generics.get_object_or_404(Event, pk=self.kwargs['event_id'])
+        payment_status = get_query_param(
+            self.request, 'payment_status', serializers.ChoiceField(choices=['pending', 'confirmed'])
+        )
+        payment_method = get_query_param(self.request, 'payment_method', serializers.CharField())
+        search = get_query_param(self.request, 'search', serializers.CharField())
+
+        queryset = EventParticipation.objects.filter(event=event).select_related('user', 'event')
+        if payment_status:
+            queryset = queryset.filter(payment_status=payment_status)
+        if payment_method:
+            queryset = queryset.filter(payment_method=payment_method)
+        if search:
+            queryset = queryset.filter(Q(user__username__icontains=search) | Q(user__name__icontains=search))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['roles'] = get_roles(self.request)
+        return context
+
 class EventParticipantDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = EventParticipation.objects.all()
     serializer_class = EventParticipationSerializer
@@ -191,4 +527,140 @@ class EventParticipantDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         event_id = self.kwargs['event_id']
-        return EventParticipation.objects.filter(event_id=event_id)
\ No newline at end of file
+        return EventParticipation.objects.filter(event_id=event_id)
+
+class EventPaymentView(views.APIView):
+    # GET：依付款方式與狀態統計；POST：以單一 UPDATE 批次確認或退回付款
+    permission_classes = [IsAuthenticated, IsEventClubManager]
+
+    def get_totals(self, event_id):
+        totals = (
+            EventParticipation.objects.filter(event_id=event_id)
+            .values('payment_method', 'payment_status')
+            .annotate(count=Count('id'), amount=Sum('event__fee'))
+            .order_by('payment_method', 'payment_status')
+        )
+        return list(totals)
+
+    def get(self, request, event_id):
+        return Response({'totals': self.get_totals(event_id)})
+
+    @transaction.atomic
+    def post(self, request, event_id):
+        serializer = PaymentReconcileSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = EventParticipation.objects.filter(event_id=event_id)
+        if 'ids' in data:
+            queryset = queryset.filter(id__in=data['ids'])
+        if 'payment_method' in data:
+            queryset = queryset.filter(payment_method=data['payment_method'])
+        now = timezone.now()
+        updated = queryset.exclude(payment_status=data['payment_status']).update(
+            payment_status=data['payment_status'], updated_at=now
+        )
+        if updated:
+            # update() 不會送 post_save，推播與分析快取要自己處理
+            changed = list(
+                EventParticipation.objects.filter(event_id=event_id, updated_at=now, payment_status=data['payment_status'])
+                .only('id', 'event_id', 'user_id', 'payment_status')
+            )
+            club_id = Event.objects.filter(id=event_id).values_list('club_id', flat=True).first()
+
+            def after_commit():
+                invalidate_club_analytics(club_id)
+                publish_participations(changed, event_id, club_id)
+
+            transaction.on_commit(after_commit)
+        return Response({'updated': updated, 'totals': self.get_totals(event_id)})
+
+class NotificationListView(generics.ListAPIView):
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = InboxPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+class NotificationReadView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = NotificationReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # 未指定 ids 時全部標為已讀
+        queryset = Notification.objects.filter(user=request.user, is_read=False)
+        if 'ids' in serializer.validated_data:
+            queryset = queryset.filter(id__in=serializer.validated_data['ids'])
+        return Response({'updated': queryset.update(is_read=True)})
+
+class SyncView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # 第一次以 since（或不帶，完整同步）開始，之後帶上一頁回傳的 next 直到 next 為 null
+        limit = get_query_param(
+            request, 'limit', serializers.IntegerField(min_value=1, max_value=settings.SYNC_MAX_PAGE_SIZE)
+        ) or settings.SYNC_PAGE_SIZE
+        page = request.query_params.get('page')
+        if page:
+            try:
+                state = decode_page(page, request.user)
+            except ValueError as exc:
+                raise serializers.ValidationError({'page': [str(exc)]})
+            return Response(changes_page(request.user, state, limit))
+        since = get_query_param(request, 'since', serializers.DateTimeField())
+        return Response(changes_since(request.user, since, limit))
+
+class ArchivedEventListView(generics.ListAPIView):
+    serializer_class = ArchivedEventSerializer
+    permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+    pagination_class = ArchivePagination
+
+    def get_queryset(self):
+        return ArchivedEvent.objects.filter(club_id=self.kwargs['club_id']).annotate(
+            participant_count=Count('participations')
+        )
+
+class ArchivedEventDetailView(generics.RetrieveAPIView):
+    serializer_class = ArchivedEventDetailSerializer
+    permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+
+    def get_queryset(self):
+        return ArchivedEvent.objects.filter(club_id=self.kwargs['club_id']).annotate(
+            participant_count=Count('participations')
+        ).prefetch_related('participations__user')
+
+class ArchivedEventRestoreView(views.APIView):
+    permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+
+    def post(self, request, club_id, pk):
+        archived = generics.get_object_or_404(ArchivedEvent, club_id=club_id, pk=pk)
+        restore_event(archived)
+        return Response({'id': pk})
+
+class ArchivedMembershipListView(generics.ListAPIView):
+    serializer_class = ArchivedMembershipSerializer
+    permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+    pagination_class = ArchivePagination
+
+    def get_queryset(self):
+        queryset = ArchivedMembership.objects.filter(club_id=self.kwargs['club_id']).select_related('user')
+        status_param = self.request.query_params.get('status')
+        if status_param:
+            queryset = queryset.filter(status=status_param)
+        return queryset
+
+class ArchivedMembershipRestoreView(views.APIView):
+    permission_classes = [IsAuthenticated, IsAdmin | IsClubManager]
+
+    def post(self, request, club_id, pk):
+        archived = generics.get_object_or_404(ArchivedMembership, club_id=club_id, pk=pk)
+        # 使用者之後又重新申請時，不能再還原舊的社員紀錄
+        if Membership.objects.filter(user_id=archived.user_id, club_id=club_id).exists():
+            return Response({'detail': '此使用者已有社員紀錄'}, status=status.HTTP_409_CONFLICT)
+        restore_membership(archived)
+        return Response({'id': pk})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -58,11 +59,39 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson 版本的 JSON renderer/parser，未安裝 orjson 時自動退回標準 json
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Token bucket 限流，只對設定 throttle_scope 的 view 生效
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.IPTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'login_user': '5/min',
+        'login_ip': '30/min',
+        'register_ip': '10/hour',
+        'join_user': '30/min',
+        'join_ip': '120/min',
+    },
 }
 
+# 有安裝 msgpack 時支援 Accept/Content-Type: application/msgpack
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'api.parsers.MessagePackParser')
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',        # Brotli / gzip
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,6 +100,36 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Prometheus /metrics（需安裝 prometheus_client）。多個 worker 行程時以環境變數
+# PROMETHEUS_MULTIPROC_DIR 指定共用目錄
+METRICS_ENABLED = find_spec('prometheus_client') is not None
+# 抓取時要帶 Authorization: Bearer <token>；未設定時 /metrics 回 404
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'api.metrics.MetricsMiddleware')
+# 記住目前的 request，讓 metrics 與慢查詢紀錄知道查詢來自哪個 view
+MIDDLEWARE.insert(0, 'api.instrumentation.CurrentRequestMiddleware')
+
+# 慢查詢紀錄：超過門檻（毫秒）的 SQL 依比例抽樣，連同 EXPLAIN 寫入 JSONL。
+# None 表示關閉；以 manage.py slowqueries 彙整
+SLOW_QUERY_MS = 200
+SLOW_QUERY_SAMPLE_RATE = 1.0
+SLOW_QUERY_LOG = BASE_DIR / 'logs' / 'slow_queries.jsonl'
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# 批次匯入帳號：密碼雜湊的行程數（None 表示全部 CPU）與單次上限
+USER_IMPORT_WORKERS = None
+USER_IMPORT_MAX_ROWS = 10000
+# 超過這個列數的 API 匯入交給背景工作，web 行程裡不開雜湊行程池
+USER_IMPORT_SYNC_ROWS = 10
+# 排入背景工作的匯入檔；完成後內容換成結果報告
+USER_IMPORT_ROOT = BASE_DIR / 'imports'
+
+# 回應壓縮：小於門檻的回應與 media 檔案不壓縮
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_BROTLI_QUALITY = 4
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -98,10 +157,87 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # WAL：讀不會被寫擋住，commit 不必每次 fsync（限流每個 request 都要寫一次）
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
     }
 }
 
 
+# Cache
+# 'shared' 給多個 worker process 共用（分析快取等），設定 REDIS_URL 時改用 Redis
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+ANALYTICS_CACHE = 'shared'
+ANALYTICS_CACHE_TIMEOUT = 3600
+
+
+# Background jobs (manage.py runworker)
+
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_BASE = 10      # 秒，重試間隔每次加倍
+JOB_BACKOFF_MAX = 3600
+JOB_LOCK_TIMEOUT = 600     # 超過此秒數仍在 running 視為 worker 已中斷
+JOB_RETENTION_DAYS = 7     # 已完成的 job 保留天數
+JOB_PRUNE_INTERVAL = 3600  # 秒，worker 閒置時多久清一次舊 job
+
+CLUB_IMAGE_MAX_SIZE = 1600
+
+
+# Events
+
+# 已淘汰：活動（含社團回應裡的 activities）仍內嵌 participants 名單，保留一個版本
+# 給舊版客戶端，下一版移除。新客戶端改用 events/<id>/participants/ 分頁取得
+EVENT_EMBED_PARTICIPANTS = True
+
+
+# Notifications
+
+NOTIFICATION_CHUNK_SIZE = 1000
+NOTIFY_BY_EMAIL = False    # 同時寄 email 通知
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'noreply@localhost'
+
+
+# Delta sync (api/sync/)
+
+SYNC_OVERLAP_SECONDS = 5   # cursor 往回退幾秒，避免漏掉較晚 commit 的資料
+SYNC_TOMBSTONE_DAYS = 30   # 刪除紀錄保留天數，更舊的 cursor 需重新完整同步
+SYNC_PAGE_SIZE = 1000      # 每頁最多幾筆（各模型合計），其餘以 next 取得
+SYNC_MAX_PAGE_SIZE = 5000
+
+
+# 封存（manage.py archive）
+
+ARCHIVE_EVENT_DAYS = 365        # 已結束/取消的活動，結束後多久移到封存表
+ARCHIVE_MEMBERSHIP_DAYS = 180   # 已退出/被拒絕的社員紀錄，最後更新後多久移到封存表
+
+
+# Live push (SSE, api/clubs/<id>/stream/)，需以 ASGI 執行
+
+PUSH_BROKER = 'api.push.InProcessBroker'
+PUSH_KEEPALIVE_SECONDS = 15
+PUSH_QUEUE_SIZE = 100
+PUSH_TICKET_SECONDS = 60    # stream/ticket/ 換到的票多久內可以開串流
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -137,6 +273,21 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# 前端 `npm run build` 的輸出（vite base 為 /static/），collectstatic 時一併收集
+FRONTEND_DIST = BASE_DIR.parent / 'frontend' / 'dist'
+FRONTEND_ASSETS_PREFIX = 'assets/'  # Vite 產生、檔名已含 hash 的目錄
+STATICFILES_DIRS = [FRONTEND_DIST] if FRONTEND_DIST.is_dir() else []
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'api.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -145,4 +296,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'api.User'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+# 背景產生的財務報表；不放在 MEDIA_ROOT，只能經由管理員 API 下載
+REPORT_ROOT = BASE_DIR / 'reports'
+# 分段上傳（uploads/）：未完成的暫存檔放在 MEDIA_ROOT 之外
+UPLOAD_TEMP_DIR = BASE_DIR / 'uploads'
+UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+UPLOAD_CHUNK_MAX_SIZE = 5 * 1024 * 1024
+UPLOAD_CHUNK_LOCK_SECONDS = 300  # 寫入一段的租約；request 中斷後逾時才能重送同一段
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # 秒；逾時的上傳與沒有被引用的 blob 由 manage.py cleanuploads 清除
+MEDIA_CACHE_CONTROL = 'public, max-age=86400, stale-while-revalidate=604800'
+# 交給前端 proxy 傳送檔案：None、'x-accel-redirect'（nginx）或 'x-sendfile'
+MEDIA_ACCEL = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'  # nginx 的 internal location，alias 到 MEDIA_ROOT
@@ -14,16 +14,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from api import files, metrics
 from api.views import ClubApproveView
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('metrics', metrics.metrics_view, name='metrics'),
+    re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), files.serve_static),
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), files.serve_media),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# 其餘路徑交給前端的 client-side routing。/admin 這類少了結尾斜線的路徑也要
+# 排除，才會由 APPEND_SLASH 轉址
+urlpatterns += [
+    re_path(r'^(?!(?:api|admin|static|media)(?:/|$)).*$', files.spa_index),
+]
@@ -30,6 +30,10 @@ type Activity = {
   payment_end_date?: string;
   payment_methods?: PaymentMethods;
   is_public?: boolean;
+  participant_count?: number;
+  confirmed_count?: number;
+  my_participation?: Participation | null;
+  my_membership?: { is_manager: boolean; status?: string } | null;
 };
 
 type Participation = {
@@ -86,7 +90,12 @@ const ActivityDetail = () => {
   const [joinPaymentMethod, setJoinPaymentMethod] = useState("cash");
   const [isJoining, setIsJoining] = useState(false);
   const [joinError, setJoinError] = useState<string | null>(null);
+  // 參加者名單分頁載入（僅幹部可見）
   const [participants, setParticipants] = useState<Participation[]>([]);
+  const [participantsNext, setParticipantsNext] = useState<string | null>(null);
+  const [participantStatus, setParticipantStatus] = useState("");
+  const [participantSearch, setParticipantSearch] = useState("");
+  const [confirmedCount, setConfirmedCount] = useState(0);
   const [myMembership, setMyMembership] = useState<{ is_manager: boolean; status?: string } | null>(null);
 
   // 允許未登入（user_id 可能為 0）
@@ -111,21 +120,11 @@ const ActivityDetail = () => {
           ...activityData,
           payment_methods: activityData.payment_methods || {},
         });
-        setParticipants(activityData.participants || []);
-        // 只有登入時才找 membership/participation
+        setConfirmedCount(activityData.confirmed_count || 0);
+        // 只有登入時才有 membership/participation
         if (currentUserId) {
-          if (activityData.my_membership) {
-            setMyMembership(activityData.my_membership);
-          } else {
-            const found = (activityData.participants || []).find(
-              (p: Participation) => p.user === currentUserId
-            );
-            setMyMembership(found ? { is_manager: !!found.is_manager } : null);
-          }
-          const myParticipation = (activityData.participants || []).find(
-            (p: Participation) => p.user === currentUserId
-          );
-          setParticipation(myParticipation || null);
+          setMyMembership(activityData.my_membership || null);
+          setParticipation(activityData.my_participation || null);
         } else {
           setMyMembership(null);
           setParticipation(null);
@@ -143,6 +142,33 @@ const ActivityDetail = () => {
   // 幹部判斷（直接用 membership 的 is_manager 欄位）
   const isManager = !!myMembership?.is_manager;
 
+  const fetchParticipants = async (url: string, append: boolean) => {
+    try {
+      const token = localStorage.getItem("access");
+      const res = await fetch(url, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error("無法取得參加者");
+      const data = await res.json();
+      setParticipants((prev) => (append ? [...prev, ...data.results] : data.results));
+      setParticipantsNext(data.next);
+    } catch (err) {
+      alert("無法載入參加者名單，請稍後再試。");
+    }
+  };
+
+  useEffect(() => {
+    if (!isManager || !activity) return;
+    const params = new URLSearchParams({ page_size: "100" });
+    if (participantStatus) params.set("payment_status", participantStatus);
+    if (participantSearch) params.set("search", participantSearch);
+    const timer = setTimeout(
+      () => fetchParticipants(`/api/events/${activity.id}/participants/?${params}`, false),
+      participantSearch ? 300 : 0
+    );
+    return () => clearTimeout(timer);
+  }, [isManager, activity?.id, participantStatus, participantSearch]);
+
   // 報名活動
   const handleJoinActivity = async () => {
     if (activity?.quota && confirmedCount >= activity.quota) {
@@ -168,7 +194,8 @@ const ActivityDetail = () => {
       if (!res.ok) throw new Error("報名失敗");
       const data = await res.json();
       setParticipation(data);
-      setParticipants((prev) => [...prev, data]);
+      if (data.payment_status === "confirmed") setConfirmedCount((n) => n + 1);
+      if (isManager) setParticipants((prev) => [...prev, data]);
     } catch (err) {
       setJoinError("報名失敗，請稍後再試。");
     } finally {
@@ -189,6 +216,7 @@ const ActivityDetail = () => {
         body: JSON.stringify({ payment_status: "confirmed" }),
       });
       if (!res.ok) throw new Error("確認失敗");
+      setConfirmedCount((n) => n + 1);
       setParticipants((prev) =>
         prev.map((p) =>
           p.id === participantId ? { ...p, payment_status: "confirmed" } : p
@@ -211,6 +239,7 @@ const ActivityDetail = () => {
         body: JSON.stringify({ payment_status: "pending" }),
       });
       if (!res.ok) throw new Error("撤銷失敗");
+      setConfirmedCount((n) => n - 1);
       setParticipants((prev) =>
         prev.map((p) =>
           p.id === participantId ? { ...p, payment_status: "pending" } : p
@@ -232,6 +261,8 @@ const ActivityDetail = () => {
         },
       });
       if (!res.ok) throw new Error("取消報名失敗");
+      const removed = participants.find((p) => p.id === participantId);
+      if (removed?.payment_status === "confirmed") setConfirmedCount((n) => n - 1);
       setParticipants((prev) => prev.filter((p) => p.id !== participantId));
       // 如果自己被取消，也要清掉 participation
       if (participation && participation.id === participantId) {
@@ -242,8 +273,6 @@ const ActivityDetail = () => {
     }
   };
 
-  // 顯示已確認人數
-  const confirmedCount = participants.filter(p => p.payment_status === "confirmed").length;
   const totalQuota = activity?.quota || 0;
 
   // 報名資格判斷
@@ -266,6 +295,7 @@ const ActivityDetail = () => {
         },
       });
       if (!res.ok) throw new Error("取消報名失敗");
+      if (participation.payment_status === "confirmed") setConfirmedCount((n) => n - 1);
       setParticipation(null);
       setParticipants((prev) => prev.filter((p) => p.id !== participation.id));
     } catch (err) {
@@ -452,9 +482,26 @@ const ActivityDetail = () => {
       )}
 
       {/* 參加者列表 */}
-      {isManager && participants.length > 0 && (
+      {isManager && (participants.length > 0 || participantStatus || participantSearch) && (
         <div className="mt-4">
           <h5>參加者列表</h5>
+          <div className="d-flex gap-2 mb-2">
+            <input
+              className="form-control"
+              placeholder="搜尋帳號或姓名"
+              value={participantSearch}
+              onChange={(e) => setParticipantSearch(e.target.value)}
+            />
+            <select
+              className="form-select w-auto"
+              value={participantStatus}
+              onChange={(e) => setParticipantStatus(e.target.value)}
+            >
+              <option value="">全部付款狀態</option>
+              <option value="pending">待確認</option>
+              <option value="confirmed">已確認</option>
+            </select>
+          </div>
           <table className="table table-bordered">
             <thead>
               <tr>
@@ -506,6 +553,14 @@ const ActivityDetail = () => {
               ))}
             </tbody>
           </table>
+          {participantsNext && (
+            <button
+              className="btn btn-outline-secondary btn-sm"
+              onClick={() => fetchParticipants(participantsNext, true)}
+            >
+              載入更多
+            </button>
+          )}
         </div>
       )}
 
@@ -22,11 +22,11 @@ const ClubList = () => {
         if (token) {
           headers["Authorization"] = `Bearer ${token}`;
         }
-        fetch("/api/clubs/", { headers })
+        fetch("/api/clubs/cards/?status=active", { headers })
           .then(res => {
             if (res.status === 401) {
               localStorage.removeItem("access");
-              return fetch("/api/clubs/", { headers: { "Content-Type": "application/json" } });
+              return fetch("/api/clubs/cards/?status=active", { headers: { "Content-Type": "application/json" } });
             }
             return res;
           })
@@ -1,11 +1,13 @@
 import react from '@vitejs/plugin-react';
 import { defineConfig } from 'vite';
 
-export default defineConfig({
+export default defineConfig(({ command }) => ({
   plugins: [react()],
+  // build 出來的檔案由 Django 以 collectstatic 收集，放在 STATIC_URL 底下
+  base: command === 'build' ? '/static/' : '/',
   server: {
     proxy: {
       '/api': 'http://localhost:8000', // Django 後端埠號
     },
   },
-});
\ No newline at end of file
+}));